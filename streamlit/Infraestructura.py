@@ -2,24 +2,85 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from almacen import leer_de_sesion
+from infra_analitica import obtener_cubo_infraestructura
+from instrumentacion import cronometro
+from reduccion import modo_render, top_n
+
+MAX_SEDES = 25  # sedes por municipio en la comparativa; el resto se agrupa en 'Otros'
+
+# ===================================================================
+# Fragmentos: los filtros solo vuelven a ejecutar su propia sección
+# ===================================================================
+@st.fragment
+def _tabla_proyectos(cubo):
+    st.markdown("---")
+    st.subheader("🔎 Tabla Interactiva: Proyectos por Departamento y Estado")
+
+    col1, col2 = st.columns(2)
+    filtro_depto = col1.selectbox("Selecciona un Departamento", cubo.departamentos)
+    filtro_estado = col2.selectbox("Selecciona un Estado de Obra", cubo.estados)
+
+    # Búsqueda directa en el índice (departamento, estado), sin recorrer la base
+    df_filtro = cubo.proyectos(filtro_depto, filtro_estado)
+
+    st.dataframe(df_filtro.reset_index(drop=True), use_container_width=True)
+
+
+@st.fragment
+def _comparativa_municipios(cubo):
+    st.markdown("---")
+    st.subheader("🏙️ Comparativa de Aulas por Municipio (Top 10 con más inversión)")
+
+    # Top 10 municipios
+    municipios_disp = cubo.top_municipios(10)['nombre_municipio'].tolist()
+
+    selected_mun = st.multiselect("Selecciona municipios a comparar", municipios_disp, default=municipios_disp[:3])
+
+    # Total de aulas por sede, ya agregado al construir el cubo
+    df_grouped = cubo.sedes(selected_mun)
+    df_grouped = top_n(df_grouped, 'nombre_sede', 'total_aulas', MAX_SEDES, grupo='nombre_municipio')
+
+    fig_municipios = px.line(
+        df_grouped,
+        x='nombre_sede',
+        y='total_aulas',
+        color='nombre_municipio',
+        markers=True,
+        title="Comparativa de Aulas por Municipio y Sede Educativa",
+        height=600,
+        render_mode=modo_render(len(df_grouped))
+    )
+    fig_municipios.update_layout(
+        xaxis_title="Sede Educativa",
+        yaxis_title="Total de Aulas (Nuevas + Mejoradas)",
+        xaxis_tickangle=-45
+    )
+    st.plotly_chart(fig_municipios, use_container_width=True)
+
+# ===================================================================
+# Función: show_infraestructura_tab
+# ===================================================================
 def show_infraestructura_tab():
     st.title("🏫 Infraestructura Educativa por Municipio")
+    vueltas = cronometro('infraestructura')
 
-    if 'df_infra' not in st.session_state:
+    df_infra = leer_de_sesion('df_infra')
+    if df_infra is None:
         st.warning("Primero debes cargar la base de infraestructura en la pestaña 'Carga de Datos'.")
         return
 
-    df = st.session_state['df_infra'].copy()
-
-    # Normalizar nombres de columnas para facilidad
-    df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
+    # Columnas normalizadas, total de aulas y agregados (se calculan una vez por carga)
+    cubo = obtener_cubo_infraestructura(df_infra)
+    df = cubo.df
+    vueltas.marca('preparacion', filas=len(df))
 
     # Información descriptiva interactiva
     st.markdown("### 📊 Información General de la Base")
     col1, col2, col3 = st.columns(3)
     col1.metric("Total de Registros", f"{len(df):,}")
-    col2.metric("Departamentos", df['nombre_depto'].nunique())
-    col3.metric("Municipios", df['nombre_municipio'].nunique())
+    col2.metric("Departamentos", len(cubo.departamentos))
+    col3.metric("Municipios", cubo.n_municipios)
 
     st.info(
         "Esta base contiene información sobre el estado de infraestructura educativa, "
@@ -32,7 +93,7 @@ def show_infraestructura_tab():
     st.markdown("---")
     st.subheader("🏗️ Total de aulas nuevas y mejoradas por departamento")
 
-    df_grouped = df.groupby('nombre_depto')[['aulas_nuevas', 'aulas_mejoradas']].sum().reset_index()
+    df_grouped = cubo.por_departamento[['aulas_nuevas', 'aulas_mejoradas']].reset_index()
 
     fig = px.bar(
         df_grouped.melt(id_vars='nombre_depto', value_vars=['aulas_nuevas', 'aulas_mejoradas']),
@@ -44,19 +105,13 @@ def show_infraestructura_tab():
     )
     fig.update_layout(xaxis_title="Departamento", yaxis_title="Cantidad de Aulas", height=500)
     st.plotly_chart(fig, use_container_width=True)
+    vueltas.marca('aulas_departamento')
 
 
     st.markdown("---")
     st.subheader("🏆 Top 10 Municipios con Mayor Inversión en Aulas")
 
-    df['total_aulas'] = df[['aulas_nuevas', 'aulas_mejoradas']].sum(axis=1)
-    top_municipios = (
-        df.groupby(['nombre_depto', 'nombre_municipio'])['total_aulas']
-        .sum()
-        .reset_index()
-        .sort_values(by='total_aulas', ascending=False)
-        .head(10)
-    )
+    top_municipios = cubo.top_municipios(10)
 
     fig_top = px.bar(
         top_municipios,
@@ -73,63 +128,16 @@ def show_infraestructura_tab():
         yaxis=dict(categoryorder='total ascending')
     )
     st.plotly_chart(fig_top, use_container_width=True)
+    vueltas.marca('top_municipios')
 
 
 
 
 
-    st.markdown("---")
-    st.subheader("🔎 Tabla Interactiva: Proyectos por Departamento y Estado")
-
-    deptos = sorted(df['nombre_depto'].dropna().unique())
-    estados = sorted(df['estado_general'].dropna().unique())
-
-    col1, col2 = st.columns(2)
-    filtro_depto = col1.selectbox("Selecciona un Departamento", deptos)
-    filtro_estado = col2.selectbox("Selecciona un Estado de Obra", estados)
-
-    df_filtro = df[
-        (df['nombre_depto'] == filtro_depto) &
-        (df['estado_general'] == filtro_estado)
-    ][['nombre_municipio', 'nombre_sede', 'aulas_nuevas', 'aulas_mejoradas', 'estado_general']]
-
-    st.dataframe(df_filtro.reset_index(drop=True), use_container_width=True)
-
+    _tabla_proyectos(cubo)
+    vueltas.marca('tabla_proyectos')
 
 
-    st.markdown("---")
-    st.subheader("🏙️ Comparativa de Aulas por Municipio (Top 10 con más inversión)")
-
-    # Crear variable total de aulas
-    df['total_aulas'] = df[['aulas_nuevas', 'aulas_mejoradas']].sum(axis=1)
-
-    # Agrupar por municipio
-    df_mun = df.groupby(['nombre_municipio', 'nombre_depto'])['total_aulas'].sum().reset_index()
-
-    # Top 10 municipios
-    top_mun = df_mun.sort_values(by='total_aulas', ascending=False).head(10)
-    municipios_disp = top_mun['nombre_municipio'].tolist()
-
-    selected_mun = st.multiselect("Selecciona municipios a comparar", municipios_disp, default=municipios_disp[:3])
 
-    df_filtered = df[df['nombre_municipio'].isin(selected_mun)].copy()
-    df_filtered['total_aulas'] = df_filtered[['aulas_nuevas', 'aulas_mejoradas']].sum(axis=1)
-
-    # Contar cuántas sedes aportan al total por municipio
-    df_grouped = df_filtered.groupby(['nombre_municipio', 'nombre_sede'])['total_aulas'].sum().reset_index()
-
-    fig_municipios = px.line(
-        df_grouped,
-        x='nombre_sede',
-        y='total_aulas',
-        color='nombre_municipio',
-        markers=True,
-        title="Comparativa de Aulas por Municipio y Sede Educativa",
-        height=600
-    )
-    fig_municipios.update_layout(
-        xaxis_title="Sede Educativa",
-        yaxis_title="Total de Aulas (Nuevas + Mejoradas)",
-        xaxis_tickangle=-45
-    )
-    st.plotly_chart(fig_municipios, use_container_width=True)
+    _comparativa_municipios(cubo)
+    vueltas.marca('comparativa_sedes')
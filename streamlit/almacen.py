@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import streamlit as st
+
+# ===================================================================
+# Almacén de datos compartido entre sesiones
+# ===================================================================
+class AlmacenDatos:
+    """
+    Almacén de solo lectura, versionado y compartido por todas las sesiones del proceso.
+
+    Cada conjunto (`df_raw`, `df_infra`, `esquema`, ...) puede tener varias versiones.
+    Las sesiones guardan en `st.session_state` solo la versión que usan y toman una
+    referencia sobre ella; los objetos viven una sola vez en memoria y se entregan sin
+    copiarlos, por lo que **nunca deben modificarse**. Una versión que ya no es la
+    última y no tiene referencias vivas se desaloja. Las referencias de sesiones que
+    no han leído en `ttl_referencia` segundos se consideran abandonadas.
+
+    Los conjuntos marcados con `seguir_ultima` (los que refresca `refresco.py`) no
+    se fijan por sesión: cada lectura entrega la última versión publicada.
+
+    Args:
+        ttl_referencia (float): Segundos sin uso tras los que una referencia caduca.
+        reloj (callable): Fuente de tiempo (inyectable para pruebas).
+    """
+
+    def __init__(self, ttl_referencia: float = 60 * 60, reloj: Callable[[], float] = time.time):
+        self.ttl_referencia = ttl_referencia
+        self.reloj = reloj
+        self._lock = threading.RLock()
+        self._versiones = {}
+        self._referencias = {}
+        self._automaticos = set()
+
+    # ------------------------------------------------------------
+    # Publicación y lectura
+    # ------------------------------------------------------------
+    def publicar(self, nombre: str, objeto: Any, version: str) -> Any:
+        """
+        Registra `objeto` como la última versión de `nombre`.
+
+        Si la versión ya existe se conserva el objeto que ya estaba (deduplicación entre
+        sesiones que cargaron los mismos datos) y ese es el que se devuelve.
+        """
+        with self._lock:
+            versiones = self._versiones.setdefault(nombre, OrderedDict())
+            if version in versiones:
+                versiones.move_to_end(version)
+            else:
+                versiones[version] = objeto
+            self._desalojar(nombre)
+            return versiones[version]
+
+    def obtener(self, nombre: str, version: Optional[str] = None) -> Any:
+        """Objeto de la versión pedida (o la última si es None); None si no existe."""
+        with self._lock:
+            versiones = self._versiones.get(nombre)
+            if not versiones:
+                return None
+            if version is None:
+                version = next(reversed(versiones))
+            return versiones.get(version)
+
+    def ultima_version(self, nombre: str) -> Optional[str]:
+        with self._lock:
+            versiones = self._versiones.get(nombre)
+            return next(reversed(versiones)) if versiones else None
+
+    def seguir_ultima(self, nombre: str):
+        """Las sesiones pasan a leer siempre la última versión de `nombre`."""
+        with self._lock:
+            self._automaticos.add(nombre)
+
+    def sigue_ultima(self, nombre: str) -> bool:
+        with self._lock:
+            return nombre in self._automaticos
+
+    # ------------------------------------------------------------
+    # Conteo de referencias
+    # ------------------------------------------------------------
+    def adquirir(self, nombre: str, version: str, sesion: str):
+        with self._lock:
+            self._referencias.setdefault((nombre, version), {})[sesion] = self.reloj()
+
+    def liberar(self, nombre: str, version: str, sesion: str):
+        with self._lock:
+            self._referencias.get((nombre, version), {}).pop(sesion, None)
+            self._desalojar(nombre)
+
+    def referencias(self, nombre: str, version: str) -> int:
+        with self._lock:
+            return len(self._referencias_vivas(nombre, version))
+
+    def _referencias_vivas(self, nombre: str, version: str) -> dict:
+        limite = self.reloj() - self.ttl_referencia
+        refs = self._referencias.get((nombre, version), {})
+        for sesion in [s for s, t in refs.items() if t < limite]:
+            del refs[sesion]
+        return refs
+
+    def _desalojar(self, nombre: str):
+        versiones = self._versiones.get(nombre, {})
+        ultima = next(reversed(versiones), None)
+        for version in list(versiones):
+            if version != ultima and not self._referencias_vivas(nombre, version):
+                del versiones[version]
+                self._referencias.pop((nombre, version), None)
+
+    def estadisticas(self) -> list:
+        """Versiones retenidas y número de sesiones que las usan, por conjunto."""
+        with self._lock:
+            for nombre in list(self._versiones):
+                self._desalojar(nombre)
+            return [{'conjunto': nombre, 'version': version, 'sesiones': len(self._referencias_vivas(nombre, version))}
+                    for nombre, versiones in self._versiones.items() for version in versiones]
+
+# ===================================================================
+# Acceso desde las pestañas
+# ===================================================================
+@st.cache_resource
+def obtener_almacen() -> AlmacenDatos:
+    """Instancia única del almacén para todo el servidor de Streamlit."""
+    return AlmacenDatos()
+
+
+def _sesion_id() -> str:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def publicar_en_sesion(nombre: str, objeto: Any, version: str) -> Any:
+    """
+    Publica el objeto en el almacén compartido y hace que la sesión actual apunte a esa versión.
+
+    Returns:
+        Any: El objeto compartido (puede ser uno equivalente publicado antes por otra sesión).
+    """
+    almacen = obtener_almacen()
+    sesion = _sesion_id()
+    compartido = almacen.publicar(nombre, objeto, version)
+    anterior = st.session_state.get(f"version_{nombre}")
+    almacen.adquirir(nombre, version, sesion)
+    if anterior is not None and anterior != version:
+        almacen.liberar(nombre, anterior, sesion)
+    st.session_state[f"version_{nombre}"] = version
+    return compartido
+
+
+def leer_de_sesion(nombre: str) -> Any:
+    """
+    Objeto que usa la sesión actual, o None si la sesión aún no lo ha cargado.
+
+    Si la versión de la sesión ya fue desalojada se avisa y se devuelve None, para que
+    la pestaña pida volver a cargar en lugar de mostrar en silencio otros datos.
+    Los conjuntos con refresco automático entregan siempre la última versión, aunque
+    la sesión no haya cargado nada.
+    """
+    almacen = obtener_almacen()
+    version = st.session_state.get(f"version_{nombre}")
+    if almacen.sigue_ultima(nombre):
+        ultima = almacen.ultima_version(nombre)
+        if ultima is not None and ultima != version:
+            if version is not None:
+                almacen.liberar(nombre, version, _sesion_id())
+            version = st.session_state[f"version_{nombre}"] = ultima
+    if version is None:
+        return None
+    objeto = almacen.obtener(nombre, version)
+    if objeto is None:
+        almacen.liberar(nombre, version, _sesion_id())
+        del st.session_state[f"version_{nombre}"]
+        st.warning("Los datos que cargó esta sesión ya no están disponibles; vuelve a cargarlos.")
+        return None
+    almacen.adquirir(nombre, version, _sesion_id())
+    return objeto
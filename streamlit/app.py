@@ -1,26 +1,43 @@
 import streamlit as st
 
-from cargar_datos import show_data_tab
-from transformacion import show_transform_tab
-from visualizaciones import show_visualization_tab
-from mapa import show_map_tab
-from Infraestructura import show_infraestructura_tab
+# Solo streamlit y utilidades livianas: pandas, pyarrow, requests y el resto de la pila
+# de datos llegan con `etl` y `refresco`, que se importan después de dibujar la navegación
+from instrumentacion import ACTIVA_POR_DEFECTO, iniciar_rerun, medir, mostrar_panel, terminar_rerun
+from arranque import PESTANAS, importar, mostrar_arranque, obtener_precalentamiento, pagina_diferida
 
-# Crear pestañas en el cuerpo de la aplicación
-tabs = st.tabs(["📥 Carga de Datos", "🔧 Transformación y Métricas", "📊 Visualizaciones", "🗺️ Mapa","🏫 Infraestructura"])
+# Instrumentación opcional: mide cada pestaña y sus etapas en este rerun
+depurar = st.sidebar.checkbox("🐞 Panel de rendimiento", value=ACTIVA_POR_DEFECTO, key="panel_rendimiento")
+iniciar_rerun(depurar)
 
-# Mostrar contenido en cada pestaña
-with tabs[0]:
-    show_data_tab()
+# Navegación por páginas: en cada interacción solo se ejecuta la sección visible
+# (con st.tabs se ejecutaban todas, aunque estuvieran ocultas). Cada pestaña importa
+# su módulo (plotly, geopandas, folium...) la primera vez que se abre.
+pagina = st.navigation([
+    st.Page(pagina_diferida(*PESTANAS['carga']), title="Carga de Datos", icon="📥", default=True),
+    st.Page(pagina_diferida(*PESTANAS['transformacion']), title="Transformación y Métricas", icon="🔧",
+            url_path="transformacion"),
+    st.Page(pagina_diferida(*PESTANAS['visualizaciones']), title="Visualizaciones", icon="📊",
+            url_path="visualizaciones"),
+    st.Page(pagina_diferida(*PESTANAS['mapa']), title="Mapa", icon="🗺️", url_path="mapa"),
+    st.Page(pagina_diferida(*PESTANAS['infraestructura']), title="Infraestructura", icon="🏫",
+            url_path="infraestructura"),
+    st.Page(pagina_diferida(*PESTANAS['secuestros']), title="Secuestros", icon="🚨", url_path="secuestros"),
+], position="top")
 
-with tabs[1]:
-    show_transform_tab()
+# Artefactos precalculados con `etl.py` (se publican una vez por servidor, sin recalcular)
+importar('etl').obtener_artefactos()
 
-with tabs[2]:
-    show_visualization_tab()
+# Refresco de las bases en segundo plano: las sesiones leen la última versión publicada
+refresco = importar('refresco')
+refresco.mostrar_estado(refresco.obtener_refrescador())
 
-with tabs[3]:
-    show_map_tab()
+# Pestañas, shapefile y agregados se preparan en segundo plano al iniciar el servidor
+precalentamiento = obtener_precalentamiento()
 
-with tabs[4]:
-    show_infraestructura_tab()
\ No newline at end of file
+# Mostrar contenido de la página seleccionada
+with medir(f"pestaña.{pagina.url_path or 'carga'}"):
+    pagina.run()
+
+if depurar:
+    mostrar_arranque(precalentamiento)
+mostrar_panel(terminar_rerun())
@@ -0,0 +1,278 @@
+"""
+Arranque en frío del tablero: importaciones diferidas, precalentamiento y mediciones.
+
+`app.py` solo importa lo que necesita para dibujar la navegación; cada pestaña
+(y con ella plotly, geopandas, folium o streamlit_folium) se importa la primera vez
+que se abre. Al iniciar el servidor un hilo de fondo importa las pestañas y
+precalcula el shapefile simplificado, los conjuntos en caché y sus agregados, de
+modo que la primera sesión no espera por nada de eso. Los tiempos de cada
+importación y de cada etapa del precalentamiento quedan en el log
+(`diplomado.rendimiento`) y en el panel de rendimiento.
+
+Uso (desde la raíz del repositorio), para vigilar el arranque entre despliegues:
+    python streamlit/arranque.py --guardar .cache/benchmark/arranque.json
+    python streamlit/arranque.py --comparar .cache/benchmark/arranque.json --umbral 0.25
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+import streamlit as st
+
+from instrumentacion import logger, medir
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# "0" desactiva el precalentamiento en segundo plano al iniciar el servidor
+PRECALENTAR = os.environ.get("DIPLOMADO_PRECALENTAR", "1") not in ("", "0")
+
+DIRECTORIO_APP = Path(__file__).resolve().parent
+
+# Pestaña -> (módulo, función que la dibuja), en el orden en que se precalientan
+PESTANAS = {
+    'carga': ('cargar_datos', 'show_data_tab'),
+    'transformacion': ('transformacion', 'show_transform_tab'),
+    'visualizaciones': ('visualizaciones', 'show_visualization_tab'),
+    'mapa': ('mapa', 'show_map_tab'),
+    'infraestructura': ('Infraestructura', 'show_infraestructura_tab'),
+    'secuestros': ('secuestros', 'show_secuestros_tab'),
+}
+# Lo que `app.py` importa antes de dibujar la navegación (solo streamlit y utilidades
+# livianas) y lo que importa justo después, para los artefactos y el refresco
+MODULOS_INICIO = ['instrumentacion', 'arranque']
+MODULOS_SERVIDOR = ['etl', 'refresco']
+
+_lock = threading.Lock()
+_tiempos = {}
+
+# ===================================================================
+# Registro de tiempos del arranque
+# ===================================================================
+def _registrar(etapa: str, segundos: float, error: Optional[str] = None):
+    """Guarda la primera medición de cada etapa del proceso y la escribe en el log."""
+    with _lock:
+        if etapa in _tiempos:
+            return
+        _tiempos[etapa] = {'etapa': etapa, 'segundos': round(segundos, 5), 'error': error}
+    logger.info(json.dumps(_tiempos[etapa], ensure_ascii=False))
+
+
+def informe_arranque() -> 'pd.DataFrame':
+    """Importaciones y etapas de precalentamiento medidas en este proceso, en orden."""
+    import pandas as pd
+    with _lock:
+        filas = list(_tiempos.values())
+    return pd.DataFrame(filas, columns=['etapa', 'segundos', 'error'])
+
+# ===================================================================
+# Importaciones diferidas
+# ===================================================================
+def importar(modulo: str):
+    """
+    Importa un módulo y registra cuánto tardó la primera vez.
+
+    Siempre pasa por `importlib`, que espera si otro hilo (p. ej. el precalentamiento)
+    está a mitad de la misma importación, en lugar de devolver un módulo incompleto.
+    """
+    nuevo = modulo not in sys.modules
+    inicio = time.perf_counter()
+    with medir(f"importacion.{modulo}"):
+        cargado = importlib.import_module(modulo)
+    if nuevo:
+        _registrar(f"importacion.{modulo}", time.perf_counter() - inicio)
+    return cargado
+
+
+def pagina_diferida(modulo: str, funcion: str) -> Callable[[], None]:
+    """
+    Función para `st.Page` que importa el módulo de la pestaña solo al abrirla.
+
+    Lleva el nombre de la función original, así que la URL y el título que
+    Streamlit deduce de ella no cambian.
+    """
+    def mostrar():
+        getattr(importar(modulo), funcion)()
+    mostrar.__name__ = mostrar.__qualname__ = funcion
+    return mostrar
+
+# ===================================================================
+# Precalentamiento
+# ===================================================================
+class Precalentamiento:
+    """
+    Ejecuta en un hilo de fondo las etapas que de otro modo pagaría la primera sesión.
+
+    Cada etapa se mide por separado y un fallo solo se registra: la sesión que
+    necesite ese recurso lo calculará por su cuenta, como sin precalentamiento.
+
+    Args:
+        etapas (list): Pares (nombre, función sin argumentos).
+    """
+
+    def __init__(self, etapas: list):
+        self.etapas = etapas
+        self.terminado = threading.Event()
+        self.inicio = None
+        self.segundos = None
+        self._hilo = None
+
+    def ejecutar(self):
+        self.inicio = time.perf_counter()
+        for nombre, paso in self.etapas:
+            inicio, error = time.perf_counter(), None
+            try:
+                paso()
+            except Exception as e:
+                logger.warning("Precalentamiento de %s fallido: %s", nombre, e)
+                error = str(e)
+            _registrar(f"precalentamiento.{nombre}", time.perf_counter() - inicio, error)
+        self.segundos = time.perf_counter() - self.inicio
+        self.terminado.set()
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self.ejecutar, name="precalentamiento", daemon=True)
+            self._hilo.start()
+
+
+def _importar_pestanas():
+    for modulo, _ in PESTANAS.values():
+        importar(modulo)
+
+
+def _precalentar_geometria():
+    geometria = importar('geometria')
+    for nivel in geometria.TOLERANCIAS:
+        geometria.obtener_geojson(nivel)
+
+
+def _precalentar_datos():
+    # Copias locales de la caché, sin tocar la red; los agregados quedan memoizados
+    # por huella, así que la sesión que cargue la misma base los recibe sin recalcular
+    from cache_datos import obtener_cache
+    from cargar_datos import DATASET_INFRA, DATASET_MEN, PARAMS_INFRA, PARAMS_MEN
+    from cubo import obtener_cubo
+    from infra_analitica import obtener_cubo_infraestructura
+    from pipeline import build_star_schema
+
+    cache = obtener_cache()
+    df_raw = cache.leer(DATASET_MEN, PARAMS_MEN)
+    if df_raw is not None and not df_raw.empty:
+        obtener_cubo(build_star_schema(df_raw))
+    df_infra = cache.leer(DATASET_INFRA, PARAMS_INFRA)
+    if df_infra is not None and not df_infra.empty:
+        obtener_cubo_infraestructura(df_infra)
+
+
+def _precalentar_secuestros():
+    importar('base_secuestros').obtener_base_secuestros().actualizar()
+
+
+def etapas_por_defecto(datos: bool = True) -> list:
+    """
+    Etapas del precalentamiento del servidor.
+
+    Args:
+        datos (bool): Incluir los conjuntos en caché y sus agregados. El refrescador
+            ya los deriva en su primera vuelta, así que sobra cuando está activo.
+    """
+    etapas = [('pestanas', _importar_pestanas), ('geometria', _precalentar_geometria)]
+    if datos:
+        etapas.append(('datos', _precalentar_datos))
+    etapas.append(('secuestros', _precalentar_secuestros))
+    return etapas
+
+
+@st.cache_resource
+def obtener_precalentamiento() -> Optional[Precalentamiento]:
+    """Precalentamiento único del servidor, ya iniciado; None si DIPLOMADO_PRECALENTAR=0."""
+    if not PRECALENTAR:
+        return None
+    # `refresco` ya está importado: `app.py` inicia el refrescador antes que el precalentamiento
+    from refresco import INTERVALO_REFRESCO
+    precalentamiento = Precalentamiento(etapas_por_defecto(datos=INTERVALO_REFRESCO <= 0))
+    precalentamiento.iniciar()
+    return precalentamiento
+
+
+def mostrar_arranque(precalentamiento: Optional[Precalentamiento]):
+    """Tiempos de importación y de precalentamiento en la barra lateral (panel de rendimiento)."""
+    with st.sidebar:
+        st.markdown("### 🚀 Arranque del servidor")
+        if precalentamiento is None:
+            st.caption("Precalentamiento desactivado (DIPLOMADO_PRECALENTAR=0).")
+        elif precalentamiento.terminado.is_set():
+            st.caption(f"Precalentamiento terminado en {precalentamiento.segundos:.2f} s.")
+        else:
+            st.caption("⏳ Precalentamiento en curso...")
+        st.dataframe(informe_arranque(), hide_index=True, use_container_width=True)
+
+# ===================================================================
+# Medición en frío (línea de comandos)
+# ===================================================================
+def medir_importacion(modulo: str) -> float:
+    """Segundos que tarda importar `modulo` en un intérprete nuevo, con streamlit ya cargado."""
+    codigo = ("import time, streamlit\n"
+              "inicio = time.perf_counter()\n"
+              f"import {modulo}\n"
+              "print(time.perf_counter() - inicio)")
+    entorno = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(DIRECTORIO_APP),
+                                                                         os.environ.get('PYTHONPATH')]))}
+    salida = subprocess.run([sys.executable, "-c", codigo], env=entorno, capture_output=True, text=True, check=True)
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_arranque(repeticiones: int = 1, precalentar: bool = True, informar=print) -> dict:
+    """
+    Importación en frío de cada módulo y, opcionalmente, cada etapa del precalentamiento.
+
+    Con varias repeticiones se guarda el menor tiempo de importación. El resultado
+    tiene la forma de `benchmark.ejecutar`, así que se compara con `benchmark.comparar`.
+    """
+    etapas = {}
+    for modulo in MODULOS_INICIO + MODULOS_SERVIDOR + [m for m, _ in PESTANAS.values()]:
+        segundos = min(medir_importacion(modulo) for _ in range(repeticiones))
+        etapas[f"importacion.{modulo}"] = {'segundos': round(segundos, 5), 'pico_mb': None}
+        informar(f"  importacion.{modulo:<24} {segundos:>9.3f} s")
+    if precalentar:
+        Precalentamiento(etapas_por_defecto()).ejecutar()
+        for _, fila in informe_arranque().iterrows():
+            if fila['etapa'].startswith("precalentamiento."):
+                etapas[fila['etapa']] = {'segundos': fila['segundos'], 'pico_mb': None}
+                estado = f"  ⚠️ {fila['error']}" if fila['error'] else ""
+                informar(f"  {fila['etapa']:<35} {fila['segundos']:>9.3f} s{estado}")
+    return {
+        'metadatos': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+        },
+        'resultados': {'arranque': etapas},
+    }
+
+
+def main(argv: list = None) -> int:
+    from benchmark import guardar_y_comparar, UMBRAL
+
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío del tablero.")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--sin-precalentar", action="store_true", help="Medir solo las importaciones.")
+    parser.add_argument("--guardar", type=Path, help="Guarda los resultados como línea base (JSON).")
+    parser.add_argument("--comparar", type=Path, help="Línea base contra la que comparar.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL, help="Fracción de empeoramiento tolerada.")
+    args = parser.parse_args(argv)
+
+    resultados = medir_arranque(args.repeticiones, not args.sin_precalentar)
+    return guardar_y_comparar(resultados, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from cache_datos import DIRECTORIO_CACHE
+from modelo_incremental import CLAVE_GEO, METRICAS
+
+RUTA_BD = Path(os.environ.get("DIPLOMADO_BD", DIRECTORIO_CACHE.parent / "educacion.db"))
+FILAS_POR_LOTE = 50_000
+
+MAX_VERSIONES = 3  # versiones del modelo que conviven en la base (sesiones fijadas a versiones anteriores)
+VERSION_ESQUEMA_BD = 2  # se incrementa al cambiar el DDL; una base de otro esquema se recrea
+
+_TABLAS = ['fact_educacion', 'dim_geo', 'dim_tiempo', 'versiones', 'meta']
+_DDL = [
+    """CREATE TABLE IF NOT EXISTS versiones (version TEXT PRIMARY KEY, uso INTEGER NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS dim_tiempo (
+           version TEXT NOT NULL REFERENCES versiones (version),
+           id_tiempo INTEGER NOT NULL,
+           a_o INTEGER NOT NULL,
+           PRIMARY KEY (version, id_tiempo))""",
+    """CREATE TABLE IF NOT EXISTS dim_geo (
+           version TEXT NOT NULL REFERENCES versiones (version),
+           id_geo INTEGER NOT NULL,
+           c_digo_departamento TEXT,
+           departamento TEXT,
+           municipio TEXT,
+           PRIMARY KEY (version, id_geo))""",
+    f"""CREATE TABLE IF NOT EXISTS fact_educacion (
+           version TEXT NOT NULL,
+           id_tiempo INTEGER NOT NULL,
+           id_geo INTEGER NOT NULL,
+           {', '.join(f'{m} REAL' for m in METRICAS)},
+           FOREIGN KEY (version, id_tiempo) REFERENCES dim_tiempo (version, id_tiempo),
+           FOREIGN KEY (version, id_geo) REFERENCES dim_geo (version, id_geo))""",
+    """CREATE UNIQUE INDEX IF NOT EXISTS ix_dim_tiempo_a_o ON dim_tiempo (version, a_o)""",
+    """CREATE INDEX IF NOT EXISTS ix_dim_geo_departamento ON dim_geo (version, departamento)""",
+    """CREATE INDEX IF NOT EXISTS ix_dim_geo_codigo ON dim_geo (version, c_digo_departamento)""",
+    """CREATE INDEX IF NOT EXISTS ix_fact_tiempo_geo ON fact_educacion (version, id_tiempo, id_geo)""",
+    """CREATE INDEX IF NOT EXISTS ix_fact_geo ON fact_educacion (version, id_geo)""",
+]
+
+# Las dimensiones se unen dentro de la misma versión que los hechos
+_UNIONES = (" JOIN dim_tiempo t ON t.version = h.version AND t.id_tiempo = h.id_tiempo"
+            " JOIN dim_geo g ON g.version = h.version AND g.id_geo = h.id_geo")
+
+# Los identificadores no pueden ir como parámetros: solo se aceptan columnas conocidas
+_AGRUPABLES = {'a_o': 't.a_o', **{c: f'g.{c}' for c in CLAVE_GEO}}
+
+# ===================================================================
+# Base analítica local (SQLite)
+# ===================================================================
+class BaseAnalitica:
+    """
+    Copia indexada del modelo estrella en SQLite para consultar con SQL parametrizado.
+
+    Las tablas `dim_tiempo`, `dim_geo` y `fact_educacion` llevan la versión del modelo
+    en cada fila y guardan hasta `max_versiones` versiones: una sesión fijada a una
+    versión anterior sigue consultando sus propios datos mientras otra carga la nueva,
+    y toda consulta recibe la versión que quiere leer. Cada versión se carga por lotes
+    con `executemany` dentro de una sola transacción; al superar el máximo se borra
+    la usada hace más tiempo. Las consultas usan un pool de conexiones (modo WAL:
+    varias lecturas a la vez mientras otra conexión escribe), de modo que filtros y
+    agregaciones se resuelven en la base y cada sesión recibe solo el resultado.
+
+    Args:
+        ruta (Path): Archivo de la base de datos.
+        max_conexiones (int): Tamaño del pool.
+        max_versiones (int): Versiones del modelo que se conservan.
+    """
+
+    def __init__(self, ruta: Path = RUTA_BD, max_conexiones: int = 4, max_versiones: int = MAX_VERSIONES):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.max_versiones = max_versiones
+        self._pool = queue.Queue(maxsize=max_conexiones)
+        for _ in range(max_conexiones):
+            self._pool.put(self._conectar())
+        self._lock = threading.Lock()
+        self._cargadas = set()  # versiones que este proceso ya vio en la base (sin consultarla de nuevo)
+        with self.conexion() as con:
+            with con:
+                if con.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA_BD:
+                    # Base de un esquema anterior (una sola versión, sin columna `version`): se recrea
+                    for tabla in _TABLAS:
+                        con.execute(f"DROP TABLE IF EXISTS {tabla}")
+                    con.execute(f"PRAGMA user_version = {VERSION_ESQUEMA_BD}")
+                for sentencia in _DDL:
+                    con.execute(sentencia)
+
+    def _conectar(self) -> sqlite3.Connection:
+        # Nombres URI: `importar` adjunta otras bases en modo de solo lectura
+        con = sqlite3.connect(self.ruta.resolve().as_uri(), uri=True, check_same_thread=False, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA temp_store=MEMORY")
+        con.execute("PRAGMA foreign_keys=ON")
+        return con
+
+    @contextmanager
+    def conexion(self):
+        """Toma una conexión del pool y la devuelve al terminar."""
+        con = self._pool.get()
+        try:
+            yield con
+        finally:
+            self._pool.put(con)
+
+    def cerrar(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # ------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------
+    @property
+    def versiones(self) -> list:
+        """Versiones del modelo cargadas en la base, de la usada más recientemente a la más antigua."""
+        with self.conexion() as con:
+            return [v for (v,) in con.execute("SELECT version FROM versiones ORDER BY uso DESC")]
+
+    def sincronizar(self, esquema) -> bool:
+        """
+        Carga la versión del modelo en la base si aún no está.
+
+        Una versión ya vista por el proceso se reconoce sin tocar la base, así que
+        llamarla en cada rerun (o en cada fragmento) no cuesta una transacción. La
+        marca de uso que decide el desalojo se escribe solo al cargar la versión o
+        la primera vez que el proceso la encuentra ya cargada.
+
+        Args:
+            esquema (StarSchema): Modelo con `dim_tiempo`, `dim_geo`, `df_fact` y `version`.
+
+        Returns:
+            bool: True si se escribió la versión, False si ya estaba cargada.
+        """
+        version = esquema.version
+        if version in self._cargadas:
+            return False
+        with self._lock, self.conexion() as con:
+            if version in self._cargadas:
+                return False
+            with con:
+                uso = con.execute("SELECT COALESCE(MAX(uso), 0) + 1 FROM versiones").fetchone()[0]
+                if con.execute("UPDATE versiones SET uso = ? WHERE version = ?", (uso, version)).rowcount:
+                    self._cargadas.add(version)
+                    return False
+                con.execute("INSERT INTO versiones (version, uso) VALUES (?, ?)", (version, uso))
+                _insertar(con, 'dim_tiempo', esquema.dim_tiempo[['id_tiempo', 'a_o']].assign(version=version))
+                _insertar(con, 'dim_geo', esquema.dim_geo[['id_geo'] + CLAVE_GEO].assign(version=version))
+                _insertar(con, 'fact_educacion',
+                          esquema.df_fact[['id_tiempo', 'id_geo'] + METRICAS].assign(version=version))
+                self._desalojar(con)
+            self._cargadas.add(version)
+            con.execute("ANALYZE")
+        return True
+
+    def importar(self, ruta: Path) -> list:
+        """
+        Copia a esta base las versiones de otra base (p. ej. la que deja `etl.py`) que aún no tiene.
+
+        La otra base se adjunta en modo de solo lectura y las filas se copian con
+        `INSERT ... SELECT` dentro de SQLite: el artefacto nunca se escribe ni queda
+        abierto, así que `etl.py` puede borrarlo cuando deje de conservar su versión.
+
+        Returns:
+            list: Versiones copiadas (vacía si ya estaban o la otra base es de otro esquema).
+        """
+        with self._lock, self.conexion() as con:
+            con.execute("ATTACH DATABASE ? AS origen", (Path(ruta).resolve().as_uri() + "?mode=ro",))
+            try:
+                if con.execute("PRAGMA origen.user_version").fetchone()[0] != VERSION_ESQUEMA_BD:
+                    return []
+                with con:
+                    nuevas = [v for (v,) in con.execute("SELECT version FROM origen.versiones WHERE version "
+                                                        "NOT IN (SELECT version FROM main.versiones)")]
+                    for version in nuevas:
+                        con.execute("INSERT INTO main.versiones (version, uso) "
+                                    "SELECT ?, COALESCE(MAX(uso), 0) + 1 FROM main.versiones", (version,))
+                        for tabla in ['dim_tiempo', 'dim_geo', 'fact_educacion']:
+                            con.execute(f"INSERT INTO main.{tabla} SELECT * FROM origen.{tabla} WHERE version = ?",
+                                        (version,))
+                    self._desalojar(con)
+            finally:
+                con.execute("DETACH DATABASE origen")
+            if nuevas:
+                con.execute("ANALYZE")
+        return nuevas
+
+    def _desalojar(self, con: sqlite3.Connection):
+        """Borra las versiones usadas hace más tiempo por encima de `max_versiones` (dentro de la transacción)."""
+        antiguas = [v for (v,) in con.execute("SELECT version FROM main.versiones ORDER BY uso DESC "
+                                              "LIMIT -1 OFFSET ?", (self.max_versiones,))]
+        for tabla in ['fact_educacion', 'dim_geo', 'dim_tiempo', 'versiones']:
+            con.executemany(f"DELETE FROM main.{tabla} WHERE version = ?", [(v,) for v in antiguas])
+        self._cargadas.difference_update(antiguas)
+
+    # ------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------
+    def consultar(self, sql: str, parametros: Iterable = ()) -> pd.DataFrame:
+        """Ejecuta una consulta parametrizada y devuelve el resultado como DataFrame."""
+        with self.conexion() as con:
+            return pd.read_sql_query(sql, con, params=list(parametros))
+
+    def agregar(self, version: str, metricas: list, por: list, funcion: str = 'AVG', departamentos: list = None,
+                anios: list = None, orden: str = None, descendente: bool = True, limite: int = None) -> pd.DataFrame:
+        """
+        Agregación de la tabla de hechos resuelta en SQL.
+
+        Args:
+            version (str): Versión del modelo a consultar (la de `sincronizar`).
+            metricas (list): Métricas a agregar (columnas de `fact_educacion`).
+            por (list): Columnas de agrupación (`a_o` o columnas de `dim_geo`).
+            funcion (str): 'AVG', 'SUM', 'MIN', 'MAX' o 'COUNT'.
+            departamentos, anios (list, opcional): Filtros (parámetros de la consulta).
+            orden (str, opcional): Métrica por la que ordenar el resultado.
+            limite (int, opcional): Número máximo de filas.
+
+        Raises:
+            ValueError: Si una métrica, columna o función no es válida.
+        """
+        _validar(metricas, METRICAS)
+        _validar(por, _AGRUPABLES)
+        funcion = funcion.upper()
+        if funcion not in ('AVG', 'SUM', 'MIN', 'MAX', 'COUNT'):
+            raise ValueError(f"Función de agregación no soportada: {funcion}")
+
+        grupos = ', '.join(_AGRUPABLES[c] for c in por)
+        columnas = ', '.join(f"{funcion}(h.{m}) AS {m}" for m in metricas)
+        where, parametros = _filtros(version, departamentos, anios)
+        sql = (f"SELECT {grupos}, {columnas} FROM fact_educacion h{_UNIONES}{where} GROUP BY {grupos}")
+        if orden is not None:
+            _validar([orden], metricas)
+            sql += f" ORDER BY {orden} {'DESC' if descendente else 'ASC'}"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(int(limite))
+        return self.consultar(sql, parametros)
+
+    def hechos(self, version: str, metricas: list, departamentos: list = None, anios: list = None) -> pd.DataFrame:
+        """Filas de hechos (con año y geografía) de una versión del modelo, filtradas en la base."""
+        _validar(metricas, METRICAS)
+        columnas = ', '.join(f"h.{m}" for m in metricas)
+        where, parametros = _filtros(version, departamentos, anios)
+        sql = (f"SELECT t.a_o, g.c_digo_departamento, g.departamento, g.municipio, {columnas} "
+               f"FROM fact_educacion h{_UNIONES}{where}")
+        return self.consultar(sql, parametros)
+
+
+def _validar(columnas: list, permitidas):
+    desconocidas = [c for c in columnas if c not in permitidas]
+    if desconocidas:
+        raise ValueError(f"Columnas no válidas: {desconocidas}")
+
+
+def _filtros(version: str, departamentos: list = None, anios: list = None) -> tuple:
+    condiciones, parametros = ["h.version = ?"], [str(version)]
+    if departamentos is not None:
+        condiciones.append(f"g.departamento IN ({', '.join('?' * len(departamentos))})")
+        parametros.extend(str(d) for d in departamentos)
+    if anios is not None:
+        condiciones.append(f"t.a_o IN ({', '.join('?' * len(anios))})")
+        parametros.extend(int(a) for a in anios)
+    return f" WHERE {' AND '.join(condiciones)}", parametros
+
+
+def _insertar(con: sqlite3.Connection, tabla: str, df: pd.DataFrame):
+    """Inserta el DataFrame por lotes con `executemany` (la transacción la abre quien llama)."""
+    marcadores = ', '.join('?' * len(df.columns))
+    sql = f"INSERT INTO {tabla} ({', '.join(df.columns)}) VALUES ({marcadores})"
+    for inicio in range(0, len(df), FILAS_POR_LOTE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_LOTE].astype(object)
+        bloque = bloque.where(bloque.notna(), None)
+        con.executemany(sql, [tuple(v.item() if hasattr(v, 'item') else v for v in fila)
+                              for fila in bloque.itertuples(index=False, name=None)])
+
+# ===================================================================
+# Función: obtener_base
+# ===================================================================
+@lru_cache(maxsize=None)
+def obtener_base() -> BaseAnalitica:
+    """Base analítica única del proceso, guardada en RUTA_BD."""
+    return BaseAnalitica(RUTA_BD)
@@ -0,0 +1,327 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from cache_datos import DIRECTORIO_CACHE
+
+RUTA_SECUESTROS = "Datos/Secuestros.db"
+RUTA_DERIVADA = DIRECTORIO_CACHE.parent / "secuestros.db"
+
+_DDL = [
+    """CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)""",
+    """CREATE TABLE IF NOT EXISTS hechos (
+           indice INTEGER PRIMARY KEY,
+           fecha TEXT NOT NULL,
+           anio INTEGER NOT NULL,
+           mes INTEGER NOT NULL,
+           cod_depto INTEGER,
+           departamento TEXT,
+           cod_muni INTEGER,
+           municipio TEXT,
+           tipo_delito TEXT,
+           cantidad INTEGER NOT NULL)""",
+    """CREATE INDEX IF NOT EXISTS ix_hechos_fecha ON hechos (fecha)""",
+    """CREATE INDEX IF NOT EXISTS ix_hechos_depto_fecha ON hechos (cod_depto, fecha)""",
+    """CREATE INDEX IF NOT EXISTS ix_hechos_tipo_fecha ON hechos (tipo_delito, fecha)""",
+    """CREATE INDEX IF NOT EXISTS ix_hechos_muni_fecha ON hechos (cod_muni, fecha)""",
+    # Agregados por periodo: las series y el mapa no recorren las filas individuales
+    """CREATE TABLE IF NOT EXISTS resumen_mensual (
+           anio INTEGER, mes INTEGER, cod_depto INTEGER, tipo_delito TEXT,
+           cantidad INTEGER, registros INTEGER,
+           PRIMARY KEY (anio, mes, cod_depto, tipo_delito))""",
+    """CREATE TABLE IF NOT EXISTS resumen_anual (
+           anio INTEGER, cod_depto INTEGER, tipo_delito TEXT,
+           cantidad INTEGER, registros INTEGER,
+           PRIMARY KEY (anio, cod_depto, tipo_delito))""",
+    """CREATE INDEX IF NOT EXISTS ix_mensual_depto ON resumen_mensual (cod_depto, anio, mes)""",
+    """CREATE INDEX IF NOT EXISTS ix_mensual_tipo ON resumen_mensual (tipo_delito, anio, mes)""",
+    """CREATE TABLE IF NOT EXISTS departamentos (cod_depto INTEGER PRIMARY KEY, departamento TEXT)""",
+]
+
+GRANULARIDADES = ('dia', 'mes', 'anio')
+
+# ===================================================================
+# Filtro de consulta
+# ===================================================================
+@dataclass(frozen=True)
+class FiltroSecuestros:
+    """
+    Filtros comunes a todas las consultas (None = sin filtro).
+
+    Attributes:
+        desde, hasta (date): Rango de fechas, ambos extremos incluidos.
+        departamentos (tuple): Códigos DANE de departamento (enteros).
+        tipos (tuple): Valores de `tipo_delito`.
+    """
+    desde: Optional[date] = None
+    hasta: Optional[date] = None
+    departamentos: Optional[tuple] = None
+    tipos: Optional[tuple] = None
+
+    @property
+    def por_meses(self) -> bool:
+        """True si el rango cae en límites de mes y puede resolverse con `resumen_mensual`."""
+        desde_ok = self.desde is None or self.desde.day == 1
+        hasta_ok = self.hasta is None or (pd.Timestamp(self.hasta) + pd.Timedelta(days=1)).day == 1
+        return desde_ok and hasta_ok
+
+    def sql(self, resumen: bool = False) -> tuple:
+        """Cláusula WHERE y parámetros, sobre `hechos` o sobre las tablas de resumen."""
+        condiciones, parametros = [], []
+        if resumen:
+            if self.desde is not None:
+                condiciones.append("(anio * 100 + mes) >= ?")
+                parametros.append(self.desde.year * 100 + self.desde.month)
+            if self.hasta is not None:
+                condiciones.append("(anio * 100 + mes) <= ?")
+                parametros.append(self.hasta.year * 100 + self.hasta.month)
+        else:
+            if self.desde is not None:
+                condiciones.append("fecha >= ?")
+                parametros.append(self.desde.isoformat())
+            if self.hasta is not None:
+                condiciones.append("fecha <= ?")
+                parametros.append(self.hasta.isoformat())
+        if self.departamentos is not None:
+            condiciones.append(f"cod_depto IN ({', '.join('?' * len(self.departamentos))})")
+            parametros.extend(int(d) for d in self.departamentos)
+        if self.tipos is not None:
+            condiciones.append(f"tipo_delito IN ({', '.join('?' * len(self.tipos))})")
+            parametros.extend(str(t) for t in self.tipos)
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return where, parametros
+
+# ===================================================================
+# Base derivada de secuestros
+# ===================================================================
+class BaseSecuestros:
+    """
+    Copia indexada de `Datos/Secuestros.db` con fecha ya interpretada y agregados por periodo.
+
+    La base original solo tiene índice sobre la columna `index` y guarda la fecha como
+    texto ('1996-01-01T00:00:00.000'), así que cualquier filtro la recorre completa.
+    Aquí se mantiene, sin modificar el archivo original, una base derivada con la
+    fecha en ISO ('YYYY-MM-DD'), año y mes como enteros, índices compuestos por
+    departamento, municipio y tipo de delito, y las tablas `resumen_mensual` y
+    `resumen_anual`. Cuando el origen solo crece (filas con `index` mayor al último
+    copiado, con el conteo y la suma de las anteriores intactos) se copian las filas
+    nuevas y se recalculan únicamente los meses y años afectados; cualquier otro
+    cambio reconstruye la base.
+
+    Args:
+        origen (str): Base SQLite original.
+        ruta (Path): Base derivada.
+        max_conexiones (int): Tamaño del pool de conexiones de lectura.
+    """
+
+    def __init__(self, origen: str = RUTA_SECUESTROS, ruta: Path = RUTA_DERIVADA, max_conexiones: int = 4):
+        self.origen = str(origen)
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool = queue.Queue(maxsize=max_conexiones)
+        for _ in range(max_conexiones):
+            con = sqlite3.connect(self.ruta, check_same_thread=False, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._pool.put(con)
+        with self.conexion() as con:
+            with con:
+                for sentencia in _DDL:
+                    con.execute(sentencia)
+
+    @contextmanager
+    def conexion(self):
+        """Toma una conexión del pool y la devuelve al terminar."""
+        con = self._pool.get()
+        try:
+            yield con
+        finally:
+            self._pool.put(con)
+
+    # ------------------------------------------------------------
+    # Sincronización con el origen
+    # ------------------------------------------------------------
+    def actualizar(self) -> int:
+        """
+        Lleva la base derivada al estado del origen.
+
+        Returns:
+            int: Filas copiadas (0 si ya estaba al día).
+
+        Raises:
+            FileNotFoundError: Si no existe la base de origen.
+        """
+        if not os.path.exists(self.origen):
+            raise FileNotFoundError(self.origen)
+        info = os.stat(self.origen)
+        firma = f"{info.st_size}:{int(info.st_mtime)}"
+
+        with self._lock, self.conexion() as con:
+            meta = dict(con.execute("SELECT clave, valor FROM meta").fetchall())
+            if meta.get('firma') == firma:
+                return 0
+            con.execute("ATTACH DATABASE ? AS origen", (self.origen,))
+            try:
+                with con:
+                    ultimo = int(meta.get('ultimo_indice', -1))
+                    copiadas = (int(meta.get('filas', 0)), int(meta.get('suma', 0)))
+                    previas = con.execute('SELECT COUNT(*), COALESCE(SUM(cantidad), 0) FROM origen.Secuestros '
+                                          'WHERE "index" <= ?', (ultimo,)).fetchone()
+                    if tuple(previas) != copiadas:
+                        # El origen cambió en filas ya copiadas: se reconstruye todo
+                        for tabla in ('hechos', 'resumen_mensual', 'resumen_anual', 'departamentos'):
+                            con.execute(f"DELETE FROM {tabla}")
+                        ultimo = -1
+
+                    nuevas = con.execute("""
+                        INSERT INTO hechos (indice, fecha, anio, mes, cod_depto, departamento,
+                                            cod_muni, municipio, tipo_delito, cantidad)
+                        SELECT "index", substr(fecha_hecho, 1, 10),
+                               CAST(substr(fecha_hecho, 1, 4) AS INTEGER),
+                               CAST(substr(fecha_hecho, 6, 2) AS INTEGER),
+                               cod_depto, departamento, cod_muni, municipio, tipo_delito,
+                               COALESCE(cantidad, 0)
+                        FROM origen.Secuestros WHERE "index" > ?""", (ultimo,)).rowcount
+                    self._recalcular_resumenes(con, ultimo)
+
+                    total, suma, maximo = con.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(cantidad), 0), COALESCE(MAX(indice), -1) FROM hechos").fetchone()
+                    con.executemany("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)",
+                                    [('firma', firma), ('filas', str(total)), ('suma', str(suma)),
+                                     ('ultimo_indice', str(maximo))])
+            finally:
+                con.execute("DETACH DATABASE origen")
+            con.execute("ANALYZE")
+            return nuevas
+
+    @staticmethod
+    def _recalcular_resumenes(con: sqlite3.Connection, desde_indice: int):
+        """Recalcula los agregados de los meses y años que tienen filas con índice mayor a `desde_indice`."""
+        con.execute("""CREATE TEMP TABLE IF NOT EXISTS meses_afectados (anio INTEGER, mes INTEGER)""")
+        con.execute("DELETE FROM meses_afectados")
+        con.execute("INSERT INTO meses_afectados SELECT DISTINCT anio, mes FROM hechos WHERE indice > ?",
+                    (desde_indice,))
+
+        con.execute("""DELETE FROM resumen_mensual
+                       WHERE (anio, mes) IN (SELECT anio, mes FROM meses_afectados)""")
+        con.execute("""INSERT INTO resumen_mensual
+                       SELECT h.anio, h.mes, h.cod_depto, h.tipo_delito, SUM(h.cantidad), COUNT(*)
+                       FROM hechos h JOIN meses_afectados m ON m.anio = h.anio AND m.mes = h.mes
+                       GROUP BY h.anio, h.mes, h.cod_depto, h.tipo_delito""")
+
+        con.execute("""DELETE FROM resumen_anual
+                       WHERE anio IN (SELECT DISTINCT anio FROM meses_afectados)""")
+        con.execute("""INSERT INTO resumen_anual
+                       SELECT anio, cod_depto, tipo_delito, SUM(cantidad), SUM(registros)
+                       FROM resumen_mensual
+                       WHERE anio IN (SELECT DISTINCT anio FROM meses_afectados)
+                       GROUP BY anio, cod_depto, tipo_delito""")
+
+        con.execute("""INSERT OR REPLACE INTO departamentos
+                       SELECT cod_depto, MAX(departamento) FROM hechos
+                       WHERE indice > ? GROUP BY cod_depto""", (desde_indice,))
+
+    # ------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------
+    def _consultar(self, sql: str, parametros: list, formato: str = 'pandas'):
+        with self.conexion() as con:
+            cursor = con.execute(sql, parametros)
+            columnas = [d[0] for d in cursor.description]
+            df = pd.DataFrame.from_records(cursor.fetchall(), columns=columnas)
+        if formato == 'arrow':
+            return pa.Table.from_pandas(df, preserve_index=False)
+        return df
+
+    def rango_fechas(self) -> tuple:
+        """(primera, última) fecha disponible como `date`, o (None, None) si está vacía."""
+        with self.conexion() as con:
+            minimo, maximo = con.execute("SELECT MIN(fecha), MAX(fecha) FROM hechos").fetchone()
+        if minimo is None:
+            return None, None
+        return date.fromisoformat(minimo), date.fromisoformat(maximo)
+
+    def tipos(self) -> list:
+        with self.conexion() as con:
+            return [t for (t,) in con.execute("SELECT DISTINCT tipo_delito FROM resumen_anual ORDER BY 1")]
+
+    def departamentos(self) -> pd.DataFrame:
+        """Códigos y nombres de los departamentos presentes."""
+        return self._consultar("SELECT cod_depto, departamento FROM departamentos ORDER BY departamento", [])
+
+    def serie(self, filtro: FiltroSecuestros = FiltroSecuestros(), granularidad: str = 'mes',
+              por_tipo: bool = False, formato: str = 'pandas'):
+        """
+        Casos por periodo.
+
+        Con granularidad 'mes' o 'anio' y un rango alineado a meses la consulta se
+        resuelve sobre `resumen_mensual`; en otro caso usa `hechos` con sus índices.
+
+        Args:
+            filtro (FiltroSecuestros): Filtros de la consulta.
+            granularidad (str): 'dia', 'mes' o 'anio'.
+            por_tipo (bool): Si se separa la serie por `tipo_delito`.
+            formato (str): 'pandas' o 'arrow'.
+
+        Returns:
+            DataFrame o pyarrow.Table con `periodo` (fecha de inicio), [`tipo_delito`,] `cantidad`.
+
+        Raises:
+            ValueError: Si la granularidad no es válida.
+        """
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad no soportada: {granularidad}")
+        usar_resumen = granularidad != 'dia' and filtro.por_meses
+        where, parametros = filtro.sql(resumen=usar_resumen)
+        if granularidad == 'dia':
+            periodo = "fecha"
+        elif granularidad == 'mes':
+            periodo = "printf('%04d-%02d-01', anio, mes)"
+        else:
+            periodo = "printf('%04d-01-01', anio)"
+        grupos = f"{periodo}{', tipo_delito' if por_tipo else ''}"
+        tabla = "resumen_mensual" if usar_resumen else "hechos"
+        sql = (f"SELECT {periodo} AS periodo{', tipo_delito' if por_tipo else ''}, SUM(cantidad) AS cantidad "
+               f"FROM {tabla}{where} GROUP BY {grupos} ORDER BY 1")
+        resultado = self._consultar(sql, parametros)
+        resultado['periodo'] = pd.to_datetime(resultado['periodo'])
+        if formato == 'arrow':
+            return pa.Table.from_pandas(resultado, preserve_index=False)
+        return resultado
+
+    def por_departamento(self, filtro: FiltroSecuestros = FiltroSecuestros(), por_anio: bool = False,
+                         por_tipo: bool = False, formato: str = 'pandas'):
+        """
+        Casos por departamento (y opcionalmente por año y tipo), listos para el mapa.
+
+        Returns:
+            DataFrame o pyarrow.Table con `cod_depto`, `departamento`, [`anio`,] [`tipo_delito`,] `cantidad`.
+        """
+        usar_resumen = filtro.por_meses
+        where, parametros = filtro.sql(resumen=usar_resumen)
+        extra = (", r.anio" if por_anio else "") + (", r.tipo_delito" if por_tipo else "")
+        tabla = "resumen_mensual" if usar_resumen else "hechos"
+        sql = (f"SELECT r.cod_depto, d.departamento{extra}, SUM(r.cantidad) AS cantidad "
+               f"FROM (SELECT * FROM {tabla}{where}) r "
+               f"LEFT JOIN departamentos d ON d.cod_depto = r.cod_depto "
+               f"GROUP BY r.cod_depto{extra} ORDER BY cantidad DESC")
+        return self._consultar(sql, parametros, formato)
+
+# ===================================================================
+# Función: obtener_base_secuestros
+# ===================================================================
+@lru_cache(maxsize=None)
+def obtener_base_secuestros() -> BaseSecuestros:
+    """Base derivada única del proceso (se actualiza con `actualizar()`)."""
+    return BaseSecuestros()
@@ -0,0 +1,342 @@
+"""
+Mediciones de rendimiento del flujo carga → transformación → visualización.
+
+Genera datos sintéticos con la forma de la API del MEN y de la base de
+infraestructura, mide cada etapa (tiempo de pared y pico de memoria con
+`tracemalloc`) y compara contra una línea base guardada en JSON.
+
+Uso (desde la raíz del repositorio):
+    python streamlit/benchmark.py --filas 10000 100000 --guardar .cache/benchmark/base.json
+    python streamlit/benchmark.py --filas 10000 100000 --comparar .cache/benchmark/base.json --umbral 0.25
+
+El proceso termina con código 1 si alguna etapa empeora más que el umbral.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cargar_datos import DATASET_MEN, load_data_from_api
+from cubo import CuboOLAP
+from exportar import exportar_esquema
+from infra_analitica import CuboInfraestructura
+from mapa_capas import construir_mapa
+from modelo_incremental import ModeloIncremental
+from pipeline import limpiar_datos, preparar_infraestructura, StarSchema
+from socrata_local import ServidorSocrataLocal
+
+TAMANOS = [10_000, 100_000, 1_000_000, 10_000_000]
+MAX_FILAS_API = 200_000
+UMBRAL = 0.25
+MINIMO_SEGUNDOS = 0.02
+
+_DEPARTAMENTOS = [
+    ('05', 'ANTIOQUIA'), ('08', 'ATLÁNTICO'), ('11', 'BOGOTÁ, D.C.'), ('13', 'BOLÍVAR'), ('15', 'BOYACÁ'),
+    ('17', 'CALDAS'), ('18', 'CAQUETÁ'), ('19', 'CAUCA'), ('20', 'CESAR'), ('23', 'CÓRDOBA'),
+    ('25', 'CUNDINAMARCA'), ('27', 'CHOCÓ'), ('41', 'HUILA'), ('44', 'LA GUAJIRA'), ('47', 'MAGDALENA'),
+    ('50', 'META'), ('52', 'NARIÑO'), ('54', 'NORTE DE SANTANDER'), ('63', 'QUINDÍO'), ('66', 'RISARALDA'),
+    ('68', 'SANTANDER'), ('70', 'SUCRE'), ('73', 'TOLIMA'), ('76', 'VALLE DEL CAUCA'), ('81', 'ARAUCA'),
+    ('85', 'CASANARE'), ('86', 'PUTUMAYO'), ('88', 'ARCHIPIÉLAGO DE SAN ANDRÉS, PROVIDENCIA Y SANTA CATALINA'),
+    ('91', 'AMAZONAS'), ('94', 'GUAINÍA'), ('95', 'GUAVIARE'), ('97', 'VAUPÉS'), ('99', 'VICHADA'),
+]
+
+# ===================================================================
+# Datos sintéticos
+# ===================================================================
+def generar_men(filas: int, anios: int = 15, semilla: int = 0) -> pd.DataFrame:
+    """
+    Base con la forma de `nudc-7mev` ya tipada con `ESQUEMA_MEN` (como la entrega `load_data_from_api`).
+
+    Las filas se reparten en `anios` años y en tantos municipios por departamento como
+    haga falta, de modo que las dimensiones crecen con el tamaño como en los datos reales.
+    """
+    rng = np.random.default_rng(semilla)
+    por_anio = max(filas // anios, 1)
+    municipios = max(por_anio // len(_DEPARTAMENTOS), 1)
+
+    posicion = np.arange(filas) % por_anio
+    depto = posicion % len(_DEPARTAMENTOS)
+    municipio = (posicion // len(_DEPARTAMENTOS)) % municipios
+    codigos = np.array([c for c, _ in _DEPARTAMENTOS])
+    nombres = [n for _, n in _DEPARTAMENTOS]
+
+    nombres_mun = pd.Index([f"MUNICIPIO {i}" for i in range(municipios)])
+    df = pd.DataFrame({
+        'a_o': (2011 + np.minimum(np.arange(filas) // por_anio, anios - 1)).astype('int16'),
+        'c_digo_departamento': pd.Categorical.from_codes(depto, categories=codigos),
+        'departamento': pd.Categorical.from_codes(depto, categories=nombres),
+        'c_digo_municipio': pd.Categorical(np.char.add(codigos[depto], np.char.zfill(municipio.astype(str), 3))),
+        'municipio': pd.Categorical.from_codes(municipio, categories=nombres_mun),
+        'poblaci_n_5_16': rng.integers(100, 50_000, filas).astype('int32'),
+        'tasa_matriculaci_n_5_16': rng.uniform(50, 110, filas).astype('float32'),
+        'cobertura_neta': rng.uniform(40, 100, filas).astype('float32'),
+        'cobertura_bruta': rng.uniform(50, 120, filas).astype('float32'),
+    })
+    return df
+
+
+def generar_registros_api(filas: int, semilla: int = 0) -> list:
+    """Registros JSON (todos los valores como texto) para el servidor local de Socrata."""
+    df = generar_men(filas, semilla=semilla)
+    return df.astype(str).to_dict(orient='records')
+
+
+def generar_infra(filas: int, semilla: int = 0) -> pd.DataFrame:
+    """Base con la forma de `3ncw-3qwq` (una fila por sede)."""
+    rng = np.random.default_rng(semilla)
+    depto = rng.integers(0, len(_DEPARTAMENTOS), filas)
+    municipios = max(filas // 200, 10)
+    return pd.DataFrame({
+        'NOMBRE_DEPTO': pd.Categorical.from_codes(depto, categories=[n for _, n in _DEPARTAMENTOS]),
+        'NOMBRE_MUNICIPIO': pd.Categorical.from_codes(rng.integers(0, municipios, filas),
+                                                      categories=[f"MUNICIPIO {i}" for i in range(municipios)]),
+        'NOMBRE_SEDE': [f"SEDE {i}" for i in range(filas)],
+        'AULAS_NUEVAS': rng.integers(0, 10, filas).astype('int16'),
+        'AULAS_MEJORADAS': rng.integers(0, 10, filas).astype('int16'),
+        'AULAS_AMPLIADAS': rng.integers(0, 5, filas).astype('int16'),
+        'ESTADO_GENERAL': pd.Categorical.from_codes(rng.integers(0, 3, filas),
+                                                    categories=['TERMINADA', 'EN EJECUCION', 'SUSPENDIDA']),
+    })
+
+
+def geojson_sintetico() -> dict:
+    """Un cuadrado por departamento (el shapefile real no siempre está disponible)."""
+    features = []
+    for i, (codigo, nombre) in enumerate(_DEPARTAMENTOS):
+        x, y = -79 + (i % 6) * 2, -4 + (i // 6) * 2
+        features.append({'type': 'Feature',
+                         'properties': {'DPTO_CCDGO': codigo, 'DPTO_CNMBR': nombre},
+                         'geometry': {'type': 'Polygon',
+                                      'coordinates': [[[x, y], [x + 2, y], [x + 2, y + 2], [x, y + 2], [x, y]]]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+# ===================================================================
+# Etapas
+# ===================================================================
+def etapa_carga_api(ctx: dict) -> int:
+    with ServidorSocrataLocal({DATASET_MEN: ctx['registros_api']}) as servidor:
+        df = load_data_from_api(base_url=servidor.base_url)
+    return len(df)
+
+
+def etapa_limpieza(ctx: dict) -> int:
+    ctx['df_clean'] = limpiar_datos(ctx['df_raw'])
+    return len(ctx['df_clean'])
+
+
+def etapa_modelo(ctx: dict) -> int:
+    """Dimensiones y tabla de hechos (llaves sustitutas y uniones)."""
+    modelo = ModeloIncremental().actualizar(ctx['df_clean'])
+    ctx['esquema'] = StarSchema(modelo.dim_tiempo, modelo.dim_geo, modelo.df_fact, ctx['df_clean'],
+                                modelo.version, len(ctx['df_raw']))
+    return len(modelo.df_fact)
+
+
+def etapa_cubo(ctx: dict) -> int:
+    """Unión de hechos y dimensiones y agregados del cubo."""
+    ctx['cubo'] = CuboOLAP(ctx['esquema'].df_ext)
+    return len(ctx['esquema'].df_ext)
+
+
+def etapa_visualizaciones(ctx: dict) -> int:
+    """Consultas que hacen los gráficos de la pestaña de visualizaciones."""
+    cubo = ctx['cubo']
+    depto = cubo.departamentos[0]
+    cubo.serie(depto, ['tasa_matriculaci_n_5_16', 'cobertura_neta'])
+    cubo.serie(depto, ['cobertura_bruta', 'tasa_matriculaci_n_5_16'])
+    cubo.filas(depto)
+    cubo.total_departamento(['cobertura_neta'])
+    cubo.filas(cubo.departamentos[:5])
+    cubo.total_departamento(['tasa_matriculaci_n_5_16'])
+    cubo.total_departamento(['cobertura_neta', 'poblaci_n_5_16'])
+    return len(cubo.departamento_anio(['tasa_matriculaci_n_5_16']))
+
+
+def etapa_infraestructura(ctx: dict) -> int:
+    """Preparación y agrupaciones de la pestaña de infraestructura."""
+    # Sin la memoización por huella, para medir el cálculo en cada repetición
+    cubo = CuboInfraestructura(preparar_infraestructura.__wrapped__(ctx['df_infra']))
+    top = cubo.top_municipios(10)['nombre_municipio']
+    cubo.proyectos(cubo.departamentos[0], cubo.estados[0])
+    cubo.sedes(top[:3])
+    return len(cubo.df)
+
+
+def etapa_mapa(ctx: dict) -> int:
+    """Valores por departamento unidos a la geometría y render del mapa."""
+    metricas = {'Cobertura Neta (%)': 'cobertura_neta', 'Cobertura Bruta (%)': 'cobertura_bruta',
+                'Tasa de Matriculación 5-16 (%)': 'tasa_matriculaci_n_5_16'}
+    tabla = ctx['cubo'].codigo_anio(list(metricas.values()))
+    construir_mapa(geojson_sintetico(), tabla, metricas).get_root().render()
+    return len(tabla)
+
+
+def _etapa_exportacion(formato: str):
+    def etapa(ctx: dict) -> int:
+        with tempfile.TemporaryDirectory() as directorio:
+            exportar_esquema(ctx['esquema'], formato, directorio=directorio)
+        return len(ctx['esquema'].df_fact)
+    return etapa
+
+
+ETAPAS = {
+    'carga_api': etapa_carga_api,
+    'limpieza': etapa_limpieza,
+    'modelo': etapa_modelo,
+    'cubo': etapa_cubo,
+    'visualizaciones': etapa_visualizaciones,
+    'infraestructura': etapa_infraestructura,
+    'mapa': etapa_mapa,
+    'exportacion_xlsx': _etapa_exportacion('xlsx'),
+    'exportacion_parquet': _etapa_exportacion('parquet'),
+    'exportacion_csv_gz': _etapa_exportacion('csv.gz'),
+}
+
+# ===================================================================
+# Medición
+# ===================================================================
+def medir(funcion, ctx: dict, memoria: bool = True) -> dict:
+    """
+    Tiempo de pared y pico de memoria asignada (MB) de una etapa.
+
+    `tracemalloc` hace varias veces más lento el código que crea muchos objetos de
+    Python (p. ej. el parseo de JSON), así que el tiempo se toma en una ejecución
+    sin rastreo y la memoria en otra aparte.
+    """
+    inicio = time.perf_counter()
+    filas = funcion(ctx)
+    segundos = time.perf_counter() - inicio
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcion(ctx)
+            pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return {'segundos': round(segundos, 4), 'pico_mb': None if pico is None else round(pico, 2), 'filas': filas}
+
+
+def ejecutar(tamanos: list, etapas: list = None, repeticiones: int = 1, memoria: bool = True,
+             max_filas_api: int = MAX_FILAS_API, informar=print) -> dict:
+    """
+    Corre las etapas para cada tamaño y devuelve los resultados.
+
+    Con varias repeticiones se guarda el menor tiempo (el menos afectado por ruido)
+    y el mayor pico de memoria. Las etapas se ejecutan en orden porque cada una
+    usa el resultado de la anterior.
+
+    Returns:
+        dict: {'metadatos': {...}, 'resultados': {tamaño: {etapa: medición}}}
+    """
+    etapas = etapas or list(ETAPAS)
+    resultados = {}
+    for filas in tamanos:
+        informar(f"— {filas:,} filas")
+        ctx = {'df_raw': generar_men(filas), 'df_infra': generar_infra(max(filas // 10, 100))}
+        if 'carga_api' in etapas and filas <= max_filas_api:
+            ctx['registros_api'] = generar_registros_api(filas)
+        por_etapa = {}
+        for nombre in ETAPAS:
+            if nombre not in etapas or (nombre == 'carga_api' and 'registros_api' not in ctx):
+                continue
+            mediciones = [medir(ETAPAS[nombre], ctx, memoria) for _ in range(repeticiones)]
+            mejor = min(mediciones, key=lambda m: m['segundos'])
+            if memoria:
+                mejor['pico_mb'] = max(m['pico_mb'] for m in mediciones)
+            por_etapa[nombre] = mejor
+            pico = "" if mejor['pico_mb'] is None else f"{mejor['pico_mb']:>9.1f} MB"
+            informar(f"  {nombre:<22} {mejor['segundos']:>9.3f} s  {pico}")
+        resultados[str(filas)] = por_etapa
+    return {
+        'metadatos': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(actual: dict, base: dict, umbral: float = UMBRAL, minimo_segundos: float = MINIMO_SEGUNDOS) -> list:
+    """
+    Etapas que empeoraron más que `umbral` (fracción) en tiempo o en memoria frente a la base.
+
+    Las etapas que en la base duran menos de `minimo_segundos` no se comparan en
+    tiempo, porque a esa escala domina el ruido.
+
+    Returns:
+        list: Descripciones de las regresiones (vacía si no hay).
+    """
+    regresiones = []
+    for tamano, etapas in actual['resultados'].items():
+        for etapa, medicion in etapas.items():
+            referencia = base.get('resultados', {}).get(tamano, {}).get(etapa)
+            if referencia is None:
+                continue
+            if referencia['segundos'] >= minimo_segundos and medicion['segundos'] > referencia['segundos'] * (1 + umbral):
+                regresiones.append(f"{etapa} ({tamano} filas): {referencia['segundos']:.3f} s → {medicion['segundos']:.3f} s")
+            if (referencia.get('pico_mb') and medicion.get('pico_mb')
+                    and medicion['pico_mb'] > referencia['pico_mb'] * (1 + umbral)):
+                regresiones.append(f"{etapa} ({tamano} filas): {referencia['pico_mb']:.1f} MB → {medicion['pico_mb']:.1f} MB")
+    return regresiones
+
+# ===================================================================
+# Línea de comandos
+# ===================================================================
+def guardar_y_comparar(resultados: dict, args: argparse.Namespace) -> int:
+    """
+    Guarda los resultados como línea base (`--guardar`) y los compara con otra (`--comparar`).
+
+    La comparten esta línea de comandos y la de `arranque.py`.
+
+    Returns:
+        int: Código de salida: 1 si hay regresiones frente a la línea base, 0 si no.
+    """
+    if args.guardar:
+        args.guardar.parent.mkdir(parents=True, exist_ok=True)
+        args.guardar.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Línea base guardada en {args.guardar}")
+
+    if args.comparar:
+        base = json.loads(args.comparar.read_text(encoding="utf-8"))
+        regresiones = comparar(resultados, base, args.umbral)
+        if regresiones:
+            print("❌ Regresiones:")
+            for r in regresiones:
+                print(f"  {r}")
+            return 1
+        print("✅ Sin regresiones frente a la línea base.")
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del flujo del tablero.")
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMANOS[:2],
+                        help=f"Tamaños a medir (por defecto {TAMANOS[:2]}; se admiten hasta {TAMANOS[-1]:,}).")
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), help="Etapas a medir (por defecto todas).")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir memoria (tracemalloc agrega sobrecosto).")
+    parser.add_argument("--max-filas-api", type=int, default=MAX_FILAS_API,
+                        help="Tamaño máximo para la etapa de carga por la API local.")
+    parser.add_argument("--guardar", type=Path, help="Guarda los resultados como línea base (JSON).")
+    parser.add_argument("--comparar", type=Path, help="Línea base contra la que comparar.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL, help="Fracción de empeoramiento tolerada.")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.filas, args.etapas, args.repeticiones, not args.sin_memoria, args.max_filas_api)
+    return guardar_y_comparar(resultados, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DIRECTORIO_CACHE = Path(os.environ.get("DIPLOMADO_CACHE_DIR", ".cache/datos"))
+TTL_SEGUNDOS = 6 * 60 * 60
+PRESUPUESTO_BYTES = 1024 ** 3
+INTERVALO_ACCESOS = 5 * 60  # segundos máximos que un acceso espera en memoria antes de escribirse al índice
+
+# ===================================================================
+# Caché columnar en disco (Arrow IPC) compartida por todas las sesiones
+# ===================================================================
+class CacheColumnar:
+    """
+    Caché persistente de DataFrames en archivos Arrow IPC, indexada por dataset y parámetros.
+
+    Cada entrada guarda los validadores HTTP (ETag / Last-Modified) de su origen.
+    Mientras la entrada es más joven que el TTL se sirve sin tocar la red; después
+    se revalida con una petición condicional y solo se descarga de nuevo si cambió.
+    Cuando el tamaño total supera el presupuesto se desalojan las entradas menos
+    usadas recientemente (LRU).
+
+    Args:
+        directorio (Path): Carpeta donde se guardan los archivos y el índice.
+        ttl (float): Segundos durante los que una entrada se considera fresca.
+        presupuesto_bytes (int): Tamaño máximo de la caché en disco.
+    """
+
+    def __init__(self, directorio: Path = DIRECTORIO_CACHE, ttl: float = TTL_SEGUNDOS,
+                 presupuesto_bytes: int = PRESUPUESTO_BYTES):
+        self.directorio = Path(directorio)
+        self.ttl = ttl
+        self.presupuesto_bytes = presupuesto_bytes
+        self._lock = threading.RLock()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._ruta_indice = self.directorio / "indice.json"
+        self._ruta_bloqueo = self.directorio / "indice.lock"
+        self._marca_indice = None
+        self._indice = self._leer_indice()
+        # Accesos de `leer` aún no escritos al índice (clave -> instante); solo ordenan el
+        # desalojo LRU, así que viajan con la próxima escritura del índice
+        self._accesos = {}
+        self._ultima_escritura = time.time()
+
+    # ------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------
+    # Varios procesos comparten la carpeta (el tablero y los trabajos de `etl.py`), así
+    # que cada cambio relee el índice del disco bajo un bloqueo de archivo, lo modifica
+    # y lo reescribe: nunca se pisa con una copia vieja las entradas de otro proceso.
+    def _leer_indice(self) -> dict:
+        try:
+            self._marca_indice = self._ruta_indice.stat().st_mtime_ns
+            return json.loads(self._ruta_indice.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _refrescar(self):
+        """Relee el índice si otro proceso lo reescribió desde la última lectura."""
+        try:
+            marca = self._ruta_indice.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if marca != self._marca_indice:
+            self._indice = self._leer_indice()
+
+    @contextmanager
+    def _bloqueo(self):
+        with open(self._ruta_bloqueo, "a+b") as archivo:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+                else:
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def _modificar_indice(self):
+        """Da el índice recién leído del disco para modificarlo y lo guarda al salir."""
+        with self._lock, self._bloqueo():
+            self._indice = self._leer_indice()
+            for clave, instante in self._accesos.items():
+                if clave in self._indice:
+                    self._indice[clave]["ultimo_acceso"] = max(self._indice[clave]["ultimo_acceso"], instante)
+            self._accesos.clear()
+            yield self._indice
+            self._guardar_indice()
+            self._ultima_escritura = time.time()
+
+    def _guardar_indice(self):
+        tmp = self._ruta_indice.with_name(f"indice.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._indice, indent=1), encoding="utf-8")
+        os.replace(tmp, self._ruta_indice)
+        self._marca_indice = self._ruta_indice.stat().st_mtime_ns
+
+    @staticmethod
+    def clave(dataset_id: str, params: Optional[dict] = None) -> str:
+        """Clave estable a partir del dataset y de los parámetros de la consulta."""
+        texto = json.dumps({"dataset": dataset_id, "params": params or {}}, sort_keys=True, default=str)
+        return f"{dataset_id}-{hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]}"
+
+    def entrada(self, dataset_id: str, params: Optional[dict] = None) -> Optional[dict]:
+        with self._lock:
+            self._refrescar()
+            entrada = self._indice.get(self.clave(dataset_id, params))
+            if entrada and not (self.directorio / entrada["archivo"]).exists():
+                return None
+            return entrada
+
+    def fresca(self, entrada: dict, ahora: Optional[float] = None, ttl: Optional[float] = None) -> bool:
+        return ((ahora or time.time()) - entrada["validado"]) < (self.ttl if ttl is None else ttl)
+
+    # ------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------
+    def leer(self, dataset_id: str, params: Optional[dict] = None) -> Optional[pd.DataFrame]:
+        """
+        Lee la entrada del archivo Arrow; None si no existe.
+
+        El mapeo en memoria evita leer el archivo a un búfer propio antes de convertirlo,
+        pero `to_pandas()` sí copia los datos a bloques de pandas: el DataFrame no queda
+        respaldado por el archivo y ocupa su tamaño completo en memoria.
+
+        El acceso se anota en memoria y se escribe al índice con su próxima
+        modificación (o pasados INTERVALO_ACCESOS segundos): un acierto no toma el
+        bloqueo de archivo ni reescribe el índice.
+        """
+        entrada = self.entrada(dataset_id, params)
+        if entrada is None:
+            return None
+        with pa.memory_map(str(self.directorio / entrada["archivo"]), "r") as fuente:
+            tabla = pa.ipc.open_file(fuente).read_all()
+        with self._lock:
+            self._accesos[self.clave(dataset_id, params)] = time.time()
+            vencido = time.time() - self._ultima_escritura > INTERVALO_ACCESOS
+        if vencido:
+            with self._modificar_indice():
+                pass
+        return tabla.to_pandas()
+
+    def guardar(self, dataset_id: str, params: Optional[dict], df: pd.DataFrame,
+                etag: Optional[str] = None, last_modified: Optional[str] = None) -> dict:
+        """Escribe el DataFrame de forma atómica y registra sus validadores HTTP."""
+        clave = self.clave(dataset_id, params)
+        archivo = f"{clave}.arrow"
+        tabla = _a_tabla_arrow(df)
+        tmp = self.directorio / f"{archivo}.tmp"
+        with pa.OSFile(str(tmp), "wb") as destino:
+            with pa.ipc.new_file(destino, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+        os.replace(tmp, self.directorio / archivo)
+
+        ahora = time.time()
+        entrada = {
+            "dataset": dataset_id,
+            "params": params or {},
+            "archivo": archivo,
+            "bytes": (self.directorio / archivo).stat().st_size,
+            "filas": len(df),
+            "etag": etag,
+            "last_modified": last_modified,
+            "creado": ahora,
+            "validado": ahora,
+            "ultimo_acceso": ahora,
+        }
+        with self._modificar_indice() as indice:
+            indice[clave] = entrada
+            self._desalojar(proteger=clave)
+        return entrada
+
+    def marcar_validada(self, dataset_id: str, params: Optional[dict] = None):
+        with self._modificar_indice() as indice:
+            entrada = indice.get(self.clave(dataset_id, params))
+            if entrada:
+                entrada["validado"] = time.time()
+
+    def _desalojar(self, proteger: Optional[str] = None):
+        total = sum(e["bytes"] for e in self._indice.values())
+        for clave, entrada in sorted(self._indice.items(), key=lambda kv: kv[1]["ultimo_acceso"]):
+            if total <= self.presupuesto_bytes:
+                break
+            if clave == proteger:
+                continue
+            (self.directorio / entrada["archivo"]).unlink(missing_ok=True)
+            total -= entrada["bytes"]
+            del self._indice[clave]
+
+    def limpiar(self):
+        with self._modificar_indice() as indice:
+            for entrada in indice.values():
+                (self.directorio / entrada["archivo"]).unlink(missing_ok=True)
+            indice.clear()
+
+
+def _a_tabla_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convierte a Arrow; las columnas de objetos con tipos mezclados se guardan como texto."""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        objetos = df.select_dtypes(include="object").columns
+        return pa.Table.from_pandas(df.astype({c: "string" for c in objetos}), preserve_index=False)
+
+# ===================================================================
+# Función: obtener_cache
+# ===================================================================
+@lru_cache(maxsize=None)
+def obtener_cache() -> CacheColumnar:
+    """Instancia única de la caché para todo el proceso (todas las sesiones la comparten)."""
+    return CacheColumnar()
+
+# ===================================================================
+# Función: revalidar
+# ===================================================================
+def revalidar(url: str, entrada: dict, sesion: Optional[requests.Session] = None,
+              timeout: float = 30) -> tuple:
+    """
+    Hace una petición condicional (If-None-Match / If-Modified-Since) sin leer el cuerpo.
+
+    Returns:
+        tuple: (sin_cambios, etag, last_modified) según la respuesta del servidor.
+    """
+    sesion = sesion or requests
+    cabeceras = {}
+    if entrada.get("etag"):
+        cabeceras["If-None-Match"] = entrada["etag"]
+    if entrada.get("last_modified"):
+        cabeceras["If-Modified-Since"] = entrada["last_modified"]
+    with sesion.get(url, headers=cabeceras, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return True, entrada.get("etag"), entrada.get("last_modified")
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+    sin_cambios = (etag is not None and etag == entrada.get("etag")) or (
+        etag is None and last_modified is not None and last_modified == entrada.get("last_modified"))
+    return sin_cambios, etag, last_modified
+
+# ===================================================================
+# Función: cargar_con_cache
+# ===================================================================
+def cargar_con_cache(dataset_id: str, params: Optional[dict], descargar: Callable[[], pd.DataFrame],
+                     url_validacion: Optional[str] = None, cache: Optional[CacheColumnar] = None,
+                     forzar: bool = False, sesion: Optional[requests.Session] = None,
+                     ttl: Optional[float] = None) -> tuple:
+    """
+    Devuelve el dataset desde la caché si sigue vigente y, si no, lo descarga y lo guarda.
+
+    Args:
+        dataset_id (str): Identificador del dataset (p. ej. 'nudc-7mev').
+        params (dict): Parámetros de la consulta que forman parte de la clave.
+        descargar (callable): Función que descarga el DataFrame completo.
+        url_validacion (str, opcional): URL barata cuyo ETag/Last-Modified refleja cambios del dataset.
+        forzar (bool): Ignora la caché y descarga de nuevo.
+        ttl (float, opcional): Edad máxima para servir la copia sin revalidar (por defecto el TTL de la caché).
+
+    Returns:
+        tuple: (DataFrame, origen) donde origen es 'cache', 'revalidado' o 'red'.
+    """
+    cache = cache or obtener_cache()
+    entrada = None if forzar else cache.entrada(dataset_id, params)
+    etag = last_modified = None
+
+    if entrada is not None:
+        if cache.fresca(entrada, ttl=ttl):
+            return cache.leer(dataset_id, params), "cache"
+        if url_validacion:
+            try:
+                sin_cambios, etag, last_modified = revalidar(url_validacion, entrada, sesion)
+            except requests.exceptions.RequestException:
+                # Sin red: se sirve la última copia conocida
+                return cache.leer(dataset_id, params), "cache"
+            if sin_cambios:
+                cache.marcar_validada(dataset_id, params)
+                return cache.leer(dataset_id, params), "revalidado"
+    elif url_validacion:
+        try:
+            _, etag, last_modified = revalidar(url_validacion, {}, sesion)
+        except requests.exceptions.RequestException:
+            pass
+
+    df = descargar()
+    if df is not None and not df.empty:
+        cache.guardar(dataset_id, params, df, etag, last_modified)
+    return df, "red"
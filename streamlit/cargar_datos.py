@@ -1,29 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
 import streamlit as st
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from almacen import publicar_en_sesion
+from cache_datos import cargar_con_cache
+from esquema import aplicar_esquema, ESQUEMA_MEN, ESQUEMA_INFRA, ReporteMemoria
+from ingesta_csv import leer_csv_por_bloques, COLUMNAS_INFRA
+from ingesta_excel import cargar_poblacion
+from instrumentacion import instrumentar
+from pipeline import registrar_huella
+
+URL_BASE_SOCRATA = "https://www.datos.gov.co/resource"
+DATASET_MEN = "nudc-7mev"
+DATASET_INFRA = "3ncw-3qwq"
+URL_INFRA = f"https://www.datos.gov.co/api/views/{DATASET_INFRA}/rows.csv?accessType=DOWNLOAD"
+# Parámetros que forman la clave de caché de cada conjunto (la pestaña y el refresco comparten entradas)
+PARAMS_MEN = {"limit": None}
+PARAMS_INFRA = {"formato": "csv", "columnas": COLUMNAS_INFRA}
+
+
+def url_validacion_men(base_url: str = URL_BASE_SOCRATA) -> str:
+    """URL barata (conteo de registros) cuyo ETag refleja cambios de la base del MEN."""
+    return f"{base_url}/{DATASET_MEN}.json?$select=count(*)"
+
+# ===================================================================
+# Estado de una descarga paginada (permite reanudar)
+# ===================================================================
+@dataclass
+class EstadoCarga:
+    """
+    Guarda el avance de una descarga paginada para poder reanudarla.
+
+    Attributes:
+        dataset_id (str): Identificador del conjunto de datos en Socrata.
+        total (int): Número de registros a descargar.
+        tamano_pagina (int): Registros por página ($limit).
+        paginas (dict): Páginas descargadas, indexadas por su $offset.
+        fallidas (dict): Mensaje de error de cada página que falló, por $offset.
+    """
+    dataset_id: str
+    total: int
+    tamano_pagina: int
+    paginas: dict = field(default_factory=dict)
+    fallidas: dict = field(default_factory=dict)
+
+    def pendientes(self) -> list:
+        """Offsets de las páginas que aún no se han descargado."""
+        return [o for o in range(0, self.total, self.tamano_pagina) if o not in self.paginas]
+
+    @property
+    def completa(self) -> bool:
+        return not self.pendientes()
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Une las páginas en orden y libera los fragmentos individuales."""
+        if not self.paginas:
+            return pd.DataFrame()
+        df = pd.concat([self.paginas[o] for o in sorted(self.paginas)], ignore_index=True)
+        self.paginas.clear()
+        return df
+
+# ===================================================================
+# Función: crear_sesion
+# ===================================================================
+def crear_sesion(max_conexiones: int = 8) -> requests.Session:
+    """
+    Crea una sesión HTTP con un pool de conexiones reutilizables y reintentos.
+
+    Args:
+        max_conexiones (int): Tamaño del pool; debe cubrir el número de hilos de descarga.
+
+    Returns:
+        requests.Session: Sesión lista para compartir entre hilos.
+    """
+    reintentos = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adaptador = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones, max_retries=reintentos)
+    sesion = requests.Session()
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+# ===================================================================
+# Función: contar_registros
+# ===================================================================
+def contar_registros(dataset_id: str, base_url: str = URL_BASE_SOCRATA,
+                     sesion: Optional[requests.Session] = None, timeout: float = 60) -> int:
+    """
+    Consulta cuántos registros tiene el conjunto de datos ($select=count(*)).
+
+    Raises:
+        requests.exceptions.RequestException: Si la consulta falla.
+    """
+    sesion = sesion or requests
+    response = sesion.get(f"{base_url}/{dataset_id}.json", params={"$select": "count(*)"}, timeout=timeout)
+    response.raise_for_status()
+    fila = response.json()[0]
+    return int(next(iter(fila.values())))
+
+# ===================================================================
+# Función: descargar_pagina
+# ===================================================================
+def descargar_pagina(dataset_id: str, offset: int, tamano_pagina: int, base_url: str = URL_BASE_SOCRATA,
+                     sesion: Optional[requests.Session] = None, timeout: float = 60,
+                     convertir: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> pd.DataFrame:
+    """
+    Descarga una página ($limit/$offset) ordenada por :id y la convierte en DataFrame.
+
+    El texto JSON de la respuesta se descarta apenas se construye el fragmento,
+    de modo que nunca conviven el JSON completo y el DataFrame en memoria.
+
+    Args:
+        convertir (callable, opcional): Función aplicada al fragmento (p. ej. tipado de columnas).
+    """
+    sesion = sesion or requests
+    params = {"$limit": tamano_pagina, "$offset": offset, "$order": ":id"}
+    response = sesion.get(f"{base_url}/{dataset_id}.json", params=params, timeout=timeout)
+    response.raise_for_status()
+    df = pd.DataFrame.from_records(response.json())
+    response.close()
+    if convertir is not None:
+        df = convertir(df)
+    return df
+
+# ===================================================================
+# Función: descargar_paginas
+# ===================================================================
+def descargar_paginas(dataset_id: str = DATASET_MEN, limit: Optional[int] = None, tamano_pagina: int = 10000,
+                      max_workers: int = 4, base_url: str = URL_BASE_SOCRATA,
+                      sesion: Optional[requests.Session] = None, estado: Optional[EstadoCarga] = None,
+                      convertir: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                      progreso: Optional[Callable[[int, int], None]] = None, timeout: float = 60) -> EstadoCarga:
+    """
+    Descarga en paralelo todas las páginas de un conjunto de datos de Socrata.
+
+    Las páginas que fallan quedan registradas en `estado.fallidas`; basta con volver
+    a llamar la función con el mismo `estado` para descargar solo las pendientes.
+
+    Args:
+        limit (int, opcional): Máximo de registros a descargar. None descarga todo.
+        tamano_pagina (int): Registros por petición.
+        max_workers (int): Número de descargas simultáneas.
+        base_url (str): Raíz de la API (permite apuntar a un servidor local de pruebas).
+        estado (EstadoCarga, opcional): Estado de una descarga anterior a reanudar.
+        progreso (callable, opcional): Recibe (páginas listas, páginas totales).
+
+    Returns:
+        EstadoCarga: Estado con las páginas descargadas y las que fallaron.
+
+    Raises:
+        requests.exceptions.RequestException: Si no se puede consultar el total de registros.
+    """
+    propia = sesion is None
+    sesion = sesion or crear_sesion(max_workers)
+    try:
+        if estado is None:
+            total = contar_registros(dataset_id, base_url, sesion, timeout)
+            if limit is not None:
+                total = min(total, limit)
+            estado = EstadoCarga(dataset_id, total, tamano_pagina)
+
+        pendientes = estado.pendientes()
+        n_paginas = len(pendientes) + len(estado.paginas)
+        estado.fallidas.clear()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futuros = {
+                pool.submit(descargar_pagina, estado.dataset_id, offset,
+                            min(estado.tamano_pagina, estado.total - offset),
+                            base_url, sesion, timeout, convertir): offset
+                for offset in pendientes
+            }
+            for futuro in as_completed(futuros):
+                offset = futuros[futuro]
+                try:
+                    estado.paginas[offset] = futuro.result()
+                except Exception as e:
+                    estado.fallidas[offset] = str(e)
+                if progreso is not None:
+                    progreso(len(estado.paginas), n_paginas)
+    finally:
+        if propia:
+            sesion.close()
+    return estado
+
+# ===================================================================
+# Función: descargar_men
+# ===================================================================
+def descargar_men(limit: Optional[int] = None, tamano_pagina: int = 10000, max_workers: int = 4,
+                  base_url: str = URL_BASE_SOCRATA, estado: Optional[EstadoCarga] = None,
+                  progreso: Optional[Callable[[int, int], None]] = None) -> tuple:
+    """
+    Descarga la base del MEN y la tipa con `ESQUEMA_MEN`, sin tocar la interfaz.
+
+    Cada página se tipa apenas llega; al final las categorías se unifican y el ahorro
+    de memoria queda en `df.attrs['reporte_memoria']`. La usan la pestaña de carga y
+    el refresco en segundo plano (`refresco.py`).
+
+    Returns:
+        tuple: (DataFrame o None si quedaron páginas fallidas, EstadoCarga para reanudar).
+
+    Raises:
+        requests.exceptions.RequestException: Si no se puede consultar el total de registros.
+    """
+    memoria_cruda = []
+
+    def tipar(pagina):
+        pagina, reporte = aplicar_esquema(pagina, ESQUEMA_MEN)
+        memoria_cruda.append(reporte.antes)
+        return pagina
+
+    estado = descargar_paginas(DATASET_MEN, limit, tamano_pagina, max_workers, base_url,
+                               estado=estado, convertir=tipar, progreso=progreso)
+    if estado.fallidas:
+        return None, estado
+    # Las categorías de cada página difieren; se unifican después de concatenar
+    df, _ = aplicar_esquema(estado.a_dataframe(), ESQUEMA_MEN, medir=False)
+    df.attrs['reporte_memoria'] = str(ReporteMemoria(sum(memoria_cruda), int(df.memory_usage(deep=True).sum())))
+    return df, estado
 
 # ===================================================================
 # Función: load_data_from_api
 # ===================================================================
-def load_data_from_api(limit: int = 50000) -> pd.DataFrame:
+@instrumentar("carga.api")
+def load_data_from_api(limit: Optional[int] = None, tamano_pagina: int = 10000, max_workers: int = 4,
+                       base_url: str = URL_BASE_SOCRATA, estado: Optional[EstadoCarga] = None,
+                       progreso: Optional[Callable[[int, int], None]] = None) -> pd.DataFrame:
     """
     Carga datos desde la API de Socrata en formato JSON y los convierte en un DataFrame de pandas.
 
+    La descarga se hace por páginas en paralelo (`descargar_men`). Si alguna página
+    falla, el estado parcial se guarda en `st.session_state['estado_carga']` para
+    reanudarlo después.
+
     Args:
-        limit (int): Número máximo de registros a solicitar. Por defecto es 50,000.
+        limit (int, opcional): Número máximo de registros a solicitar. Por defecto descarga todos.
+        tamano_pagina (int): Registros por página.
+        max_workers (int): Número de descargas simultáneas.
+        base_url (str): Raíz de la API de Socrata.
+        estado (EstadoCarga, opcional): Descarga parcial a reanudar.
+        progreso (callable, opcional): Recibe (páginas listas, páginas totales).
 
     Returns:
         pd.DataFrame: DataFrame con los datos cargados. Si ocurre un error, devuelve un DataFrame vacío.
-        
-    Raises:
-        requests.exceptions.RequestException: Si hay un problema de conexión o respuesta HTTP.
     """
-    api_url = f"https://www.datos.gov.co/resource/nudc-7mev.json?$limit={limit}"
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Verifica si la respuesta fue exitosa
-        data = response.json()
-        df = pd.DataFrame(data)
+        df, estado = descargar_men(limit, tamano_pagina, max_workers, base_url, estado, progreso)
+        if df is None:
+            st.session_state['estado_carga'] = estado
+            st.error(f"Error de conexión en {len(estado.fallidas)} página(s); puedes reanudar la carga.")
+            return pd.DataFrame()
+        st.session_state.pop('estado_carga', None)
         return df
     except requests.exceptions.RequestException as e:
         # Muestra un mensaje de error en la interfaz de Streamlit si hay un problema de conexión
@@ -34,6 +266,26 @@ def load_data_from_api(limit: int = 50000) -> pd.DataFrame:
     # Retorna un DataFrame vacío en caso de error
     return pd.DataFrame()
 
+# ===================================================================
+# Función: cargar_infraestructura
+# ===================================================================
+@instrumentar("carga.infraestructura")
+def cargar_infraestructura(url: str = URL_INFRA,
+                           progreso: Optional[Callable[[int, Optional[int]], None]] = None) -> pd.DataFrame:
+    """
+    Descarga la base de infraestructura (CSV) por bloques y la tipa con `ESQUEMA_INFRA`.
+
+    Solo se leen las columnas que usa la pestaña de Infraestructura (`COLUMNAS_INFRA`).
+
+    Args:
+        url (str): URL del CSV o ruta de una copia local.
+        progreso (callable, opcional): Recibe (bytes leídos, bytes totales o None).
+
+    Returns:
+        pd.DataFrame: Datos tipados, con el ahorro de memoria en `attrs['reporte_memoria']`.
+    """
+    return leer_csv_por_bloques(url, esquema=ESQUEMA_INFRA, progreso=progreso)
+
 # ===================================================================
 # Función: show_data_tab
 # ===================================================================
@@ -51,17 +303,36 @@ def show_data_tab():
     Presiona el botón para cargar los datos directamente desde la API.
     """)
 
+    forzar = st.checkbox("Ignorar la caché local y descargar de nuevo", value=False)
+
+    estado_previo = st.session_state.get('estado_carga')
+    cargar = st.button("🔄 Cargar datos")
+    reanudar = estado_previo is not None and st.button(
+        f"⏯️ Reanudar carga ({len(estado_previo.pendientes())} páginas pendientes)")
+
     # Botón para cargar los datos
-    if st.button("🔄 Cargar datos"):
-        with st.spinner("Cargando datos desde la API..."):
-            df_raw = load_data_from_api()
+    if cargar or reanudar:
+        barra = st.progress(0.0, text="Cargando datos desde la API...")
+
+        def progreso(listas, total):
+            barra.progress(listas / max(total, 1), text=f"Páginas descargadas: {listas}/{total}")
+
+        df_raw, origen = cargar_con_cache(
+            DATASET_MEN, PARAMS_MEN,
+            lambda: load_data_from_api(estado=estado_previo if reanudar else None, progreso=progreso),
+            url_validacion=url_validacion_men(),
+            forzar=forzar or reanudar)
+        barra.empty()
 
         # Verifica si se cargaron datos correctamente
         if not df_raw.empty:
-            # Guardar el dataframe en sesión para usarlo en otras pestañas
-            st.session_state['df_raw'] = df_raw
+            # Publicar en el almacén compartido; la sesión solo guarda la versión
+            df_raw = publicar_en_sesion('df_raw', df_raw, registrar_huella(df_raw))
             
             st.success(f"¡Datos cargados exitosamente! ({len(df_raw)} filas)")
+            st.caption(f"Origen de los datos: {origen}")
+            if 'reporte_memoria' in df_raw.attrs:
+                st.caption(f"Memoria tras aplicar el esquema: {df_raw.attrs['reporte_memoria']}")
             st.dataframe(df_raw.head(10))
         else:
             st.warning("No se encontraron datos o hubo un error en la carga.")
@@ -78,12 +349,44 @@ def show_data_tab():
     """)
 
     if st.button("🏫 Cargar Infraestructura"):
-        url_infra = "https://www.datos.gov.co/api/views/3ncw-3qwq/rows.csv?accessType=DOWNLOAD"
+        barra = st.progress(0.0, text="Descargando infraestructura...")
+
+        def progreso_csv(leidos, total):
+            texto = f"Descargados {leidos / 1024 ** 2:,.1f} MB"
+            barra.progress(min(leidos / total, 1.0) if total else 0.0,
+                           text=f"{texto} de {total / 1024 ** 2:,.1f} MB" if total else texto)
+
         try:
-            df_infra = pd.read_csv(url_infra)
-            st.session_state['df_infra'] = df_infra
-            st.success(f"✅ Infraestructura cargada: {len(df_infra)} registros")
+            df_infra, origen = cargar_con_cache(
+                DATASET_INFRA, PARAMS_INFRA,
+                lambda: cargar_infraestructura(progreso=progreso_csv),
+                url_validacion=URL_INFRA,
+                forzar=forzar)
+            df_infra = publicar_en_sesion('df_infra', df_infra, registrar_huella(df_infra))
+            st.success(f"✅ Infraestructura cargada: {len(df_infra)} registros ({origen})")
+            if 'reporte_memoria' in df_infra.attrs:
+                st.caption(f"Memoria tras aplicar el esquema: {df_infra.attrs['reporte_memoria']}")
             st.dataframe(df_infra.head(5))
         except Exception as e:
             st.error(f"❌ Error al cargar: {e}")
+        finally:
+            barra.empty()
+
+    # ------------------------------------------------------------
 
+    st.markdown("""---  
+    ### 👥 Proyecciones de Población DANE (sin conexión)  
+    Series históricas (2005-2019) y proyectadas (2020-2035) por municipio, leídas de los libros de `Datos/`.
+    """)
+
+    if st.button("📂 Cargar proyecciones de población"):
+        try:
+            with st.spinner("Leyendo los libros de Excel..."):
+                df_poblacion, origen = cargar_poblacion(forzar=forzar)
+            df_poblacion = publicar_en_sesion('df_poblacion', df_poblacion, registrar_huella(df_poblacion))
+            st.success(f"✅ Proyecciones cargadas: {len(df_poblacion)} registros ({origen})")
+            if df_poblacion.attrs.get('reporte_memoria') is not None:
+                st.caption(f"Memoria tras aplicar el esquema: {df_poblacion.attrs['reporte_memoria']}")
+            st.dataframe(df_poblacion.head(5))
+        except Exception as e:
+            st.error(f"❌ Error al cargar: {e}")
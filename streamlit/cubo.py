@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+METRICAS_CUBO = ['poblaci_n_5_16', 'tasa_matriculaci_n_5_16', 'cobertura_neta', 'cobertura_bruta']
+ESTADISTICAS = ['mean', 'sum', 'count', 'min', 'max']
+DIMENSIONES = ['departamento', 'c_digo_departamento', 'a_o']
+
+# "1" arma el cubo por bloques desde las particiones en disco (ver `fuera_de_memoria.py`)
+FUERA_DE_MEMORIA = os.environ.get("DIPLOMADO_FUERA_DE_MEMORIA", "") not in ("", "0")
+
+# ===================================================================
+# Cubo OLAP materializado (departamento, código, año) × métrica
+# ===================================================================
+class CuboOLAP:
+    """
+    Agregados precalculados de la tabla de hechos, compartidos por Visualizaciones y Mapa.
+
+    Se guardan suma, conteo, mínimo y máximo de cada métrica en el grano
+    (departamento, código, año); el promedio se deriva como suma / conteo, de modo
+    que cualquier nivel superior (por año, por departamento, total) se obtiene
+    combinando agregados sin volver a recorrer las filas. Los cortes que usan las
+    pestañas se materializan en diccionarios, así cambiar un selectbox es una
+    búsqueda O(1).
+
+    Args:
+        df_ext (pd.DataFrame): Hechos unidos a sus dimensiones (ver `StarSchema.df_ext`).
+        metricas (list): Columnas numéricas a agregar.
+    """
+
+    def __init__(self, df_ext: pd.DataFrame, metricas: list = METRICAS_CUBO):
+        metricas = [m for m in metricas if m in df_ext.columns]
+        self._df = df_ext
+        self._filas = df_ext.groupby('departamento', observed=True, sort=False).indices
+        self._armar(df_ext.groupby(DIMENSIONES, observed=True)[metricas].agg(['sum', 'count', 'min', 'max']),
+                    metricas)
+
+    def _armar(self, base: pd.DataFrame, metricas: list):
+        """Niveles superiores y cortes a partir de los agregados parciales en el grano DIMENSIONES."""
+        self.metricas = metricas
+        self.base = _con_promedio(base, self.metricas)
+
+        self.por_departamento_anio = combinar_agregados(self.base, ['departamento', 'a_o'], self.metricas)
+        self.por_codigo_anio = combinar_agregados(self.base, ['c_digo_departamento', 'a_o'], self.metricas)
+        self.por_departamento = combinar_agregados(self.base, ['departamento'], self.metricas)
+
+        self.departamentos = sorted(self.por_departamento.index.dropna())
+        self.anios = sorted(self.por_codigo_anio.index.get_level_values('a_o').dropna().unique())
+
+        # Cortes materializados para búsquedas O(1)
+        self._series = {d: t.droplevel('departamento')
+                        for d, t in self.por_departamento_anio.groupby(level='departamento', observed=True, sort=False)}
+        self._cortes = {a: t.droplevel('a_o')
+                        for a, t in self.por_codigo_anio.groupby(level='a_o', observed=True, sort=False)}
+
+    # ------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------
+    def serie(self, departamento: str, metricas: list, estadistica: str = 'mean') -> pd.DataFrame:
+        """Serie anual de un departamento: índice `a_o`, una columna por métrica."""
+        tabla = self._series.get(departamento)
+        if tabla is None:
+            return pd.DataFrame(columns=metricas, index=pd.Index([], name='a_o'))
+        return tabla.xs(estadistica, axis=1, level=1)[metricas]
+
+    def corte_anio(self, anio, metrica: str, estadistica: str = 'mean') -> pd.Series:
+        """Valor de la métrica por código de departamento en un año."""
+        tabla = self._cortes.get(anio)
+        if tabla is None:
+            return pd.Series(dtype='float64', name=metrica)
+        return tabla[(metrica, estadistica)].rename(metrica)
+
+    def total_departamento(self, metricas: list, estadistica: str = 'mean') -> pd.DataFrame:
+        """Agregado de todos los años por departamento."""
+        return self.por_departamento.xs(estadistica, axis=1, level=1)[metricas]
+
+    def departamento_anio(self, metricas: list, estadistica: str = 'mean') -> pd.DataFrame:
+        """Tabla larga (departamento, a_o, métricas) para series de todos los departamentos."""
+        return self.por_departamento_anio.xs(estadistica, axis=1, level=1)[metricas].reset_index()
+
+    def codigo_anio(self, metricas: list, estadistica: str = 'mean') -> pd.DataFrame:
+        """Tabla larga (c_digo_departamento, a_o, métricas) para el mapa."""
+        return self.por_codigo_anio.xs(estadistica, axis=1, level=1)[metricas].reset_index()
+
+    def filas(self, departamentos) -> pd.DataFrame:
+        """Filas de hechos de uno o varios departamentos, sin recorrer toda la tabla."""
+        if isinstance(departamentos, str):
+            departamentos = [departamentos]
+        posiciones = [self._filas[d] for d in departamentos if d in self._filas]
+        if not posiciones:
+            return self._df.iloc[0:0]
+        return self._df.take(np.concatenate(posiciones))
+
+
+def _con_promedio(tabla: pd.DataFrame, metricas: list) -> pd.DataFrame:
+    for m in metricas:
+        tabla[(m, 'mean')] = tabla[(m, 'sum')] / tabla[(m, 'count')].where(tabla[(m, 'count')] > 0)
+    return tabla.reindex(columns=pd.MultiIndex.from_product([metricas, ESTADISTICAS]))
+
+
+def combinar_agregados(base: pd.DataFrame, niveles: list, metricas: list) -> pd.DataFrame:
+    """
+    Sube de nivel combinando agregados parciales (suma, conteo, mínimo, máximo).
+
+    También une parciales del mismo nivel calculados por separado (p. ej. por bloques
+    en `fuera_de_memoria.py`): basta concatenarlos y combinarlos en sus propios niveles.
+    """
+    reglas = {}
+    for m in metricas:
+        reglas.update({(m, 'sum'): 'sum', (m, 'count'): 'sum', (m, 'min'): 'min', (m, 'max'): 'max'})
+    tabla = base.groupby(level=niveles, observed=True).agg(reglas)
+    tabla.columns = pd.MultiIndex.from_tuples(tabla.columns)
+    return _con_promedio(tabla, metricas)
+
+# ===================================================================
+# Función: obtener_cubo
+# ===================================================================
+_cubos = OrderedDict()
+_lock = threading.Lock()
+
+
+def obtener_cubo(esquema, maxsize: int = 2) -> CuboOLAP:
+    """
+    Devuelve el cubo de la versión de la tabla de hechos, construyéndolo solo la primera vez.
+
+    Con DIPLOMADO_FUERA_DE_MEMORIA=1 el cubo se arma por bloques desde las particiones
+    del modelo en disco (`CuboParticionado`), sin unir la tabla de hechos completa; si
+    el modelo en disco no corresponde a `esquema.version` se usa el cubo en memoria.
+    """
+    with _lock:
+        if esquema.version in _cubos:
+            _cubos.move_to_end(esquema.version)
+            return _cubos[esquema.version]
+    cubo = None
+    if FUERA_DE_MEMORIA:
+        # Importación diferida: `fuera_de_memoria` extiende CuboOLAP
+        from fuera_de_memoria import cubo_desde_disco
+        cubo = cubo_desde_disco(esquema.version)
+    if cubo is None:
+        cubo = CuboOLAP(esquema.df_ext)
+    with _lock:
+        _cubos[esquema.version] = cubo
+        while len(_cubos) > maxsize:
+            _cubos.popitem(last=False)
+    return cubo
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+# ===================================================================
+# Esquemas declarados por conjunto de datos
+# ===================================================================
+_NIVELES = ['', '_transici_n', '_primaria', '_secundaria', '_media']
+
+ESQUEMA_MEN = {
+    'a_o': 'int16',
+    'c_digo_departamento': 'category',
+    'departamento': 'category',
+    'c_digo_municipio': 'category',
+    'municipio': 'category',
+    'c_digo_etc': 'category',
+    'etc': 'category',
+    'poblaci_n_5_16': 'Int32',
+    'sedes_conectadas_a_internet': 'float32',
+    'tama_o_promedio_de_grupo': 'float32',
+    'tasa_matriculaci_n_5_16': 'float32',
+    **{f"{indicador}{nivel}": 'float32'
+       for indicador in ['cobertura_neta', 'cobertura_bruta', 'deserci_n', 'aprobaci_n', 'reprobaci_n', 'repitencia']
+       for nivel in _NIVELES},
+}
+
+# Proyecciones de población DANE (Datos/Info_*.xlsx) con los nombres de columna de la API
+ESQUEMA_POBLACION = {
+    **{c: ESQUEMA_MEN[c] for c in ['a_o', 'c_digo_departamento', 'departamento', 'c_digo_municipio', 'municipio']},
+    'area_geografica': 'category',
+    'poblacion': 'Int32',
+}
+
+ESQUEMA_HECHOS = {
+    'id_tiempo': 'int16',
+    'id_geo': 'int32',
+    'poblaci_n_5_16': 'Int32',
+    'tasa_matriculaci_n_5_16': 'float32',
+    'cobertura_neta': 'float32',
+    'cobertura_bruta': 'float32',
+}
+
+ESQUEMA_INFRA = {
+    'nombre_depto': 'category',
+    'codigo_depto': 'category',
+    'nombre_municipio': 'category',
+    'codigo_municipio': 'category',
+    'estado_general': 'category',
+    'aulas_nuevas': 'Int16',
+    'aulas_mejoradas': 'Int16',
+    'aulas_ampliadas': 'Int16',
+}
+
+_NULABLES = {'int8': 'Int8', 'int16': 'Int16', 'int32': 'Int32', 'int64': 'Int64'}
+
+# ===================================================================
+# Reporte de memoria
+# ===================================================================
+@dataclass
+class ReporteMemoria:
+    """Memoria (bytes, medición profunda) antes y después de aplicar un esquema."""
+    antes: int
+    despues: int
+
+    @property
+    def ahorro(self) -> float:
+        return 1 - self.despues / self.antes if self.antes else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.antes / 1024 ** 2:,.1f} MB → {self.despues / 1024 ** 2:,.1f} MB "
+                f"({self.ahorro:.0%} menos)")
+
+# ===================================================================
+# Función: aplicar_esquema
+# ===================================================================
+def aplicar_esquema(df: pd.DataFrame, esquema: dict, medir: bool = True) -> tuple:
+    """
+    Convierte las columnas presentes en el DataFrame a los tipos declarados en el esquema.
+
+    Las columnas se emparejan por su nombre normalizado (minúsculas, sin espacios),
+    así el mismo esquema sirve para la API y para el CSV. Los números se convierten
+    con `pd.to_numeric(errors='coerce')`; un entero con valores faltantes pasa a su
+    versión nulable (p. ej. int16 -> Int16). Las columnas que no están en el esquema
+    no se tocan.
+
+    Args:
+        df (pd.DataFrame): Datos a tipar (no se modifica).
+        esquema (dict): Nombre de columna -> tipo de pandas.
+        medir (bool): Si se calcula el reporte de memoria (requiere recorrer las columnas de texto).
+
+    Returns:
+        tuple: (DataFrame tipado, ReporteMemoria o None)
+    """
+    antes = int(df.memory_usage(deep=True).sum()) if medir else 0
+    conversiones = {}
+    for columna in df.columns:
+        tipo = esquema.get(str(columna).strip().lower().replace(' ', '_'))
+        if tipo is None or str(df[columna].dtype) == tipo:
+            continue
+        serie = df[columna]
+        if tipo == 'category':
+            conversiones[columna] = serie.astype('category')
+            continue
+        if not pd.api.types.is_numeric_dtype(serie):
+            serie = pd.to_numeric(serie, errors='coerce')
+        if tipo in _NULABLES and serie.isna().any():
+            tipo = _NULABLES[tipo]
+        if tipo[0] == 'I' and pd.api.types.is_float_dtype(serie) and not (serie.dropna() % 1 == 0).all():
+            # Conteos con decimales: se conservan como flotantes en vez de truncarlos
+            tipo = 'float32'
+        conversiones[columna] = serie.astype(tipo)
+
+    resultado = df.assign(**conversiones) if conversiones else df
+    reporte = ReporteMemoria(antes, int(resultado.memory_usage(deep=True).sum())) if medir else None
+    return resultado, reporte
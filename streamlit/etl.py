@@ -0,0 +1,337 @@
+"""
+Construcción por lotes (sin Streamlit) de los artefactos del tablero.
+
+Ejecuta la misma carga, limpieza y modelo estrella que las pestañas, y deja en una
+carpeta versionada los Parquet (datos crudos, dimensiones, hechos, infraestructura y
+población), una copia SQLite del modelo y un `manifiesto.json` con filas, huellas y
+tiempos por etapa. Al arrancar, el tablero lee la versión vigente con mapeo en
+memoria si `DIPLOMADO_ARTEFACTOS` apunta a esa carpeta e importa esa copia SQLite.
+
+Uso (desde la raíz del repositorio):
+    python streamlit/etl.py build --source api --out .cache/artefactos
+    python streamlit/etl.py build --source cache --out .cache/artefactos --procesos 3
+    python streamlit/etl.py build --source excel --archivo men.xlsx --out .cache/artefactos
+
+Cada conjunto (MEN, infraestructura, población) se construye en su propio proceso.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from almacen import AlmacenDatos, obtener_almacen
+from base_datos import BaseAnalitica, obtener_base
+from cache_datos import cargar_con_cache, CacheColumnar, DIRECTORIO_CACHE
+from cargar_datos import (DATASET_INFRA, DATASET_MEN, PARAMS_INFRA, PARAMS_MEN, URL_BASE_SOCRATA, URL_INFRA,
+                          cargar_infraestructura, descargar_men, url_validacion_men)
+from esquema import aplicar_esquema, ESQUEMA_MEN
+from ingesta_excel import ARCHIVOS_POBLACION, ingerir_excel
+from modelo_incremental import ModeloIncremental
+from pipeline import build_star_schema, huella, limpiar_datos, registrar_huella, StarSchema
+
+DIRECTORIO_ARTEFACTOS = Path(os.environ.get("DIPLOMADO_ARTEFACTOS", DIRECTORIO_CACHE.parent / "artefactos"))
+ORIGENES = ['api', 'excel', 'cache']
+CONSERVAR = 3
+MANIFIESTO = "manifiesto.json"
+VIGENTE = "vigente.json"
+
+# Tabla del manifiesto -> conjunto del almacén que la publica
+CONJUNTOS = {'men_crudo': 'df_raw', 'infraestructura': 'df_infra', 'poblacion': 'df_poblacion'}
+
+# ===================================================================
+# Utilidades
+# ===================================================================
+def _escribir_parquet(df: pd.DataFrame, ruta: Path) -> dict:
+    """Escribe sin `attrs` (el reporte de memoria no siempre es serializable) y describe el archivo."""
+    copia = df.copy(deep=False)
+    copia.attrs = {}
+    copia.to_parquet(ruta, index=False)
+    return {'archivo': ruta.name, 'filas': len(df), 'bytes': ruta.stat().st_size}
+
+
+class _Cronometro:
+    def __init__(self):
+        self.etapas = {}
+        self._inicio = time.perf_counter()
+
+    def marca(self, etapa: str, filas: int = None):
+        ahora = time.perf_counter()
+        self.etapas[etapa] = {'segundos': round(ahora - self._inicio, 3), 'filas': filas}
+        self._inicio = ahora
+
+# ===================================================================
+# Trabajos (uno por proceso)
+# ===================================================================
+def _leer_men(origen: str, archivo: Optional[str], base_url: str) -> pd.DataFrame:
+    if origen == 'api':
+        def descargar():
+            df, estado = descargar_men(base_url=base_url)
+            if df is None:
+                raise ConnectionError(f"{len(estado.fallidas)} página(s) de {DATASET_MEN} fallaron")
+            return df
+        # Se guarda en la caché del tablero: después sirve como origen 'cache'
+        df, _ = cargar_con_cache(DATASET_MEN, PARAMS_MEN, descargar, url_validacion=url_validacion_men(base_url),
+                                 forzar=True)
+        return df
+    if origen == 'cache':
+        df = CacheColumnar().leer(DATASET_MEN, PARAMS_MEN)
+        if df is None:
+            raise FileNotFoundError(f"No hay copia de {DATASET_MEN} en la caché ({DIRECTORIO_CACHE})")
+        return df
+    if archivo is None:
+        raise ValueError("El origen 'excel' necesita --archivo con la exportación de nudc-7mev")
+    df, _ = aplicar_esquema(pd.read_excel(archivo, dtype=str), ESQUEMA_MEN)
+    return df
+
+
+def _trabajo_men(destino: Path, origen: str, archivo: Optional[str], base_url: str) -> dict:
+    """Carga, limpieza y modelo estrella de nudc-7mev (Parquet + SQLite)."""
+    reloj = _Cronometro()
+    df_raw = _leer_men(origen, archivo, base_url)
+    reloj.marca('carga', len(df_raw))
+    df_clean = limpiar_datos(df_raw)
+    reloj.marca('limpieza', len(df_clean))
+    modelo = ModeloIncremental().actualizar(df_clean)
+    reloj.marca('modelo', len(modelo.df_fact))
+
+    tablas = {
+        'men_crudo': {**_escribir_parquet(df_raw, destino / "men_crudo.parquet"), 'huella': huella(df_raw)},
+        'men_limpio': _escribir_parquet(df_clean, destino / "men_limpio.parquet"),
+        'dim_tiempo': _escribir_parquet(modelo.dim_tiempo, destino / "dim_tiempo.parquet"),
+        'dim_geo': _escribir_parquet(modelo.dim_geo, destino / "dim_geo.parquet"),
+        'fact_educacion': _escribir_parquet(modelo.df_fact, destino / "fact_educacion.parquet"),
+    }
+    reloj.marca('parquet')
+
+    base = BaseAnalitica(destino / "educacion.db", max_conexiones=1)
+    try:
+        base.sincronizar(StarSchema(modelo.dim_tiempo, modelo.dim_geo, modelo.df_fact, df_clean,
+                                    modelo.version, len(df_raw)))
+        # Un solo archivo, sin -wal ni -shm: el tablero lo adjunta en modo de solo lectura
+        with base.conexion() as con:
+            con.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        base.cerrar()
+    reloj.marca('sqlite')
+    return {'tablas': tablas, 'etapas': {f"men.{k}": v for k, v in reloj.etapas.items()},
+            'modelo': {'version': modelo.version, 'registros_originales': len(df_raw),
+                       'anios': [int(a) for a in modelo.anios]}}
+
+
+def _trabajo_infra(destino: Path, origen: str, fuente: str) -> dict:
+    """Base de infraestructura (3ncw-3qwq) tipada."""
+    reloj = _Cronometro()
+    if origen == 'cache':
+        df = CacheColumnar().leer(DATASET_INFRA, PARAMS_INFRA)
+        if df is None:
+            raise FileNotFoundError(f"No hay copia de {DATASET_INFRA} en la caché ({DIRECTORIO_CACHE})")
+    else:
+        df, _ = cargar_con_cache(DATASET_INFRA, PARAMS_INFRA, lambda: cargar_infraestructura(fuente),
+                                 url_validacion=fuente if str(fuente).startswith("http") else None, forzar=True)
+    reloj.marca('carga', len(df))
+    tabla = {**_escribir_parquet(df, destino / "infraestructura.parquet"), 'huella': huella(df)}
+    reloj.marca('parquet')
+    return {'tablas': {'infraestructura': tabla}, 'etapas': {f"infra.{k}": v for k, v in reloj.etapas.items()}}
+
+
+def _trabajo_poblacion(destino: Path, rutas: list) -> dict:
+    """Proyecciones de población DANE desde los libros de Excel."""
+    reloj = _Cronometro()
+    df = ingerir_excel(rutas)
+    reloj.marca('carga', len(df))
+    tabla = {**_escribir_parquet(df, destino / "poblacion.parquet"), 'huella': huella(df)}
+    reloj.marca('parquet')
+    return {'tablas': {'poblacion': tabla}, 'etapas': {f"poblacion.{k}": v for k, v in reloj.etapas.items()}}
+
+# ===================================================================
+# Función: construir
+# ===================================================================
+def construir(origen: str, salida: Path = DIRECTORIO_ARTEFACTOS, archivo: Optional[str] = None,
+              infra: Optional[str] = None, con_infra: bool = True, poblacion: Optional[list] = ARCHIVOS_POBLACION,
+              base_url: str = URL_BASE_SOCRATA, procesos: Optional[int] = None, conservar: int = CONSERVAR,
+              informar=print) -> dict:
+    """
+    Construye una versión de los artefactos y la marca como vigente.
+
+    Los trabajos escriben en una carpeta temporal dentro de `salida`; la versión es la
+    huella conjunta de las tablas de entrada, así que si ya existe no se reemplaza.
+    La carpeta terminada se renombra y después se reescribe `vigente.json` (ambos
+    pasos atómicos): quien lee nunca ve una versión a medio escribir.
+
+    Args:
+        origen (str): 'api', 'excel' o 'cache' (para la base del MEN).
+        salida (Path): Carpeta raíz de las versiones.
+        archivo (str, opcional): Libro .xlsx con la base del MEN (origen 'excel').
+        infra (str, opcional): URL o ruta del CSV de infraestructura (por defecto la de datos.gov.co).
+        con_infra (bool): Si se incluye la base de infraestructura.
+        poblacion (list, opcional): Libros de población DANE; None los omite.
+        procesos (int, opcional): Procesos simultáneos; por defecto uno por conjunto.
+        conservar (int): Versiones que se mantienen en disco.
+
+    Returns:
+        dict: Manifiesto de la versión vigente.
+    """
+    salida = Path(salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    temporal = salida / f".construyendo-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir()
+
+    trabajos = [(_trabajo_men, (temporal, origen, archivo, base_url))]
+    if con_infra and (origen != 'excel' or infra is not None):
+        trabajos.append((_trabajo_infra, (temporal, origen, infra or URL_INFRA)))
+    if poblacion and all(Path(r).exists() for r in poblacion):
+        trabajos.append((_trabajo_poblacion, (temporal, list(poblacion))))
+    elif poblacion:
+        informar("⚠️ Faltan los libros de población; se omiten.")
+
+    inicio = time.perf_counter()
+    try:
+        procesos = procesos or len(trabajos)
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=min(procesos, len(trabajos))) as ejecutor:
+                resultados = [f.result() for f in [ejecutor.submit(t, *a) for t, a in trabajos]]
+        else:
+            resultados = [t(*a) for t, a in trabajos]
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    manifiesto = {'origen': origen, 'creado': datetime.now().isoformat(timespec='seconds'),
+                  'tablas': {}, 'etapas': {}, 'sqlite': "educacion.db"}
+    for resultado in resultados:
+        manifiesto['tablas'].update(resultado['tablas'])
+        manifiesto['etapas'].update(resultado['etapas'])
+        manifiesto.update({k: v for k, v in resultado.items() if k not in ('tablas', 'etapas')})
+    manifiesto['segundos'] = round(time.perf_counter() - inicio, 3)
+
+    huellas = sorted((n, t['huella']) for n, t in manifiesto['tablas'].items() if 'huella' in t)
+    version = hashlib.sha1(json.dumps(huellas).encode('utf-8')).hexdigest()[:16]
+    manifiesto['version'] = version
+    (temporal / MANIFIESTO).write_text(json.dumps(manifiesto, indent=1, ensure_ascii=False), encoding="utf-8")
+
+    carpeta = salida / version
+    if carpeta.exists():
+        informar(f"La versión {version} ya estaba construida; se marca como vigente.")
+        shutil.rmtree(temporal, ignore_errors=True)
+        manifiesto = json.loads((carpeta / MANIFIESTO).read_text(encoding="utf-8"))
+    else:
+        os.replace(temporal, carpeta)
+
+    tmp = salida / f"{VIGENTE}.tmp"
+    tmp.write_text(json.dumps({'version': version}), encoding="utf-8")
+    os.replace(tmp, salida / VIGENTE)
+    _limpiar(salida, version, conservar)
+    return manifiesto
+
+
+def _limpiar(salida: Path, vigente: str, conservar: int):
+    """Borra las versiones más antiguas, nunca la vigente."""
+    versiones = sorted((c for c in salida.iterdir() if (c / MANIFIESTO).exists() and c.name != vigente),
+                       key=lambda c: (c / MANIFIESTO).stat().st_mtime, reverse=True)
+    for carpeta in versiones[max(conservar - 1, 0):]:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+# ===================================================================
+# Lectura desde el tablero
+# ===================================================================
+def leer_manifiesto(salida: Path = DIRECTORIO_ARTEFACTOS) -> Optional[dict]:
+    """Manifiesto de la versión vigente, o None si no hay artefactos."""
+    try:
+        version = json.loads((Path(salida) / VIGENTE).read_text(encoding="utf-8"))['version']
+        return json.loads((Path(salida) / version / MANIFIESTO).read_text(encoding="utf-8"))
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        return None
+
+
+def publicar_artefactos(almacen: AlmacenDatos, salida: Path = DIRECTORIO_ARTEFACTOS) -> Optional[dict]:
+    """
+    Publica la versión vigente en el almacén sin recalcular nada.
+
+    Los Parquet se leen con mapeo en memoria. Los datos crudos llevan la huella del
+    manifiesto y el modelo estrella ya construido se siembra en la memoización de
+    `build_star_schema`, así que las pestañas lo reciben sin limpiar ni modelar. El
+    modelo de la copia SQLite se importa a la base de `obtener_base` (el artefacto
+    solo se lee), de modo que tampoco se vuelve a insertar desde pandas.
+
+    Returns:
+        dict: Manifiesto publicado, o None si no hay artefactos.
+    """
+    manifiesto = leer_manifiesto(salida)
+    if manifiesto is None:
+        return None
+    carpeta = Path(salida) / manifiesto['version']
+
+    def leer(tabla: str) -> pd.DataFrame:
+        df = pd.read_parquet(carpeta / manifiesto['tablas'][tabla]['archivo'], memory_map=True)
+        if 'huella' in manifiesto['tablas'][tabla]:
+            registrar_huella(df, manifiesto['tablas'][tabla]['huella'])
+        return df
+
+    df_raw = leer('men_crudo')
+    modelo = manifiesto['modelo']
+    build_star_schema.sembrar(df_raw, StarSchema(
+        dim_tiempo=leer('dim_tiempo'), dim_geo=leer('dim_geo'), df_fact=leer('fact_educacion'),
+        df_clean=leer('men_limpio'), version=modelo['version'], registros_originales=modelo['registros_originales']))
+    if manifiesto.get('sqlite') and (carpeta / manifiesto['sqlite']).exists():
+        obtener_base().importar(carpeta / manifiesto['sqlite'])
+
+    for tabla, conjunto in CONJUNTOS.items():
+        if tabla in manifiesto['tablas']:
+            df = df_raw if tabla == 'men_crudo' else leer(tabla)
+            almacen.publicar(conjunto, df, huella(df))
+            almacen.seguir_ultima(conjunto)
+    return manifiesto
+
+
+@st.cache_resource
+def obtener_artefactos() -> Optional[dict]:
+    """Publica una sola vez por servidor los artefactos de DIPLOMADO_ARTEFACTOS (si existen)."""
+    return publicar_artefactos(obtener_almacen())
+
+# ===================================================================
+# Línea de comandos
+# ===================================================================
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Construye los artefactos del tablero sin Streamlit.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    build = comandos.add_parser("build", help="Carga, limpia y modela; escribe una versión nueva.")
+    build.add_argument("--source", choices=ORIGENES, required=True, help="Origen de la base del MEN.")
+    build.add_argument("--out", type=Path, default=DIRECTORIO_ARTEFACTOS, help="Carpeta raíz de las versiones.")
+    build.add_argument("--archivo", help="Libro .xlsx con la base del MEN (para --source excel).")
+    build.add_argument("--infra", help="URL o ruta del CSV de infraestructura.")
+    build.add_argument("--sin-infra", action="store_true", help="No incluir la base de infraestructura.")
+    build.add_argument("--sin-poblacion", action="store_true", help="No incluir las proyecciones de población.")
+    build.add_argument("--base-url", default=URL_BASE_SOCRATA, help="Raíz de la API de Socrata.")
+    build.add_argument("--procesos", type=int, help="Procesos simultáneos (por defecto uno por conjunto).")
+    build.add_argument("--conservar", type=int, default=CONSERVAR, help="Versiones que se mantienen en disco.")
+    args = parser.parse_args(argv)
+
+    try:
+        manifiesto = construir(args.source, args.out, args.archivo, args.infra, not args.sin_infra,
+                               None if args.sin_poblacion else ARCHIVOS_POBLACION, args.base_url,
+                               args.procesos, args.conservar)
+    except Exception as e:
+        print(f"❌ Error en la construcción: {e}")
+        return 1
+
+    print(f"✅ Versión {manifiesto['version']} vigente en {args.out} ({manifiesto['segundos']:.1f} s)")
+    for tabla, info in manifiesto['tablas'].items():
+        print(f"  {tabla:<16} {info['filas']:>12,} filas  {info['bytes'] / 1024 ** 2:>9.2f} MB")
+    for etapa, medicion in manifiesto['etapas'].items():
+        print(f"  {etapa:<22} {medicion['segundos']:>9.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import gzip
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+from cache_datos import DIRECTORIO_CACHE
+
+DIRECTORIO_EXPORTES = DIRECTORIO_CACHE.parent / "exportes"
+FILAS_POR_BLOQUE = 50_000
+MAX_ARCHIVOS = 12
+
+# Formato -> (extensión del archivo, tipo MIME)
+FORMATOS = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/octet-stream'),
+    'csv.gz': ('csv.gz', 'application/gzip'),
+}
+
+_lock = threading.Lock()
+
+# ===================================================================
+# Escritores por formato
+# ===================================================================
+def _bloques(df: pd.DataFrame, tamano: int = FILAS_POR_BLOQUE):
+    for inicio in range(0, len(df), tamano):
+        yield df.iloc[inicio:inicio + tamano]
+
+
+def escribir_xlsx(tablas: dict, destino: Path):
+    """
+    Escribe cada tabla en una hoja con openpyxl en modo `write_only`.
+
+    Las filas se envían por bloques y se descartan al escribirse, así la memoria
+    no crece con el número de filas.
+    """
+    libro = Workbook(write_only=True)
+    for nombre, df in tablas.items():
+        hoja = libro.create_sheet(title=nombre[:31])
+        hoja.append([str(c) for c in df.columns])
+        for bloque in _bloques(df):
+            # NaN / pd.NA -> celda vacía; los tipos de numpy pasan a tipos nativos
+            valores = bloque.astype(object).where(bloque.notna(), None)
+            for fila in valores.itertuples(index=False, name=None):
+                hoja.append([v.item() if hasattr(v, 'item') else v for v in fila])
+    libro.save(destino)
+
+
+def escribir_csv_gz(df: pd.DataFrame, destino: Path):
+    """CSV comprimido con gzip, escrito por bloques."""
+    with gzip.open(destino, 'wt', encoding='utf-8', newline='', compresslevel=6) as f:
+        for i, bloque in enumerate(_bloques(df)):
+            bloque.to_csv(f, index=False, header=(i == 0))
+        if len(df) == 0:
+            df.to_csv(f, index=False)
+
+
+def escribir_parquet(df: pd.DataFrame, destino: Path):
+    df.to_parquet(destino, index=False)
+
+
+def _escribir(tablas: dict, formato: str, destino: Path):
+    if formato == 'xlsx':
+        escribir_xlsx(tablas, destino)
+        return
+    escritor = escribir_parquet if formato == 'parquet' else escribir_csv_gz
+    if len(tablas) == 1:
+        escritor(next(iter(tablas.values())), destino)
+        return
+    # Varias tablas en formatos de un solo conjunto: un .zip con un archivo por tabla
+    extension = FORMATOS[formato][0]
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) as archivo:
+        for nombre, df in tablas.items():
+            parcial = destino.with_name(f"{destino.name}.{nombre}.{extension}")
+            try:
+                escritor(df, parcial)
+                archivo.write(parcial, arcname=f"{nombre}.{extension}")
+            finally:
+                parcial.unlink(missing_ok=True)
+
+# ===================================================================
+# Exportación por versión del modelo
+# ===================================================================
+def nombre_exportacion(version: str, formato: str, incluir_dimensiones: bool) -> str:
+    """Nombre del archivo de descarga para una versión del modelo."""
+    extension = FORMATOS[formato][0]
+    if incluir_dimensiones and formato != 'xlsx':
+        extension = f"{formato.replace('.', '_')}.zip"
+    sufijo = "_dimensiones" if incluir_dimensiones else ""
+    return f"tabla_hechos_educacion_{version}{sufijo}.{extension}"
+
+
+def exportar_esquema(esquema, formato: str = 'xlsx', incluir_dimensiones: bool = False,
+                     directorio: Path = None) -> Path:
+    """
+    Genera (o reutiliza) el archivo de descarga de la tabla de hechos de un modelo.
+
+    El archivo se guarda en disco con la versión del modelo en el nombre: mientras
+    la tabla de hechos no cambie, todas las sesiones descargan el mismo archivo sin
+    volver a generarlo. Solo se conservan los `MAX_ARCHIVOS` más recientes.
+
+    Args:
+        esquema (StarSchema): Modelo con `df_fact`, `dim_tiempo`, `dim_geo` y `version`.
+        formato (str): 'xlsx', 'parquet' o 'csv.gz'.
+        incluir_dimensiones (bool): Si se agregan `dim_tiempo` y `dim_geo` (hojas en xlsx, .zip en los demás).
+
+    Returns:
+        Path: Ruta del archivo generado.
+
+    Raises:
+        ValueError: Si el formato no está soportado.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    directorio = Path(directorio) if directorio is not None else DIRECTORIO_EXPORTES
+    ruta = directorio / nombre_exportacion(esquema.version, formato, incluir_dimensiones)
+
+    with _lock:
+        if ruta.exists():
+            os.utime(ruta)
+            return ruta
+        directorio.mkdir(parents=True, exist_ok=True)
+        tablas = {'TablaHechos': esquema.df_fact}
+        if incluir_dimensiones:
+            tablas.update({'dim_tiempo': esquema.dim_tiempo, 'dim_geo': esquema.dim_geo})
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        try:
+            _escribir(tablas, formato, tmp)
+            os.replace(tmp, ruta)
+        finally:
+            tmp.unlink(missing_ok=True)
+        _limpiar(directorio)
+    return ruta
+
+
+def _limpiar(directorio: Path, maximo: int = MAX_ARCHIVOS):
+    archivos = sorted((p for p in directorio.glob("tabla_hechos_educacion_*") if not p.name.endswith(".tmp")),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    for viejo in archivos[maximo:]:
+        viejo.unlink(missing_ok=True)
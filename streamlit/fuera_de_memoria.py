@@ -0,0 +1,198 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cubo import CuboOLAP, DIMENSIONES, METRICAS_CUBO, combinar_agregados
+from modelo_incremental import DIRECTORIO_MODELO, METRICAS
+from normalizacion import normalizar_nombres, DEPARTAMENTOS
+
+FILAS_POR_LOTE = 250_000          # filas de hechos leídas por lote
+MAX_FILAS_PARCIALES = 500_000     # filas de agregados parciales acumuladas antes de combinarlas
+
+# ===================================================================
+# Tabla de hechos particionada por año
+# ===================================================================
+class HechosParticionados:
+    """
+    Tabla de hechos de `ModeloIncremental` leída desde disco, un año y un lote a la vez.
+
+    Usa las particiones que el modelo ya persiste (`hechos/{id_tiempo}.parquet`, una
+    por año) y sus dimensiones, que son pequeñas y sí se cargan en memoria. Cada lote
+    trae solo las columnas pedidas y recibe sus atributos geográficos indexando
+    `dim_geo` por posición, así que la memoria depende de `filas_por_lote` y no del
+    largo de la historia.
+
+    Args:
+        directorio (Path): Carpeta del modelo persistido (por defecto DIRECTORIO_MODELO).
+        filas_por_lote (int): Filas de hechos por lote.
+
+    Raises:
+        FileNotFoundError: Si la carpeta no tiene un modelo persistido.
+    """
+
+    def __init__(self, directorio: Path = DIRECTORIO_MODELO, filas_por_lote: int = FILAS_POR_LOTE):
+        self.directorio = Path(directorio)
+        self.filas_por_lote = filas_por_lote
+        self._huellas = json.loads((self.directorio / "huellas.json").read_text(encoding="utf-8"))
+        self.dim_tiempo = pd.read_parquet(self.directorio / "dim_tiempo.parquet")
+        dim_geo = pd.read_parquet(self.directorio / "dim_geo.parquet")
+        # Misma normalización que `StarSchema.df_ext`, hecha una vez sobre la dimensión:
+        # todos los lotes comparten categorías y sus parciales se concatenan sin convertir
+        dim_geo['departamento'] = normalizar_nombres(dim_geo['departamento'], DEPARTAMENTOS)
+        self.dim_geo = dim_geo
+        self._posicion_geo = pd.Index(dim_geo['id_geo'])
+        self.metricas = list(METRICAS)
+
+    @property
+    def version(self) -> str:
+        """Misma versión que `ModeloIncremental.version` para el contenido en disco."""
+        texto = json.dumps(sorted(self._huellas.items()))
+        return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+    def _rutas(self, anios=None) -> list:
+        """(año, ruta) de cada partición existente, en orden de año."""
+        rutas = []
+        for id_tiempo, anio in zip(self.dim_tiempo['id_tiempo'], self.dim_tiempo['a_o']):
+            ruta = self.directorio / "hechos" / f"{id_tiempo}.parquet"
+            if ruta.exists() and (anios is None or anio in anios):
+                rutas.append((anio, ruta))
+        return sorted(rutas, key=lambda r: r[0])
+
+    def lotes(self, columnas_geo: list = (), metricas: Optional[list] = None, anios=None,
+              departamentos=None) -> Iterator[pd.DataFrame]:
+        """
+        Recorre los hechos por lotes.
+
+        Args:
+            columnas_geo (list): Atributos de `dim_geo` a adjuntar a cada lote.
+            metricas (list, opcional): Métricas a leer (por defecto todas).
+            anios (iterable, opcional): Años a leer; las demás particiones ni se abren.
+            departamentos (iterable, opcional): Departamentos (nombre normalizado) a conservar.
+
+        Yields:
+            pd.DataFrame: `id_tiempo`, `id_geo`, las métricas, `columnas_geo` y `a_o` (Int64).
+        """
+        metricas = self.metricas if metricas is None else metricas
+        ids_geo = None
+        if departamentos is not None:
+            ids_geo = self.dim_geo.loc[self.dim_geo['departamento'].isin(list(departamentos)), 'id_geo']
+        for anio, ruta in self._rutas(anios):
+            archivo = pq.ParquetFile(ruta)
+            for lote in archivo.iter_batches(batch_size=self.filas_por_lote,
+                                             columns=['id_tiempo', 'id_geo'] + metricas):
+                df = lote.to_pandas()
+                if ids_geo is not None:
+                    df = df[df['id_geo'].isin(ids_geo)].reset_index(drop=True)
+                posiciones = self._posicion_geo.get_indexer(df['id_geo'])
+                for c in columnas_geo:
+                    df[c] = self.dim_geo[c].take(posiciones).reset_index(drop=True)
+                df['a_o'] = pd.Series(anio, index=df.index, dtype='float64').astype('Int64')
+                yield df
+
+    def leer(self, departamentos) -> pd.DataFrame:
+        """Filas de hechos de uno o varios departamentos, con las columnas de `StarSchema.df_ext`."""
+        if isinstance(departamentos, str):
+            departamentos = [departamentos]
+        columnas_geo = [c for c in self.dim_geo.columns if c != 'id_geo']
+        partes = list(self.lotes(columnas_geo, departamentos=departamentos))
+        if not partes:
+            return pd.DataFrame(columns=['id_tiempo', 'id_geo'] + self.metricas + columnas_geo + ['a_o'])
+        return pd.concat(partes, ignore_index=True)
+
+# ===================================================================
+# Agregaciones por bloques
+# ===================================================================
+def agregar_por_bloques(hechos: HechosParticionados, por: list, metricas: list, anios=None) -> pd.DataFrame:
+    """
+    Suma, conteo, mínimo, máximo y promedio de las métricas agrupando por `por`, lote a lote.
+
+    Cada lote produce agregados parciales combinables; cuando los parciales acumulados
+    superan MAX_FILAS_PARCIALES se combinan entre sí (`combinar_agregados`), de modo
+    que en memoria solo conviven un lote y un parcial del tamaño del resultado.
+
+    Args:
+        hechos (HechosParticionados): Origen de los lotes.
+        por (list): Columnas de agrupación (`a_o` y atributos de `dim_geo`).
+        metricas (list): Métricas a agregar.
+        anios (iterable, opcional): Restringe la lectura a esos años.
+
+    Returns:
+        pd.DataFrame: Índice `por` y columnas (métrica, estadística), como `CuboOLAP.base`.
+    """
+    columnas_geo = [c for c in por if c != 'a_o']
+    parciales, filas, limite = [], 0, MAX_FILAS_PARCIALES
+    for lote in hechos.lotes(columnas_geo, metricas, anios):
+        parcial = lote.groupby(por, observed=True)[metricas].agg(['sum', 'count', 'min', 'max'])
+        parciales.append(parcial)
+        filas += len(parcial)
+        if filas > limite and len(parciales) > 1:
+            parciales = [combinar_agregados(pd.concat(parciales), por, metricas)]
+            filas = len(parciales[0])
+            # Si el resultado ya es grande, se espera a duplicarlo antes de volver a combinar
+            limite = max(MAX_FILAS_PARCIALES, 2 * filas)
+    if not parciales:
+        vacio = pd.DataFrame(columns=pd.MultiIndex.from_product([metricas, ['sum', 'count', 'min', 'max']]),
+                             index=pd.MultiIndex.from_arrays([[]] * len(por), names=por))
+        return combinar_agregados(vacio, por, metricas)
+    return combinar_agregados(pd.concat(parciales), por, metricas)
+
+
+def rollup_anual(hechos: HechosParticionados, metricas: list, estadistica: str = 'mean') -> pd.DataFrame:
+    """Agregado nacional por año: índice `a_o`, una columna por métrica."""
+    return agregar_por_bloques(hechos, ['a_o'], metricas).xs(estadistica, axis=1, level=1)[metricas]
+
+
+def top_n_por_bloques(hechos: HechosParticionados, por: list, metrica: str, n: int = 10,
+                      estadistica: str = 'mean', anios=None, ascendente: bool = False) -> pd.DataFrame:
+    """
+    Los `n` grupos de `por` con mayor (o menor) valor de la métrica.
+
+    El ranking se hace sobre los agregados ya combinados, nunca sobre las filas,
+    así que un grupo repartido en varios lotes o años cuenta una sola vez.
+
+    Returns:
+        pd.DataFrame: Columnas `por` y la métrica, ordenado por la métrica.
+    """
+    tabla = agregar_por_bloques(hechos, por, [metrica], anios)[(metrica, estadistica)].rename(metrica)
+    tabla = tabla.nsmallest(n) if ascendente else tabla.nlargest(n)
+    return tabla.reset_index()
+
+# ===================================================================
+# Cubo OLAP desde las particiones
+# ===================================================================
+class CuboParticionado(CuboOLAP):
+    """
+    `CuboOLAP` construido por bloques desde las particiones en disco.
+
+    Los agregados en el grano (departamento, código, año) se calculan con
+    `agregar_por_bloques` y los niveles superiores y cortes son los mismos del cubo
+    en memoria. Las filas de detalle (`filas`) se leen de disco solo para los
+    departamentos pedidos.
+
+    Args:
+        hechos (HechosParticionados): Tabla de hechos en disco.
+        metricas (list): Columnas numéricas a agregar.
+    """
+
+    def __init__(self, hechos: HechosParticionados, metricas: list = METRICAS_CUBO):
+        self.hechos = hechos
+        metricas = [m for m in metricas if m in hechos.metricas]
+        self._armar(agregar_por_bloques(hechos, DIMENSIONES, metricas), metricas)
+
+    def filas(self, departamentos) -> pd.DataFrame:
+        return self.hechos.leer(departamentos)
+
+
+def cubo_desde_disco(version: str, directorio: Path = DIRECTORIO_MODELO) -> Optional[CuboParticionado]:
+    """Cubo por bloques del modelo persistido; None si no existe o su versión no es `version`."""
+    try:
+        hechos = HechosParticionados(directorio)
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    if hechos.version != version:
+        return None
+    return CuboParticionado(hechos)
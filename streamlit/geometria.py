@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+
+from cache_datos import DIRECTORIO_CACHE
+
+RUTA_SHAPEFILE = "data/shapes/MGN_ANM_DPTOS.shp"
+DIRECTORIO_GEOMETRIA = DIRECTORIO_CACHE.parent / "geometria"
+CODIGO_COL = "DPTO_CCDGO"
+NOMBRE_COL = "DPTO_CNMBR"
+
+# Sistema MAGNA-SIRGAS / Origen Nacional (metros) para simplificar con tolerancias en metros
+CRS_METRICO = "EPSG:9377"
+CRS_WEB = "EPSG:4326"
+
+# Tolerancia de simplificación (m) por nivel de detalle
+TOLERANCIAS = {
+    'baja': 5000,
+    'media': 1500,
+    'alta': 300,
+}
+
+_lock = threading.Lock()
+_geojson = {}
+
+# ===================================================================
+# Función: nivel_para_zoom
+# ===================================================================
+def nivel_para_zoom(zoom: int) -> str:
+    """Nivel de detalle adecuado para el zoom inicial de un mapa de Leaflet."""
+    if zoom <= 5:
+        return 'baja'
+    if zoom <= 7:
+        return 'media'
+    return 'alta'
+
+# ===================================================================
+# Función: construir_geojson
+# ===================================================================
+def construir_geojson(ruta: str = RUTA_SHAPEFILE, tolerancias: dict = TOLERANCIAS) -> dict:
+    """
+    Lee el shapefile una vez y genera un GeoJSON simplificado por cada nivel de detalle.
+
+    La simplificación se hace en coordenadas métricas. Si la versión de shapely lo
+    permite se usa `coverage_simplify`, que simplifica los bordes compartidos una sola
+    vez y evita huecos o traslapes entre departamentos vecinos; si no, se simplifica
+    cada polígono con `preserve_topology=True`. Solo se conservan el código y el nombre
+    del departamento, y las coordenadas se redondean a ~1 m.
+
+    Returns:
+        dict: Nivel -> FeatureCollection (dict) con la propiedad `DPTO_CCDGO` como llave.
+    """
+    # geopandas y shapely solo se necesitan si la caché en disco no tiene la versión del shapefile
+    import geopandas as gpd
+    import shapely
+
+    gdf = gpd.read_file(ruta)[[CODIGO_COL, NOMBRE_COL, 'geometry']]
+    gdf[CODIGO_COL] = gdf[CODIGO_COL].astype(str)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(CRS_WEB)
+    metrico = gdf.to_crs(CRS_METRICO)
+
+    resultado = {}
+    for nivel, tolerancia in tolerancias.items():
+        if hasattr(shapely, "coverage_simplify"):
+            geometrias = shapely.coverage_simplify(metrico.geometry.values, tolerancia)
+        else:
+            geometrias = metrico.geometry.simplify(tolerancia, preserve_topology=True).values
+        simplificado = gpd.GeoDataFrame(metrico.drop(columns='geometry'), geometry=geometrias, crs=CRS_METRICO)
+        simplificado = simplificado.to_crs(CRS_WEB)
+        simplificado['geometry'] = shapely.set_precision(simplificado.geometry.values, 1e-5)
+        resultado[nivel] = json.loads(simplificado.to_json(drop_id=True))
+    return resultado
+
+# ===================================================================
+# Función: obtener_geojson
+# ===================================================================
+def obtener_geojson(nivel: str = 'baja', ruta: str = RUTA_SHAPEFILE) -> dict:
+    """
+    GeoJSON simplificado de los departamentos, calculado una vez y reutilizado.
+
+    Se guarda en memoria y en disco (`DIRECTORIO_GEOMETRIA`), con una llave que cambia
+    si cambia el shapefile, de modo que un reinicio del servidor tampoco vuelve a leerlo.
+
+    Raises:
+        OSError: Si el shapefile no existe o no se puede leer.
+    """
+    info = os.stat(ruta)
+    version = f"{int(info.st_mtime)}_{info.st_size}"
+    with _lock:
+        if (version, nivel) in _geojson:
+            return _geojson[(version, nivel)]
+
+        archivos = {n: DIRECTORIO_GEOMETRIA / f"departamentos_{n}_{version}.geojson" for n in TOLERANCIAS}
+        if all(a.exists() for a in archivos.values()):
+            capas = {n: json.loads(a.read_text(encoding="utf-8")) for n, a in archivos.items()}
+        else:
+            capas = construir_geojson(ruta)
+            DIRECTORIO_GEOMETRIA.mkdir(parents=True, exist_ok=True)
+            for n, capa in capas.items():
+                tmp = archivos[n].with_suffix(".tmp")
+                tmp.write_text(json.dumps(capa, separators=(',', ':')), encoding="utf-8")
+                os.replace(tmp, archivos[n])
+
+        for n, capa in capas.items():
+            _geojson[(version, n)] = capa
+        return _geojson[(version, nivel)]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from pipeline import memoizar_por_huella, preparar_infraestructura
+
+MEDIDAS_INFRA = ['aulas_nuevas', 'aulas_mejoradas', 'total_aulas']
+GRANO = ['nombre_depto', 'nombre_municipio', 'nombre_sede', 'estado_general']
+COLUMNAS_PROYECTO = ['nombre_municipio', 'nombre_sede', 'aulas_nuevas', 'aulas_mejoradas', 'estado_general']
+
+# ===================================================================
+# Agregados precalculados de la base de infraestructura
+# ===================================================================
+class CuboInfraestructura:
+    """
+    Agregados de aulas por departamento, municipio, sede y estado de obra.
+
+    Se agrupa una sola vez en el grano (departamento, municipio, sede, estado) y los
+    demás niveles se obtienen sumando esa tabla, que es mucho más pequeña que la
+    base. Para la tabla interactiva se guardan las posiciones de las filas de cada
+    par (departamento, estado): filtrar es una búsqueda en un diccionario y un
+    `take`, no una comparación sobre todas las filas.
+
+    Args:
+        df (pd.DataFrame): Base ya preparada con `preparar_infraestructura`.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        # Int64 para que las sumas de columnas Int16 no se desborden
+        medidas = df[GRANO + MEDIDAS_INFRA].astype({m: 'Int64' for m in MEDIDAS_INFRA})
+        # dropna=False: una sede o un estado vacío no debe sacar la fila de los totales
+        # de niveles superiores; cada nivel descarta solo los vacíos de sus propias llaves
+        base = medidas.groupby(GRANO, observed=True, sort=False, dropna=False).agg(
+            **{m: (m, 'sum') for m in MEDIDAS_INFRA}, proyectos=('total_aulas', 'size'))
+        self.base = base
+
+        self.por_departamento = base.groupby(level='nombre_depto', observed=True).sum()
+        self.por_municipio = (base.groupby(level=['nombre_depto', 'nombre_municipio'], observed=True).sum()
+                              .sort_values('total_aulas', ascending=False, kind='stable'))
+        self.por_sede = base.groupby(level=['nombre_municipio', 'nombre_sede'], observed=True).sum()
+        self.por_estado = base.groupby(level='estado_general', observed=True).sum()
+
+        self.departamentos = sorted(self.por_departamento.index.dropna())
+        self.estados = sorted(self.por_estado.index.dropna())
+        self.n_municipios = df['nombre_municipio'].nunique()
+
+        # Cortes materializados para búsquedas O(1)
+        self._proyectos = df.groupby(['nombre_depto', 'estado_general'], observed=True, sort=False).indices
+        self._sedes = self.por_sede.groupby(level='nombre_municipio', observed=True, sort=False).indices
+
+    # ------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------
+    def top_municipios(self, n: int = 10) -> pd.DataFrame:
+        """Municipios con más aulas: columnas nombre_depto, nombre_municipio y medidas."""
+        return self.por_municipio.head(n).reset_index()
+
+    def proyectos(self, departamento: str, estado: str, columnas: list = COLUMNAS_PROYECTO) -> pd.DataFrame:
+        """Filas de un departamento en un estado de obra, en el orden de la base."""
+        posiciones = self._proyectos.get((departamento, estado))
+        if posiciones is None:
+            return self.df.iloc[0:0][columnas]
+        return self.df.take(posiciones)[columnas]
+
+    def sedes(self, municipios: list) -> pd.DataFrame:
+        """Total de aulas por sede de los municipios pedidos (columnas planas)."""
+        partes = [self._sedes[m] for m in municipios if m in self._sedes]
+        posiciones = np.concatenate(partes) if partes else np.array([], dtype=np.intp)
+        return self.por_sede.take(posiciones).reset_index()
+
+# ===================================================================
+# Función: obtener_cubo_infraestructura
+# ===================================================================
+@memoizar_por_huella(maxsize=2)
+def obtener_cubo_infraestructura(df_infra: pd.DataFrame) -> CuboInfraestructura:
+    """Cubo de la base cargada, construido una vez por versión de los datos."""
+    return CuboInfraestructura(preparar_infraestructura(df_infra))
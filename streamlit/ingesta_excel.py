@@ -0,0 +1,143 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from cache_datos import DIRECTORIO_CACHE
+from esquema import aplicar_esquema, ESQUEMA_POBLACION
+from normalizacion import clave_nombre, normalizar_nombres, DEPARTAMENTOS, MUNICIPIOS
+
+ARCHIVOS_POBLACION = ["Datos/Info_2005_2019.xlsx", "Datos/Info_2020_2035.xlsx"]
+DIRECTORIO_EXCEL = DIRECTORIO_CACHE.parent / "excel"
+
+# Encabezado del libro (clave normalizada) -> columna con el nombre que usa la API del MEN.
+# El orden de las columnas cambia entre libros (MPIO / DPMP), por eso se empareja por nombre.
+COLUMNAS_EXCEL = {
+    'ANO': 'a_o',
+    'DP': 'c_digo_departamento',
+    'DPNOM': 'departamento',
+    'MPIO': 'c_digo_municipio',
+    'DPMP': 'municipio',
+    'AREA GEOGRAFICA': 'area_geografica',
+    'POBLACION': 'poblacion',
+}
+AREA_TOTAL = 'Total'
+
+# ===================================================================
+# Función: leer_hoja
+# ===================================================================
+def leer_hoja(ruta: str, hoja: str = None, solo_total: bool = True) -> pd.DataFrame:
+    """
+    Lee una hoja con openpyxl en modo `read_only`, fila por fila.
+
+    Solo se guardan las columnas conocidas (`COLUMNAS_EXCEL`) y, si `solo_total`,
+    las filas del área geográfica 'Total', sin cargar el libro completo en memoria.
+
+    Args:
+        ruta (str): Ruta del libro .xlsx.
+        hoja (str, opcional): Nombre de la hoja; por defecto la primera.
+        solo_total (bool): Descarta las filas de cabecera municipal y rural.
+
+    Returns:
+        pd.DataFrame: Columnas renombradas a los nombres de la API (valores sin tipar).
+    """
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = (libro[hoja] if hoja else libro.worksheets[0]).iter_rows(values_only=True)
+        encabezado = next(filas, ())
+        posiciones = {COLUMNAS_EXCEL[clave_nombre(h)]: i for i, h in enumerate(encabezado)
+                      if h is not None and clave_nombre(h) in COLUMNAS_EXCEL}
+        i_area = posiciones.get('area_geografica')
+
+        columnas = {nombre: [] for nombre in posiciones}
+        for fila in filas:
+            if solo_total and i_area is not None and fila[i_area] != AREA_TOTAL:
+                continue
+            for nombre, i in posiciones.items():
+                columnas[nombre].append(fila[i])
+    finally:
+        libro.close()
+    return pd.DataFrame(columnas)
+
+
+def _tarea(argumentos: tuple) -> pd.DataFrame:
+    return leer_hoja(*argumentos)
+
+# ===================================================================
+# Función: ingerir_excel
+# ===================================================================
+def ingerir_excel(rutas: list = ARCHIVOS_POBLACION, max_workers: int = None, solo_total: bool = True) -> pd.DataFrame:
+    """
+    Lee en paralelo (un proceso por hoja) los libros de proyecciones de población.
+
+    Los códigos se completan con ceros (departamento a 2 dígitos, municipio a 5),
+    los nombres se normalizan como los de la API y el resultado se tipa con
+    `ESQUEMA_POBLACION`.
+
+    Args:
+        rutas (list): Libros .xlsx a leer.
+        max_workers (int, opcional): Número de procesos; por defecto uno por hoja.
+
+    Returns:
+        pd.DataFrame: Serie de población por año, departamento y municipio.
+    """
+    tareas = []
+    for ruta in rutas:
+        libro = load_workbook(ruta, read_only=True)
+        tareas.extend((str(ruta), hoja, solo_total) for hoja in libro.sheetnames)
+        libro.close()
+
+    max_workers = max_workers or min(len(tareas), os.cpu_count() or 1)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as ejecutor:
+            partes = list(ejecutor.map(_tarea, tareas))
+    else:
+        partes = [_tarea(t) for t in tareas]
+
+    df = pd.concat(partes, ignore_index=True)
+    df['c_digo_departamento'] = df['c_digo_departamento'].astype(str).str.strip().str.zfill(2)
+    df['c_digo_municipio'] = df['c_digo_municipio'].astype(str).str.strip().str.zfill(5)
+    df['departamento'] = normalizar_nombres(df['departamento'], DEPARTAMENTOS)
+    df['municipio'] = normalizar_nombres(df['municipio'], MUNICIPIOS)
+    df, reporte = aplicar_esquema(df, ESQUEMA_POBLACION)
+    df.attrs['reporte_memoria'] = reporte
+    return df
+
+# ===================================================================
+# Función: cargar_poblacion
+# ===================================================================
+def cargar_poblacion(rutas: list = ARCHIVOS_POBLACION, directorio: Path = DIRECTORIO_EXCEL,
+                     forzar: bool = False) -> tuple:
+    """
+    Devuelve las proyecciones de población desde Parquet, convirtiendo los libros solo una vez.
+
+    La llave del archivo en caché depende del tamaño y la fecha de modificación de
+    cada libro: si alguno cambia, se vuelve a leer.
+
+    Returns:
+        tuple: (DataFrame, origen) donde origen es 'cache' o 'excel'.
+
+    Raises:
+        FileNotFoundError: Si falta alguno de los libros.
+    """
+    firma = hashlib.sha1()
+    for ruta in rutas:
+        info = os.stat(ruta)
+        firma.update(f"{Path(ruta).name}:{info.st_size}:{int(info.st_mtime)}".encode('utf-8'))
+    archivo = Path(directorio) / f"poblacion_{firma.hexdigest()[:16]}.parquet"
+
+    if archivo.exists() and not forzar:
+        return pd.read_parquet(archivo), "cache"
+
+    df = ingerir_excel(rutas)
+    # El reporte de memoria no es serializable a los metadatos de Parquet
+    reporte = df.attrs.pop('reporte_memoria', None)
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archivo.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, archivo)
+    df.attrs['reporte_memoria'] = reporte
+    return df, "excel"
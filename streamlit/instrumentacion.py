@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ACTIVA_POR_DEFECTO = os.environ.get("DIPLOMADO_INSTRUMENTACION", "") not in ("", "0")
+
+logger = logging.getLogger("diplomado.rendimiento")
+
+_local = threading.local()
+_lock = threading.Lock()
+_acumulado = {}
+
+try:
+    _TAMANO_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _TAMANO_PAGINA = None
+
+
+def _rss_mb() -> Optional[float]:
+    """Memoria residente del proceso en MB (solo Linux; None si no se puede leer)."""
+    if _TAMANO_PAGINA is None:
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _TAMANO_PAGINA / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+# ===================================================================
+# Registro de una ejecución del script
+# ===================================================================
+@dataclass
+class Medicion:
+    """Una etapa medida: tiempo de pared, filas procesadas y cambio de memoria residente."""
+    etapa: str
+    segundos: float
+    filas: Optional[int] = None
+    memoria_mb: Optional[float] = None
+
+
+@dataclass
+class Registro:
+    """Mediciones de un rerun de Streamlit (una sesión, un hilo)."""
+    inicio: float = field(default_factory=time.perf_counter)
+    mediciones: list = field(default_factory=list)
+
+    def a_dataframe(self) -> 'pd.DataFrame':
+        # pandas se importa al dibujar el panel: `app.py` carga este módulo antes de la navegación
+        import pandas as pd
+        df = pd.DataFrame([asdict(m) for m in self.mediciones],
+                          columns=['etapa', 'segundos', 'filas', 'memoria_mb'])
+        return df.astype({'filas': 'Int64'})
+
+
+def iniciar_rerun(activa: bool = ACTIVA_POR_DEFECTO) -> Optional[Registro]:
+    """Empieza a registrar en el hilo actual (o lo desactiva si `activa` es False)."""
+    _local.registro = Registro() if activa else None
+    return _local.registro
+
+
+def terminar_rerun() -> Optional[Registro]:
+    """
+    Cierra el registro del hilo actual, lo acumula para Prometheus y lo escribe en el log.
+
+    Returns:
+        Registro o None si la instrumentación estaba desactivada.
+    """
+    registro = getattr(_local, 'registro', None)
+    _local.registro = None
+    if registro is None:
+        return None
+    with _lock:
+        for m in registro.mediciones:
+            acumulado = _acumulado.setdefault(m.etapa, [0, 0.0, 0])
+            acumulado[0] += 1
+            acumulado[1] += m.segundos
+            acumulado[2] += m.filas or 0
+    if logger.isEnabledFor(logging.INFO):
+        for m in registro.mediciones:
+            logger.info(json.dumps(asdict(m), ensure_ascii=False))
+    return registro
+
+# ===================================================================
+# Medición de etapas
+# ===================================================================
+class _Medidor:
+    __slots__ = ('registro', 'etapa', 'filas', '_inicio', '_rss')
+
+    def __init__(self, registro: Registro, etapa: str, filas: Optional[int] = None):
+        self.registro = registro
+        self.etapa = etapa
+        self.filas = filas
+
+    def __enter__(self):
+        self._rss = _rss_mb()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self._inicio
+        rss = _rss_mb()
+        delta = round(rss - self._rss, 2) if rss is not None and self._rss is not None else None
+        self.registro.mediciones.append(Medicion(self.etapa, round(segundos, 5), self.filas, delta))
+        return False
+
+
+class _MedidorNulo:
+    """Se entrega cuando la instrumentación está apagada: no mide nada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_NULO = _MedidorNulo()
+
+
+def medir(etapa: str, filas: Optional[int] = None):
+    """
+    Administrador de contexto que mide una etapa del rerun actual.
+
+    Con la instrumentación apagada devuelve un objeto nulo compartido, así que el
+    costo es una búsqueda de atributo. Las filas se pueden indicar al final:
+
+        >>> with medir("transformacion.modelo") as m:
+        ...     esquema = build_star_schema(df_raw)
+        ...     m.filas = len(esquema.df_fact)
+    """
+    registro = getattr(_local, 'registro', None)
+    if registro is None:
+        return _NULO
+    return _Medidor(registro, etapa, filas)
+
+
+def _contar_filas(resultado) -> Optional[int]:
+    if isinstance(resultado, tuple) and resultado:
+        resultado = resultado[0]
+    pd = sys.modules.get('pandas')  # si pandas no se ha importado, el resultado no es un DataFrame
+    if pd is not None and isinstance(resultado, (pd.DataFrame, pd.Series)):
+        return len(resultado)
+    return None
+
+
+def instrumentar(etapa: str = None):
+    """
+    Decorador equivalente a `medir`; si la función devuelve un DataFrame (o una tupla
+    que empieza con uno) se registran sus filas.
+    """
+    def decorador(funcion):
+        nombre = etapa or f"{funcion.__module__}.{funcion.__name__}"
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            registro = getattr(_local, 'registro', None)
+            if registro is None:
+                return funcion(*args, **kwargs)
+            with _Medidor(registro, nombre) as m:
+                resultado = funcion(*args, **kwargs)
+                m.filas = _contar_filas(resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+class Vueltas:
+    """
+    Cronómetro por vueltas para medir bloques consecutivos sin reindentar el código.
+
+        >>> vueltas = cronometro("visualizaciones")
+        >>> ...  # construir y mostrar el gráfico 1
+        >>> vueltas.marca("grafico_1", filas=len(df_1))
+
+    Cada marca registra el tiempo transcurrido desde la marca anterior.
+    """
+
+    def __init__(self, registro: Registro, prefijo: str):
+        self.registro = registro
+        self.prefijo = prefijo
+        self._ultimo = time.perf_counter()
+        self._rss = _rss_mb()
+
+    def marca(self, nombre: str, filas: Optional[int] = None):
+        ahora, rss = time.perf_counter(), _rss_mb()
+        delta = round(rss - self._rss, 2) if rss is not None and self._rss is not None else None
+        self.registro.mediciones.append(
+            Medicion(f"{self.prefijo}.{nombre}", round(ahora - self._ultimo, 5), filas, delta))
+        self._ultimo, self._rss = time.perf_counter(), rss
+
+
+class _VueltasNulas:
+    __slots__ = ()
+
+    def marca(self, nombre: str, filas: Optional[int] = None):
+        pass
+
+
+_VUELTAS_NULAS = _VueltasNulas()
+
+
+def cronometro(prefijo: str):
+    """Cronómetro por vueltas del rerun actual (nulo si la instrumentación está apagada)."""
+    registro = getattr(_local, 'registro', None)
+    return _VUELTAS_NULAS if registro is None else Vueltas(registro, prefijo)
+
+# ===================================================================
+# Exportación
+# ===================================================================
+def texto_prometheus() -> str:
+    """Totales del proceso en formato de exposición de texto de Prometheus."""
+    with _lock:
+        datos = sorted(_acumulado.items())
+    lineas = [
+        "# HELP diplomado_etapa_ejecuciones_total Veces que se ejecutó la etapa.",
+        "# TYPE diplomado_etapa_ejecuciones_total counter",
+    ]
+    lineas += [f'diplomado_etapa_ejecuciones_total{{etapa="{e}"}} {v[0]}' for e, v in datos]
+    lineas += [
+        "# HELP diplomado_etapa_segundos_total Tiempo de pared acumulado de la etapa.",
+        "# TYPE diplomado_etapa_segundos_total counter",
+    ]
+    lineas += [f'diplomado_etapa_segundos_total{{etapa="{e}"}} {v[1]:.6f}' for e, v in datos]
+    lineas += [
+        "# HELP diplomado_etapa_filas_total Filas procesadas por la etapa.",
+        "# TYPE diplomado_etapa_filas_total counter",
+    ]
+    lineas += [f'diplomado_etapa_filas_total{{etapa="{e}"}} {v[2]}' for e, v in datos]
+    return "\n".join(lineas) + "\n"
+
+# ===================================================================
+# Función: mostrar_panel
+# ===================================================================
+def mostrar_panel(registro: Optional[Registro]):
+    """Panel de depuración en la barra lateral con las mediciones del rerun."""
+    import streamlit as st
+
+    if registro is None:
+        return
+    total = time.perf_counter() - registro.inicio
+    df = registro.a_dataframe().sort_values('segundos', ascending=False)
+
+    with st.sidebar:
+        st.markdown("### 🐞 Rendimiento del último rerun")
+        st.metric("Tiempo total", f"{total:.3f} s")
+        st.dataframe(df, hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Mediciones (JSON)", df.to_json(orient='records', force_ascii=False),
+                           file_name="rendimiento.json", mime="application/json")
+        st.download_button("⬇️ Métricas Prometheus", texto_prometheus(),
+                           file_name="metrics.txt", mime="text/plain")
@@ -0,0 +1,216 @@
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement, Template
+
+from geometria import CODIGO_COL, NOMBRE_COL
+
+# Escalas secuenciales de 6 clases (ColorBrewer), una por capa en orden
+PALETAS = [
+    ['#ffffcc', '#c7e9b4', '#7fcdbb', '#41b6c4', '#2c7fb8', '#253494'],  # YlGnBu
+    ['#ffffb2', '#fed976', '#feb24c', '#fd8d3c', '#f03b20', '#bd0026'],  # YlOrRd
+    ['#f6eff7', '#d0d1e6', '#a6bddb', '#67a9cf', '#1c9099', '#016c59'],  # PuBuGn
+    ['#feedde', '#fdd0a2', '#fdae6b', '#fd8d3c', '#e6550d', '#a63603'],  # Oranges
+]
+COLOR_SIN_DATO = '#d3d3d3'
+ESTILO_BASE = {'color': '#555555', 'weight': 0.5, 'fillOpacity': 0.7}
+ESTILO_RESALTADO = {'weight': 2, 'fillOpacity': 0.9}
+
+# ===================================================================
+# Función: valores_por_capa
+# ===================================================================
+def valores_por_capa(tabla: pd.DataFrame, columnas: list, codigo: str = 'c_digo_departamento',
+                     anio: str = 'a_o', decimales: int = 2) -> dict:
+    """
+    Convierte una tabla agregada (código, año, métricas) en el diccionario que consume el mapa.
+
+    Args:
+        tabla (pd.DataFrame): Tabla larga con una fila por departamento y año.
+        columnas (list): Métricas a incluir.
+
+    Returns:
+        dict: {métrica: {año: {código: valor}}}; los valores faltantes se omiten.
+    """
+    codigos = tabla[codigo].astype(str).str.strip()
+    # Los códigos numéricos del MEN pueden venir sin el cero inicial ('5' -> '05')
+    codigos = codigos.where(~codigos.str.isdigit(), codigos.str.zfill(2)).to_numpy()
+    anios = tabla[anio].astype('int64').astype(str).to_numpy()
+
+    datos = {}
+    for columna in columnas:
+        valores = pd.to_numeric(tabla[columna], errors='coerce').round(decimales).to_numpy(dtype='float64')
+        validos = ~np.isnan(valores)
+        capa = {}
+        for a, c, v in zip(anios[validos], codigos[validos], valores[validos]):
+            capa.setdefault(a, {})[c] = float(v)
+        datos[columna] = capa
+    return datos
+
+
+def _cortes(datos_capa: dict, clases: int) -> list:
+    """Límites por cuantiles de todos los años, para que la escala no cambie al mover el año."""
+    valores = [v for por_codigo in datos_capa.values() for v in por_codigo.values()]
+    if not valores:
+        return []
+    cortes = np.unique(np.quantile(valores, np.linspace(0, 1, clases + 1)))
+    return [round(float(c), 2) for c in cortes]
+
+# ===================================================================
+# Control de capas en el navegador
+# ===================================================================
+class ControlCapas(MacroElement):
+    """
+    Selector de métrica y año que recolorea la capa GeoJSON del lado del cliente.
+
+    Los valores de todas las métricas y años se envían una sola vez; cambiar la
+    selección solo llama a `setStyle` sobre los polígonos ya dibujados, sin volver
+    a ejecutar el script de Streamlit ni reenviar la geometría.
+
+    El resaltado al pasar el mouse también vive aquí: el `highlight_function` de
+    folium restaura con `resetStyle`, que volvería a pintar el color inicial de la
+    capa; este solo cambia borde y opacidad y conserva el relleno vigente.
+    """
+
+    _template = Template("""
+        {% macro html(this, kwargs) %}
+        <style>
+            .{{ this.get_name() }} { background: white; padding: 6px 8px; border-radius: 4px;
+                                     box-shadow: 0 1px 4px rgba(0,0,0,0.3); font: 12px sans-serif; }
+            .{{ this.get_name() }} select { display: block; margin: 2px 0 6px 0; max-width: 220px; }
+            .{{ this.get_name() }} i { display: inline-block; width: 14px; height: 10px; margin-right: 4px; }
+        </style>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+        (function() {
+            var datos = {{ this.datos|tojson }};
+            var capas = {{ this.capas|tojson }};
+            var anios = {{ this.anios|tojson }};
+            var campo = {{ this.campo|tojson }};
+            var campoNombre = {{ this.campo_nombre|tojson }};
+            var geo = {{ this.capa.get_name() }};
+            var mapa = {{ this._parent.get_name() }};
+            var clase = {{ this.get_name()|tojson }};
+            var estiloBase = {{ this.estilo_base|tojson }};
+            var estiloResaltado = {{ this.estilo_resaltado|tojson }};
+
+            geo.eachLayer(function(l) {
+                l.on('mouseover', function() { l.setStyle(estiloResaltado); l.bringToFront(); });
+                l.on('mouseout', function() { l.setStyle(estiloBase); });
+            });
+
+            function opciones(lista, seleccion) {
+                return lista.map(function(o) {
+                    return '<option value="' + o[0] + '"' + (o[0] == seleccion ? ' selected' : '') + '>' + o[1] + '</option>';
+                }).join('');
+            }
+
+            var selector = L.control({position: 'topright'});
+            var selMetrica, selAnio;
+            selector.onAdd = function() {
+                var div = L.DomUtil.create('div', clase);
+                div.innerHTML = '<b>Métrica</b><select>' + opciones(capas.map(function(c, i) { return [i, c.etiqueta]; }), 0) + '</select>'
+                              + '<b>Año</b><select>' + opciones(anios.map(function(a) { return [a, a]; }), anios[anios.length - 1]) + '</select>';
+                var selects = div.getElementsByTagName('select');
+                selMetrica = selects[0];
+                selAnio = selects[1];
+                selMetrica.onchange = actualizar;
+                selAnio.onchange = actualizar;
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+                return div;
+            };
+
+            var leyenda = L.control({position: 'bottomright'});
+            var divLeyenda;
+            leyenda.onAdd = function() {
+                divLeyenda = L.DomUtil.create('div', clase);
+                return divLeyenda;
+            };
+
+            function color(capa, v) {
+                if (v === undefined || v === null) { return {{ this.sin_dato|tojson }}; }
+                for (var i = 1; i < capa.cortes.length - 1; i++) {
+                    if (v < capa.cortes[i]) { return capa.colores[i - 1]; }
+                }
+                return capa.colores[Math.max(capa.cortes.length - 2, 0)];
+            }
+
+            function actualizar() {
+                var capa = capas[selMetrica.value];
+                var valores = (datos[capa.columna] || {})[selAnio.value] || {};
+                geo.eachLayer(function(l) {
+                    var props = l.feature.properties;
+                    var v = valores[props[campo]];
+                    l.setStyle({fillColor: color(capa, v)});
+                    var texto = '<b>' + props[campoNombre] + '</b><br>' + capa.etiqueta + ': '
+                              + (v === undefined ? 'sin dato' : v.toLocaleString('es-CO'));
+                    if (l.getTooltip()) { l.setTooltipContent(texto); } else { l.bindTooltip(texto, {sticky: true}); }
+                });
+                var filas = ['<b>' + capa.etiqueta + ' - ' + selAnio.value + '</b>'];
+                for (var i = 0; i < capa.cortes.length - 1; i++) {
+                    filas.push('<i style="background:' + capa.colores[i] + '"></i>'
+                               + capa.cortes[i].toLocaleString('es-CO') + ' – ' + capa.cortes[i + 1].toLocaleString('es-CO'));
+                }
+                filas.push('<i style="background:' + {{ this.sin_dato|tojson }} + '"></i>Sin dato');
+                divLeyenda.innerHTML = filas.join('<br>');
+            }
+
+            selector.addTo(mapa);
+            leyenda.addTo(mapa);
+            actualizar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, capa: folium.GeoJson, datos: dict, capas: list, anios: list,
+                 campo: str = CODIGO_COL, campo_nombre: str = NOMBRE_COL, sin_dato: str = COLOR_SIN_DATO,
+                 estilo_base: dict = ESTILO_BASE, estilo_resaltado: dict = ESTILO_RESALTADO):
+        super().__init__()
+        self._name = "ControlCapas"
+        self.capa = capa
+        self.datos = datos
+        self.capas = capas
+        self.anios = anios
+        self.campo = campo
+        self.campo_nombre = campo_nombre
+        self.sin_dato = sin_dato
+        self.estilo_base = estilo_base
+        self.estilo_resaltado = estilo_resaltado
+
+# ===================================================================
+# Función: construir_mapa
+# ===================================================================
+def construir_mapa(geojson: dict, tabla: pd.DataFrame, metricas: dict, codigo: str = 'c_digo_departamento',
+                   anio: str = 'a_o', clases: int = 6, zoom_start: int = 5) -> folium.Map:
+    """
+    Mapa coroplético único con todas las métricas como capas intercambiables.
+
+    La geometría se incrusta una sola vez y los valores de cada métrica y año viajan
+    como un diccionario pequeño; el selector del mapa elige qué mostrar sin
+    reconstruirlo. Las clases de color se calculan por métrica sobre todos los años.
+
+    Args:
+        geojson (dict): FeatureCollection de departamentos (ver `geometria.obtener_geojson`).
+        tabla (pd.DataFrame): Agregados por departamento y año (p. ej. `CuboOLAP.codigo_anio`).
+        metricas (dict): Etiqueta visible -> columna de `tabla`.
+        codigo (str): Columna con el código DANE del departamento.
+        anio (str): Columna del año.
+
+    Returns:
+        folium.Map: Mapa listo para `st_folium`.
+    """
+    datos = valores_por_capa(tabla, list(metricas.values()), codigo, anio)
+    capas = [{'etiqueta': etiqueta, 'columna': columna, 'cortes': _cortes(datos[columna], clases),
+              'colores': PALETAS[i % len(PALETAS)]}
+             for i, (etiqueta, columna) in enumerate(metricas.items())]
+    anios = sorted({a for capa in datos.values() for a in capa}, key=int)
+
+    m = folium.Map(location=[4.6, -74.1], zoom_start=zoom_start, tiles="CartoDB positron")
+    capa = folium.GeoJson(
+        geojson,
+        name="departamentos",
+        style_function=lambda _: {'fillColor': COLOR_SIN_DATO, **ESTILO_BASE},
+    ).add_to(m)
+    ControlCapas(capa, datos, capas, anios).add_to(m)
+    return m
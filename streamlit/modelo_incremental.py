@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from cache_datos import DIRECTORIO_CACHE
+from esquema import aplicar_esquema, ESQUEMA_HECHOS
+
+DIRECTORIO_MODELO = DIRECTORIO_CACHE.parent / "modelo"
+
+CLAVE_TIEMPO = ['a_o']
+CLAVE_GEO = ['c_digo_departamento', 'departamento', 'municipio']
+METRICAS = ['poblaci_n_5_16', 'tasa_matriculaci_n_5_16', 'cobertura_neta', 'cobertura_bruta']
+
+# ===================================================================
+# Instantánea del modelo
+# ===================================================================
+@dataclass(frozen=True)
+class Instantanea:
+    """
+    Dimensiones, hechos y versión del modelo leídos juntos bajo su lock.
+
+    El modelo del proceso es compartido (refrescador, pestañas, precalentamiento):
+    leer sus atributos uno por uno puede mezclar dos versiones si otro hilo lo
+    actualiza entre lecturas. Los DataFrames nunca se modifican en su lugar, así que
+    la instantánea sigue siendo coherente después de que el modelo avance.
+
+    Attributes:
+        dim_tiempo, dim_geo, df_fact (pd.DataFrame): Dimensiones y tabla de hechos.
+        version (str): Versión de ese contenido (ver `ModeloIncremental.version`).
+        anios (list): Años agregados, actualizados o retirados por la actualización que la produjo.
+    """
+    dim_tiempo: pd.DataFrame
+    dim_geo: pd.DataFrame
+    df_fact: pd.DataFrame
+    version: str
+    anios: list = field(default_factory=list)
+
+# ===================================================================
+# Modelo estrella incremental
+# ===================================================================
+class ModeloIncremental:
+    """
+    Mantiene `dim_tiempo`, `dim_geo` y la tabla de hechos entre ejecuciones y solo procesa lo que cambió.
+
+    La tabla de hechos se guarda particionada por año. En cada actualización se
+    calcula una huella por fila del origen y se agrega por año: solo los años cuya
+    huella difiere de la guardada se reconstruyen, de modo que agregar un año nuevo
+    cuesta lo que mide ese año y no toda la historia. Las dimensiones solo crecen,
+    así que las llaves sustitutas (`id_tiempo`, `id_geo`) nunca cambian.
+
+    Args:
+        directorio (Path, opcional): Carpeta donde persistir el modelo. None lo mantiene solo en memoria.
+    """
+
+    def __init__(self, directorio: Optional[Path] = None):
+        self.directorio = Path(directorio) if directorio is not None else None
+        self._lock = threading.RLock()
+        self.dim_tiempo = pd.DataFrame({'id_tiempo': pd.Series(dtype='int64'), 'a_o': pd.Series(dtype='float64')})
+        self.dim_geo = pd.DataFrame({'id_geo': pd.Series(dtype='int64'),
+                                     **{c: pd.Series(dtype='object') for c in CLAVE_GEO}})
+        self._particiones = {}
+        self._huellas = {}
+        self._df_fact = None
+        if self.directorio is not None:
+            self._cargar()
+
+    # ------------------------------------------------------------
+    # Propiedades públicas
+    # ------------------------------------------------------------
+    @property
+    def df_fact(self) -> pd.DataFrame:
+        """Tabla de hechos completa (se arma una sola vez por versión)."""
+        with self._lock:
+            if self._df_fact is None:
+                columnas = ['id_tiempo', 'id_geo'] + METRICAS
+                if self._particiones:
+                    partes = [self._particiones[k] for k in sorted(self._particiones)]
+                    self._df_fact = pd.concat(partes, ignore_index=True)[columnas]
+                else:
+                    self._df_fact = pd.DataFrame(columns=columnas)
+            return self._df_fact
+
+    @property
+    def version(self) -> str:
+        """Identificador que cambia cada vez que cambia el contenido del modelo."""
+        texto = json.dumps(sorted(self._huellas.items()))
+        return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+    def instantanea(self, anios: list = ()) -> Instantanea:
+        """Dimensiones, hechos y versión actuales, coherentes entre sí."""
+        with self._lock:
+            return Instantanea(self.dim_tiempo, self.dim_geo, self.df_fact, self.version, list(anios))
+
+    # ------------------------------------------------------------
+    # Actualización
+    # ------------------------------------------------------------
+    def actualizar(self, df_clean: pd.DataFrame) -> Instantanea:
+        """
+        Incorpora las filas limpias y reconstruye solo los años nuevos o modificados.
+
+        `df_clean` es la base completa: los años que ya no trae se retiran de la tabla
+        de hechos (sus filas de `dim_tiempo` se conservan para no reasignar llaves).
+
+        Args:
+            df_clean (pd.DataFrame): Filas con `a_o`, las columnas geográficas y las métricas.
+
+        Returns:
+            Instantanea: El modelo resultante, tomado antes de soltar el lock; `anios` son
+                los años que se agregaron, actualizaron o retiraron (vacía si no hubo cambios).
+        """
+        columnas = CLAVE_TIEMPO + CLAVE_GEO + METRICAS
+        df = df_clean[columnas]
+        filas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        # Huella por año: suma (módulo 2**64) de las huellas de sus filas
+        huellas_anio = pd.Series(filas, index=df['a_o'].to_numpy()).groupby(level=0).sum()
+
+        with self._lock:
+            cambiados = [a for a, h in huellas_anio.items() if self._huellas.get(str(a)) != str(h)]
+            presentes = {str(a) for a in huellas_anio.index}
+            retirados = [a for a in self._huellas if a not in presentes]
+            if not cambiados and not retirados:
+                return self.instantanea()
+
+            filas_retiradas = self.dim_tiempo[self.dim_tiempo['a_o'].isin([float(a) for a in retirados])]
+            ids_retirados = [int(i) for i in filas_retiradas['id_tiempo']]
+            for id_tiempo in ids_retirados:
+                self._particiones.pop(id_tiempo, None)
+            for anio in retirados:
+                del self._huellas[anio]
+
+            delta = df[df['a_o'].isin(cambiados)]
+            self.dim_tiempo, ids_tiempo = _extender_dimension(self.dim_tiempo, delta, CLAVE_TIEMPO, 'id_tiempo')
+            self.dim_geo, ids_geo = _extender_dimension(self.dim_geo, delta, CLAVE_GEO, 'id_geo')
+
+            # Los hechos se arman con las llaves ya resueltas por fila: sin merges ni copias del texto
+            hechos = pd.DataFrame({'id_tiempo': ids_tiempo, 'id_geo': ids_geo,
+                                   **{m: delta[m].to_numpy() for m in METRICAS}})
+            anio_de = dict(zip(self.dim_tiempo['id_tiempo'], self.dim_tiempo['a_o']))
+            for id_tiempo, posiciones in hechos.groupby('id_tiempo', sort=False).indices.items():
+                anio = anio_de[id_tiempo]
+                particion = hechos.take(posiciones).reset_index(drop=True)
+                self._particiones[int(id_tiempo)], _ = aplicar_esquema(particion, ESQUEMA_HECHOS, medir=False)
+                self._huellas[str(anio)] = str(huellas_anio[anio])
+
+            self._df_fact = None
+            if self.directorio is not None:
+                self._persistir([int(i) for i in self.dim_tiempo.loc[self.dim_tiempo['a_o'].isin(cambiados), 'id_tiempo']],
+                                ids_retirados)
+            return self.instantanea(sorted(cambiados + list(filas_retiradas['a_o'])))
+
+    # ------------------------------------------------------------
+    # Persistencia en disco (Parquet)
+    # ------------------------------------------------------------
+    def _persistir(self, ids_tiempo: list, ids_retirados: list = ()):
+        carpeta_hechos = self.directorio / "hechos"
+        carpeta_hechos.mkdir(parents=True, exist_ok=True)
+        for id_tiempo in ids_tiempo:
+            _escribir_atomico(self._particiones[id_tiempo], carpeta_hechos / f"{id_tiempo}.parquet")
+        for id_tiempo in ids_retirados:
+            (carpeta_hechos / f"{id_tiempo}.parquet").unlink(missing_ok=True)
+        _escribir_atomico(self.dim_tiempo, self.directorio / "dim_tiempo.parquet")
+        _escribir_atomico(self.dim_geo, self.directorio / "dim_geo.parquet")
+        tmp = self.directorio / "huellas.tmp"
+        tmp.write_text(json.dumps(self._huellas), encoding="utf-8")
+        os.replace(tmp, self.directorio / "huellas.json")
+
+    def _cargar(self):
+        try:
+            huellas = json.loads((self.directorio / "huellas.json").read_text(encoding="utf-8"))
+            dim_tiempo = pd.read_parquet(self.directorio / "dim_tiempo.parquet")
+            dim_geo = pd.read_parquet(self.directorio / "dim_geo.parquet")
+            # Solo los años vigentes: los retirados conservan su fila en dim_tiempo pero no su partición
+            anios = {float(a) for a in huellas}
+            particiones = {int(id_tiempo): pd.read_parquet(self.directorio / "hechos" / f"{id_tiempo}.parquet")
+                           for id_tiempo, anio in zip(dim_tiempo['id_tiempo'], dim_tiempo['a_o'])
+                           if float(anio) in anios}
+        except (FileNotFoundError, ValueError, OSError):
+            # Modelo ausente o incompleto: se reconstruye con la próxima actualización
+            return
+        self._huellas, self.dim_tiempo, self.dim_geo, self._particiones = huellas, dim_tiempo, dim_geo, particiones
+
+
+def _codificar(df: pd.DataFrame, cols: list) -> tuple:
+    """
+    Código por fila de cada combinación distinta de `cols`, en un solo recorrido.
+
+    Cada columna se factoriza por separado y los códigos se combinan de a una
+    columna, volviendo a factorizar para que nunca superen el número de filas.
+
+    Returns:
+        tuple: (códigos por fila, DataFrame con una fila por combinación en orden de aparición).
+    """
+    codigos = np.zeros(len(df), dtype=np.int64)
+    for c in cols:
+        cod_columna, unicos = pd.factorize(df[c])
+        codigos, _ = pd.factorize(codigos * (len(unicos) + 1) + (cod_columna + 1))
+    n = int(codigos.max()) + 1 if len(codigos) else 0
+    # Primera fila de cada combinación: al escribir en reversa gana la aparición más temprana
+    primera = np.empty(n, dtype=np.int64)
+    primera[codigos[::-1]] = np.arange(len(codigos) - 1, -1, -1)
+    return codigos, df[cols].take(primera).reset_index(drop=True)
+
+
+def _indice(df: pd.DataFrame, cols: list) -> pd.Index:
+    return pd.Index(df[cols[0]]) if len(cols) == 1 else pd.MultiIndex.from_frame(df[cols])
+
+
+def _extender_dimension(dim: pd.DataFrame, df: pd.DataFrame, cols: list, id_col: str) -> tuple:
+    """
+    Agrega a la dimensión las combinaciones nuevas y resuelve la llave sustituta de cada fila de `df`.
+
+    Las combinaciones nuevas reciben llaves consecutivas a partir del máximo actual,
+    en el orden de `cols`. La búsqueda es una tabla hash sobre las combinaciones
+    distintas; las llaves llegan a las filas indexando un arreglo con sus códigos.
+
+    Returns:
+        tuple: (dimensión extendida, np.ndarray con la llave de cada fila de `df`).
+    """
+    codigos, combinaciones = _codificar(df, cols)
+    posiciones = _indice(dim, cols).get_indexer(_indice(combinaciones, cols))
+    ids = np.empty(len(combinaciones), dtype='int64')
+    existentes = posiciones >= 0
+    ids[existentes] = dim[id_col].to_numpy()[posiciones[existentes]]
+
+    nuevos = combinaciones[~existentes].sort_values(by=cols)
+    if not nuevos.empty:
+        inicio = int(dim[id_col].max()) + 1 if len(dim) else 1
+        ids[nuevos.index.to_numpy()] = np.arange(inicio, inicio + len(nuevos), dtype='int64')
+        nuevos = nuevos.reset_index(drop=True)
+        nuevos.insert(0, id_col, np.arange(inicio, inicio + len(nuevos), dtype='int64'))
+        dim = nuevos if dim.empty else pd.concat([dim, nuevos], ignore_index=True)
+    return dim, ids[codigos]
+
+
+def _escribir_atomico(df: pd.DataFrame, ruta: Path):
+    tmp = ruta.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, ruta)
+
+# ===================================================================
+# Función: obtener_modelo
+# ===================================================================
+@lru_cache(maxsize=None)
+def obtener_modelo() -> ModeloIncremental:
+    """Modelo persistente único del proceso, guardado en DIRECTORIO_MODELO."""
+    return ModeloIncremental(DIRECTORIO_MODELO)
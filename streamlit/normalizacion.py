@@ -0,0 +1,114 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# ===================================================================
+# Diccionarios de nombres canónicos
+# ===================================================================
+_NOMBRES_DEPARTAMENTOS = [
+    'Amazonas', 'Antioquia', 'Arauca', 'Atlántico', 'Bogotá D.C.', 'Bolívar', 'Boyacá', 'Caldas',
+    'Caquetá', 'Casanare', 'Cauca', 'Cesar', 'Chocó', 'Córdoba', 'Cundinamarca', 'Guainía',
+    'Guaviare', 'Huila', 'La Guajira', 'Magdalena', 'Meta', 'Nariño', 'Norte de Santander',
+    'Putumayo', 'Quindío', 'Risaralda', 'San Andrés', 'Santander', 'Sucre', 'Tolima',
+    'Valle del Cauca', 'Vaupés', 'Vichada', 'Nacional',
+]
+
+_ALIAS_DEPARTAMENTOS = {
+    'BOGOTA': 'Bogotá D.C.',
+    'BOGOTA DC': 'Bogotá D.C.',
+    'SANTAFE DE BOGOTA D C': 'Bogotá D.C.',
+    'ARCHIPIELAGO DE SAN ANDRES': 'San Andrés',
+    'ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA': 'San Andrés',
+    'SAN ANDRES PROVIDENCIA Y SANTA CATALINA': 'San Andrés',
+    'SAN ANDRES Y PROVIDENCIA': 'San Andrés',
+    'GUAJIRA': 'La Guajira',
+    'VALLE': 'Valle del Cauca',
+    'NORTE SANTANDER': 'Norte de Santander',
+}
+
+_ALIAS_MUNICIPIOS = {
+    'BOGOTA': 'Bogotá D.C.',
+    'BOGOTA D C': 'Bogotá D.C.',
+    'BOGOTA DC': 'Bogotá D.C.',
+}
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9A-Z]+")
+_NO_PALABRA = re.compile(r"[\W_]+")
+
+
+def clave_nombre(texto) -> str:
+    """
+    Clave de comparación de un nombre: sin tildes, en mayúsculas y sin puntuación.
+
+    Ejemplo:
+        >>> clave_nombre("Archipiélago de San Andrés, Providencia y Santa Catalina")
+        'ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA'
+    """
+    sin_tildes = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes.upper()).strip()
+
+
+def _forma_titulo(texto) -> str:
+    """Nombre en formato título conservando sus tildes, sin puntuación ni espacios repetidos."""
+    return _NO_PALABRA.sub(' ', str(texto)).strip().title()
+
+
+def _tildes(texto: str) -> int:
+    return sum(not c.isascii() for c in texto)
+
+
+def _diccionario(nombres: list, alias: dict) -> dict:
+    dic = {clave_nombre(n): n for n in nombres}
+    dic.update({clave_nombre(k): v for k, v in alias.items()})
+    return dic
+
+
+DEPARTAMENTOS = _diccionario(_NOMBRES_DEPARTAMENTOS, _ALIAS_DEPARTAMENTOS)
+MUNICIPIOS = _diccionario([], _ALIAS_MUNICIPIOS)
+
+# ===================================================================
+# Función: normalizar_nombres
+# ===================================================================
+def normalizar_nombres(serie: pd.Series, diccionario: dict = None) -> pd.Series:
+    """
+    Normaliza una columna de nombres trabajando solo sobre sus valores únicos.
+
+    La columna se factoriza, cada valor distinto se lleva a su clave (`clave_nombre`)
+    y se traduce con el diccionario (nombres canónicos y alias). La clave solo sirve
+    para buscar y agrupar: lo que no está en el diccionario conserva sus tildes en
+    formato título, y las grafías que comparten clave ("MEDELLIN", "Medellín") se
+    unen en una sola, la de más tildes (a igualdad, la primera que aparece). El
+    resultado se reconstruye a partir de los códigos, así el costo depende de la
+    cardinalidad y no del número de filas.
+
+    Args:
+        serie (pd.Series): Columna de texto u objeto categórico.
+        diccionario (dict, opcional): Clave normalizada -> nombre canónico (p. ej. DEPARTAMENTOS).
+
+    Returns:
+        pd.Series: Columna categórica con los nombres normalizados (categorías ordenadas alfabéticamente).
+    """
+    diccionario = diccionario or {}
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, unicos = pd.factorize(serie)
+
+    claves = [clave_nombre(valor) for valor in unicos]
+    representantes = {}
+    for clave, valor in zip(claves, unicos):
+        if clave not in diccionario:
+            forma = _forma_titulo(valor)
+            if clave not in representantes or _tildes(forma) > _tildes(representantes[clave]):
+                representantes[clave] = forma
+    normalizados = [diccionario.get(clave) or representantes[clave] for clave in claves]
+
+    categorias = sorted(set(normalizados))
+    posicion = {nombre: i for i, nombre in enumerate(categorias)}
+    traduccion = np.array([posicion[n] for n in normalizados] + [-1], dtype='int32')
+    # El código -1 (nulos) apunta al último elemento de `traduccion`, que también es -1
+    nuevos = traduccion[codigos]
+    return pd.Series(pd.Categorical.from_codes(nuevos, categories=categorias),
+                     index=serie.index, name=serie.name)
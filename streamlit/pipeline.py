@@ -0,0 +1,224 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+
+import pandas as pd
+from modelo_incremental import obtener_modelo
+from normalizacion import normalizar_nombres, DEPARTAMENTOS, MUNICIPIOS
+
+COLUMNAS_RELEVANTES = [
+    'a_o', 'departamento', 'municipio', 'c_digo_departamento',
+    'poblaci_n_5_16', 'tasa_matriculaci_n_5_16',
+    'cobertura_neta', 'cobertura_bruta'
+]
+COLUMNAS_TEXTO = ['departamento', 'municipio', 'c_digo_departamento']
+
+
+class ColumnasFaltantesError(ValueError):
+    """El origen no trae todas las columnas que necesita el modelo."""
+
+    def __init__(self, columnas: list):
+        super().__init__(f"Columnas faltantes: {columnas}")
+        self.columnas = columnas
+
+# ===================================================================
+# Huella de contenido y memoización
+# ===================================================================
+# id(DataFrame) -> huella registrada al cargarlo. No viaja en `attrs`, que pandas copia a
+# los DataFrames derivados (filtros, `copy()`, la base limpia): un derivado no hereda la
+# huella de su origen. La entrada se borra cuando se libera el DataFrame.
+_huellas = {}
+
+
+def registrar_huella(df: pd.DataFrame, valor: str = None) -> str:
+    """
+    Asocia a este objeto su huella (la calcula si no se da) para no volver a recorrerlo.
+
+    Se usa al cargar un conjunto, antes de publicarlo: quien lo recibe no debe modificarlo.
+
+    Returns:
+        str: La huella registrada.
+    """
+    valor = huella(df) if valor is None else valor
+    if _huellas.get(id(df)) != valor:
+        _huellas[id(df)] = valor
+        weakref.finalize(df, _huellas.pop, id(df), None)
+    return valor
+
+
+def huella(df: pd.DataFrame) -> str:
+    """
+    Huella del contenido de un DataFrame (columnas + valores).
+
+    Si el objeto tiene una huella registrada al cargarlo (`registrar_huella`) se
+    reutiliza, así el costo de recorrer los datos se paga una sola vez por carga.
+    """
+    if id(df) in _huellas:
+        return _huellas[id(df)]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(df.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def memoizar_por_huella(maxsize: int = 4):
+    """
+    Memoiza una función de un DataFrame según la huella de su contenido (LRU por proceso).
+
+    A diferencia de `st.cache_data`, devuelve el mismo objeto sin copiarlo, de modo que
+    todas las sesiones comparten el resultado. Quien lo recibe no debe modificarlo.
+    `sembrar(df, resultado)` registra un resultado calculado en otra parte (p. ej. los
+    artefactos que deja `etl.py`) para que la primera llamada ya no lo recalcule.
+    """
+    def decorador(funcion):
+        resultados = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(funcion)
+        def envoltura(df: pd.DataFrame):
+            clave = huella(df)
+            with lock:
+                if clave in resultados:
+                    resultados.move_to_end(clave)
+                    return resultados[clave]
+            return guardar(clave, funcion(df))
+
+        def guardar(clave: str, resultado):
+            with lock:
+                resultados[clave] = resultado
+                resultados.move_to_end(clave)
+                while len(resultados) > maxsize:
+                    resultados.popitem(last=False)
+            return resultado
+
+        envoltura.cache_clear = resultados.clear
+        envoltura.sembrar = lambda df, resultado: guardar(huella(df), resultado)
+        return envoltura
+    return decorador
+
+# ===================================================================
+# Limpieza
+# ===================================================================
+def limpiar_datos(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Limpia la base del MEN: nombres canónicos, nivel nacional y tipos numéricos.
+
+    Raises:
+        ColumnasFaltantesError: Si faltan columnas relevantes.
+    """
+    # 🔄 Columnas en minúscula; solo se copian las relevantes
+    columnas = {c.lower(): c for c in df_raw.columns}
+    columnas_faltantes = [col for col in COLUMNAS_RELEVANTES if col not in columnas]
+    if columnas_faltantes:
+        raise ColumnasFaltantesError(columnas_faltantes)
+    df = df_raw[[columnas[c] for c in COLUMNAS_RELEVANTES]].copy()
+    df.columns = COLUMNAS_RELEVANTES
+
+    # 🔄 Nombres canónicos de departamento y municipio (incluye Bogotá y San Andrés)
+    df['departamento'] = normalizar_nombres(df['departamento'], DEPARTAMENTOS)
+    df['municipio'] = normalizar_nombres(df['municipio'], MUNICIPIOS)
+
+    for col in df.columns:
+        if col not in COLUMNAS_TEXTO:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # ❌ Eliminar registros del nivel nacional
+    df = df[df['departamento'] != 'Nacional']
+    return df.dropna()
+
+# ===================================================================
+# Modelo estrella
+# ===================================================================
+@dataclass
+class StarSchema:
+    """
+    Artefactos terminados del modelo estrella, listos para que las pestañas los lean.
+
+    Attributes:
+        dim_tiempo, dim_geo, df_fact (pd.DataFrame): Dimensiones y tabla de hechos.
+        df_clean (pd.DataFrame): Filas válidas tras la limpieza.
+        version (str): Versión de la tabla de hechos (cambia si cambia su contenido).
+        registros_originales (int): Filas de la base cruda.
+        anios_actualizados (list): Años que se (re)procesaron al construir esta versión.
+    """
+    dim_tiempo: pd.DataFrame
+    dim_geo: pd.DataFrame
+    df_fact: pd.DataFrame
+    df_clean: pd.DataFrame
+    version: str
+    registros_originales: int
+    anios_actualizados: list = field(default_factory=list)
+    _df_ext: pd.DataFrame = field(default=None, repr=False)
+
+    @property
+    def df_ext(self) -> pd.DataFrame:
+        """Hechos unidos a sus dimensiones, con el departamento normalizado y el año entero."""
+        if self._df_ext is None:
+            self._df_ext = _extender_hechos(self.df_fact, self.dim_geo, self.dim_tiempo)
+        return self._df_ext
+
+
+def _extender_hechos(df_fact: pd.DataFrame, dim_geo: pd.DataFrame, dim_tiempo: pd.DataFrame) -> pd.DataFrame:
+    # Llave sustituta -> posición en su dimensión; las columnas se copian por índice, sin merges
+    pos_geo = pd.Index(dim_geo['id_geo']).get_indexer(df_fact['id_geo'])
+    pos_tiempo = pd.Index(dim_tiempo['id_tiempo']).get_indexer(df_fact['id_tiempo'])
+    huerfanas = (pos_geo < 0) | (pos_tiempo < 0)
+    if huerfanas.any():
+        # Hechos y dimensiones de versiones distintas: descartar filas falsearía los agregados
+        raise ValueError(f"{int(huerfanas.sum())} fila(s) de hechos sin llave en sus dimensiones")
+    df = pd.concat([df_fact.reset_index(drop=True),
+                    dim_geo.drop(columns='id_geo').take(pos_geo).reset_index(drop=True),
+                    dim_tiempo.drop(columns='id_tiempo').take(pos_tiempo).reset_index(drop=True)], axis=1)
+
+    # Nombres ya normalizados en la limpieza; la dimensión persistida puede venir como texto
+    df['departamento'] = normalizar_nombres(df['departamento'], DEPARTAMENTOS)
+
+    # Asegurar tipo entero en año
+    df['a_o'] = pd.to_numeric(df['a_o'], errors='coerce').astype('Int64')
+    return df
+
+# ===================================================================
+# Función: build_star_schema
+# ===================================================================
+@memoizar_por_huella(maxsize=4)
+def build_star_schema(df_raw: pd.DataFrame) -> StarSchema:
+    """
+    Limpia la base cruda y construye (incrementalmente) el modelo estrella.
+
+    El resultado se memoiza por la huella de `df_raw`: mientras los datos no cambien,
+    los reruns de Streamlit reciben el mismo objeto sin recalcular nada.
+
+    Raises:
+        ColumnasFaltantesError: Si faltan columnas relevantes.
+    """
+    df_clean = limpiar_datos(df_raw)
+    # Todo lo que se publica sale de una sola instantánea: otro hilo puede actualizar
+    # el modelo compartido en cuanto `actualizar` suelta el lock
+    modelo = obtener_modelo().actualizar(df_clean)
+    return StarSchema(
+        dim_tiempo=modelo.dim_tiempo,
+        dim_geo=modelo.dim_geo,
+        df_fact=modelo.df_fact,
+        df_clean=df_clean,
+        version=modelo.version,
+        registros_originales=len(df_raw),
+        anios_actualizados=modelo.anios,
+    )
+
+# ===================================================================
+# Función: preparar_infraestructura
+# ===================================================================
+@memoizar_por_huella(maxsize=2)
+def preparar_infraestructura(df_infra: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza columnas y nombres de la base de infraestructura y agrega `total_aulas`."""
+    df = df_infra.copy()
+
+    # Normalizar nombres de columnas para facilidad
+    df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
+    df['nombre_depto'] = normalizar_nombres(df['nombre_depto'], DEPARTAMENTOS)
+    df['nombre_municipio'] = normalizar_nombres(df['nombre_municipio'], MUNICIPIOS)
+    df['total_aulas'] = df[['aulas_nuevas', 'aulas_mejoradas']].sum(axis=1)
+    return df
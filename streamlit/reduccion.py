@@ -0,0 +1,262 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Límites de lo que se envía al navegador, sin importar el tamaño de los datos
+MAX_PUNTOS_TRAZA = 1500     # puntos por serie en gráficos de líneas
+MAX_OBSERVACIONES = 1000    # observaciones individuales dibujadas sobre cajas y violines
+UMBRAL_WEBGL = 1000         # a partir de aquí se dibuja con WebGL en lugar de SVG
+PUNTOS_DENSIDAD = 100       # resolución de la densidad de cada violín
+ETIQUETA_OTROS = "Otros"
+
+# ===================================================================
+# Utilidades
+# ===================================================================
+def modo_render(n_puntos: int) -> str:
+    """`render_mode` para plotly express: WebGL cuando hay muchos puntos."""
+    return 'webgl' if n_puntos > UMBRAL_WEBGL else 'svg'
+
+
+def clase_dispersion(n_puntos: int):
+    """`go.Scattergl` o `go.Scatter` según el número de puntos de la traza."""
+    return go.Scattergl if n_puntos > UMBRAL_WEBGL else go.Scatter
+
+
+def muestra(df: pd.DataFrame, n: int, semilla: int = 0) -> pd.DataFrame:
+    """Muestra reproducible de a lo sumo `n` filas (el mismo gráfico en cada rerun)."""
+    return df if len(df) <= n else df.sample(n, random_state=semilla)
+
+
+def _numerico(x: pd.Series) -> np.ndarray:
+    """Eje x como números para medir áreas (fechas en ns, categorías por posición)."""
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+    if pd.api.types.is_numeric_dtype(x):
+        return x.to_numpy(dtype=float)
+    return np.arange(len(x), dtype=float)
+
+# ===================================================================
+# Función: lttb
+# ===================================================================
+def lttb(x, y, umbral: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige `umbral` puntos que conservan la forma de la serie.
+
+    El primer y el último punto se conservan; el resto se divide en `umbral - 2`
+    cubetas y de cada una se toma el punto que forma el triángulo de mayor área con
+    el punto elegido antes y el promedio de la cubeta siguiente.
+
+    Args:
+        x, y: Coordenadas numéricas, ordenadas por x.
+        umbral (int): Número de puntos a conservar.
+
+    Returns:
+        np.ndarray: Posiciones de los puntos elegidos, en orden.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(np.int64)
+    elegidos = np.empty(umbral, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(umbral - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente = slice(bordes[i + 1], bordes[i + 2] if i + 2 < len(bordes) else n)
+        cx, cy = x[siguiente].mean(), y[siguiente].mean()
+        areas = np.abs((x[a] - cx) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (cy - y[a]))
+        a = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return elegidos
+
+# ===================================================================
+# Función: reducir_series
+# ===================================================================
+def reducir_series(df: pd.DataFrame, x: str, y: str, color: str = None,
+                   max_puntos: int = MAX_PUNTOS_TRAZA) -> pd.DataFrame:
+    """
+    Limita cada serie (una por valor de `color`) a `max_puntos` con LTTB.
+
+    Las series que ya caben se devuelven completas; las filas sin `y` se descartan
+    solo en las series que se reducen.
+
+    Returns:
+        pd.DataFrame: Subconjunto de `df` ordenado por `color` y `x`.
+    """
+    orden = [color, x] if color else [x]
+    df = df.sort_values(orden, kind='stable')
+    grupos = df.groupby(color, observed=True, sort=False) if color else [(None, df)]
+
+    partes = []
+    for _, serie in grupos:
+        if len(serie) > max_puntos:
+            serie = serie[serie[y].notna()]
+            serie = serie.iloc[lttb(_numerico(serie[x]), serie[y].to_numpy(dtype=float), max_puntos)]
+        partes.append(serie)
+    return pd.concat(partes) if partes else df
+
+# ===================================================================
+# Función: top_n
+# ===================================================================
+def top_n(df: pd.DataFrame, categoria: str, valor: str, n: int = 20, grupo: str = None,
+          etiqueta: str = ETIQUETA_OTROS) -> pd.DataFrame:
+    """
+    Conserva las `n` categorías de mayor `valor` y suma el resto en una sola fila.
+
+    Espera una fila por categoría (o por grupo y categoría si se indica `grupo`),
+    como la que deja un `groupby(...).sum().reset_index()`.
+
+    Returns:
+        pd.DataFrame: Columnas [`grupo`,] `categoria`, `valor`.
+    """
+    columnas = [grupo, categoria, valor] if grupo else [categoria, valor]
+    df = df[columnas]
+    if grupo:
+        puesto = df.groupby(grupo, observed=True)[valor].rank(method='first', ascending=False)
+    else:
+        puesto = df[valor].rank(method='first', ascending=False)
+
+    principales = df[puesto <= n]
+    resto = df[puesto > n]
+    if resto.empty:
+        return principales.reset_index(drop=True)
+
+    if grupo:
+        otros = resto.groupby(grupo, observed=True, as_index=False)[valor].sum()
+    else:
+        otros = pd.DataFrame({valor: [resto[valor].sum()]})
+    otros[categoria] = etiqueta
+    principales = principales.astype({categoria: object})
+    return pd.concat([principales, otros[columnas]], ignore_index=True)
+
+# ===================================================================
+# Estadísticas precalculadas para cajas y violines
+# ===================================================================
+def estadisticas_caja(df: pd.DataFrame, grupo: str, valor: str) -> pd.DataFrame:
+    """
+    Cuartiles y bigotes (1.5 × IQR, como plotly) de `valor` por `grupo`.
+
+    Returns:
+        pd.DataFrame: Índice `grupo`; columnas q1, mediana, q3, inferior, superior, n.
+    """
+    datos = df[[grupo, valor]].dropna()
+    por_grupo = datos.groupby(grupo, observed=True)[valor]
+    # reindex: sin grupos `unstack` no deja columnas y hay que crearlas igual
+    cuartiles = (por_grupo.quantile([0.25, 0.5, 0.75]).unstack()
+                 .reindex(columns=[0.25, 0.5, 0.75])
+                 .set_axis(['q1', 'mediana', 'q3'], axis=1))
+
+    limites = datos.join(cuartiles, on=grupo)
+    rango = 1.5 * (limites['q3'] - limites['q1'])
+    dentro = limites[valor].between(limites['q1'] - rango, limites['q3'] + rango)
+    bigotes = limites[dentro].groupby(grupo, observed=True)[valor].agg(inferior='min', superior='max')
+    return cuartiles.join(bigotes).assign(n=por_grupo.size())
+
+
+def densidad(valores, puntos: int = PUNTOS_DENSIDAD) -> tuple:
+    """
+    Densidad kernel gaussiana (regla de Silverman) evaluada en `puntos` valores.
+
+    Se calcula sobre un histograma de `puntos` barras suavizado por convolución,
+    así que el costo es lineal en el número de observaciones.
+
+    Returns:
+        tuple: (malla, densidad) con la densidad escalada a un máximo de 1.
+    """
+    v = np.asarray(valores, dtype=float)
+    v = v[~np.isnan(v)]
+    if len(v) == 0:
+        return np.array([]), np.array([])
+    minimo, maximo = v.min(), v.max()
+    if len(v) < 2 or minimo == maximo:
+        return np.array([minimo]), np.array([1.0])
+
+    dispersion = min(v.std(ddof=1), np.subtract(*np.percentile(v, [75, 25])) / 1.34) or v.std(ddof=1)
+    ancho_banda = 0.9 * dispersion * len(v) ** (-1 / 5)
+    cuentas, bordes = np.histogram(v, bins=puntos, range=(minimo, maximo))
+    sigma = max(ancho_banda / (bordes[1] - bordes[0]), 1e-3)
+    radio = min(int(np.ceil(4 * sigma)), (puntos - 1) // 2)
+    nucleo = np.exp(-0.5 * (np.arange(-radio, radio + 1) / sigma) ** 2)
+    suave = np.convolve(cuentas, nucleo, mode='same')
+    return (bordes[:-1] + bordes[1:]) / 2, suave / suave.max()
+
+# ===================================================================
+# Figuras con datos reducidos
+# ===================================================================
+def _observaciones(fig: go.Figure, df: pd.DataFrame, x: str, y: str, posicion: dict, max_observaciones: int):
+    """Agrega una muestra acotada de observaciones, dispersas alrededor de su categoría."""
+    datos = df[[x, y]].dropna()
+    puntos = muestra(datos, max_observaciones)
+    desplazamiento = np.random.default_rng(0).uniform(-0.3, 0.3, len(puntos))
+    titulo = "Observaciones" if len(puntos) == len(datos) else f"Observaciones (muestra de {len(puntos):,})"
+    Traza = clase_dispersion(len(puntos))
+    fig.add_trace(Traza(x=puntos[x].map(posicion).to_numpy(dtype=float) + desplazamiento, y=puntos[y],
+                        mode='markers', name=titulo, marker=dict(size=4, opacity=0.45, color='#444')))
+
+
+def _eje_categorias(fig: go.Figure, grupos: list):
+    fig.update_layout(
+        showlegend=False,
+        xaxis=dict(tickmode='array', tickvals=list(range(len(grupos))), ticktext=[str(g) for g in grupos]))
+
+
+def figura_caja(df: pd.DataFrame, x: str, y: str, max_observaciones: int = MAX_OBSERVACIONES) -> go.Figure:
+    """
+    Diagrama de caja con cuartiles calculados en el servidor.
+
+    Cada caja viaja como cinco números en lugar de todas sus observaciones; además
+    se dibuja una muestra de a lo sumo `max_observaciones` puntos.
+    """
+    if df[[x, y]].dropna().empty:
+        return go.Figure()
+    stats = estadisticas_caja(df, x, y)
+    posicion = {g: i for i, g in enumerate(stats.index)}
+    fig = go.Figure()
+    for nombre, fila in stats.iterrows():
+        fig.add_trace(go.Box(
+            x=[posicion[nombre]], q1=[fila['q1']], median=[fila['mediana']], q3=[fila['q3']],
+            lowerfence=[fila['inferior']], upperfence=[fila['superior']],
+            name=str(nombre), boxpoints=False))
+    if max_observaciones:
+        _observaciones(fig, df, x, y, posicion, max_observaciones)
+    _eje_categorias(fig, list(stats.index))
+    return fig
+
+
+def figura_violin(df: pd.DataFrame, x: str, y: str, max_observaciones: int = MAX_OBSERVACIONES,
+                  puntos: int = PUNTOS_DENSIDAD) -> go.Figure:
+    """
+    Violines con la densidad calculada en el servidor.
+
+    Cada violín es un polígono de `2 × puntos` vértices con su caja precalculada
+    encima, en lugar de enviar las observaciones para que plotly estime la densidad.
+    """
+    if df[[x, y]].dropna().empty:
+        return go.Figure()
+    stats = estadisticas_caja(df, x, y)
+    grupos = list(stats.index)
+    posicion = {g: i for i, g in enumerate(grupos)}
+    fig = go.Figure()
+    for nombre, valores in df.groupby(x, observed=True)[y]:
+        malla, dens = densidad(valores.to_numpy(dtype=float), puntos)
+        if len(malla) == 0:
+            continue
+        pos = posicion[nombre]
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([pos - 0.4 * dens, (pos + 0.4 * dens)[::-1]]),
+            y=np.concatenate([malla, malla[::-1]]),
+            fill='toself', mode='lines', line=dict(width=1), opacity=0.6,
+            name=str(nombre), hoverinfo='name'))
+        fila = stats.loc[nombre]
+        fig.add_trace(go.Box(
+            x=[pos], q1=[fila['q1']], median=[fila['mediana']], q3=[fila['q3']],
+            lowerfence=[fila['inferior']], upperfence=[fila['superior']],
+            width=0.08, boxpoints=False, fillcolor='white', line=dict(color='#333', width=1),
+            showlegend=False, name=str(nombre)))
+    if max_observaciones:
+        _observaciones(fig, df[df[x].isin(grupos)], x, y, posicion, max_observaciones)
+    _eje_categorias(fig, grupos)
+    return fig
@@ -0,0 +1,238 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+import streamlit as st
+
+from almacen import AlmacenDatos, obtener_almacen
+from cache_datos import cargar_con_cache, TTL_SEGUNDOS
+from cargar_datos import (DATASET_INFRA, DATASET_MEN, PARAMS_INFRA, PARAMS_MEN, URL_BASE_SOCRATA, URL_INFRA,
+                          cargar_infraestructura, descargar_men, url_validacion_men)
+from cubo import obtener_cubo
+from infra_analitica import obtener_cubo_infraestructura
+from pipeline import build_star_schema, registrar_huella
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre refrescos de cada conjunto; "0" desactiva el refresco en segundo plano
+INTERVALO_REFRESCO = float(os.environ.get("DIPLOMADO_REFRESCO", TTL_SEGUNDOS))
+REINTENTO_SEGUNDOS = 5 * 60  # espera tras un refresco fallido (sin superar el intervalo)
+
+# ===================================================================
+# Tarea de refresco
+# ===================================================================
+@dataclass
+class TareaRefresco:
+    """
+    Conjunto del almacén que se refresca por calendario.
+
+    Attributes:
+        nombre (str): Conjunto del almacén ('df_raw', 'df_infra').
+        cargar (callable): Recibe `revalidar` (False solo en la primera vuelta, que puede
+            servir la copia local sin tocar la red) y devuelve (DataFrame, origen).
+        derivar (callable, opcional): Precalcula los artefactos de una versión nueva.
+        intervalo (float): Segundos entre refrescos.
+        proxima (float): Instante (según el reloj del refrescador) de la próxima ejecución.
+        version, origen (str): Última versión publicada y de dónde salió.
+        ultimo_intento, ultima_actualizacion (float): Instantes del último intento y del último cambio.
+        error (str): Mensaje del último intento fallido (None si salió bien).
+    """
+    nombre: str
+    cargar: Callable[[bool], tuple]
+    derivar: Optional[Callable[[pd.DataFrame], None]] = None
+    intervalo: float = INTERVALO_REFRESCO
+    proxima: float = 0.0
+    version: Optional[str] = None
+    origen: Optional[str] = None
+    ultimo_intento: Optional[float] = None
+    ultima_actualizacion: Optional[float] = None
+    error: Optional[str] = None
+
+# ===================================================================
+# Refresco en segundo plano
+# ===================================================================
+class Refrescador:
+    """
+    Refresca los conjuntos por calendario, fuera del camino de las peticiones.
+
+    Cada vuelta carga el conjunto (caché en disco + revalidación condicional), y si
+    la versión cambió precalcula sus derivados (modelo estrella, cubos) **antes** de
+    publicarla en el almacén: la publicación es el único paso visible y es atómica,
+    así que las sesiones siguen leyendo la última versión buena mientras se trabaja
+    en la siguiente. Un fallo se registra y se reintenta, sin retirar lo publicado.
+
+    El tiempo viene de `reloj`, así que el calendario se prueba con un reloj falso
+    llamando a `ejecutar_pendientes()` sin iniciar el hilo.
+
+    Args:
+        tareas (list): TareaRefresco a ejecutar.
+        almacen (AlmacenDatos): Donde se publican las versiones.
+        reloj (callable): Fuente de tiempo en segundos (inyectable para pruebas).
+        reintento (float): Espera tras un intento fallido.
+
+    Ejemplo:
+        >>> refrescador = Refrescador(tareas_por_defecto(), obtener_almacen())
+        >>> refrescador.iniciar()
+    """
+
+    def __init__(self, tareas: list, almacen: AlmacenDatos, reloj: Callable[[], float] = time.time,
+                 reintento: float = REINTENTO_SEGUNDOS):
+        self.tareas = {t.nombre: t for t in tareas}
+        self.almacen = almacen
+        self.reloj = reloj
+        self.reintento = reintento
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        for nombre in self.tareas:
+            almacen.seguir_ultima(nombre)
+
+    # ------------------------------------------------------------
+    # Calendario
+    # ------------------------------------------------------------
+    def pendientes(self) -> list:
+        """Tareas cuya próxima ejecución ya llegó."""
+        ahora = self.reloj()
+        return [t for t in self.tareas.values() if t.proxima <= ahora]
+
+    def segundos_para_la_proxima(self) -> Optional[float]:
+        """Espera hasta la tarea más próxima; None si no hay tareas."""
+        if not self.tareas:
+            return None
+        return max(0.0, min(t.proxima for t in self.tareas.values()) - self.reloj())
+
+    def ejecutar_pendientes(self) -> list:
+        """
+        Refresca las tareas vencidas, una a la vez.
+
+        Returns:
+            list: Conjuntos que publicaron una versión nueva.
+        """
+        with self._lock:
+            return [t.nombre for t in self.pendientes() if self.refrescar(t)]
+
+    def refrescar(self, tarea: TareaRefresco) -> bool:
+        """Ejecuta una vuelta de la tarea; True si publicó una versión nueva."""
+        ahora = self.reloj()
+        primera = tarea.ultimo_intento is None
+        tarea.ultimo_intento = ahora
+        try:
+            df, origen = tarea.cargar(not primera)
+            if df is None or df.empty:
+                raise ValueError("la carga no devolvió registros")
+            version = registrar_huella(df)
+            nueva = version != tarea.version
+            if nueva:
+                if tarea.derivar is not None:
+                    tarea.derivar(df)
+                self.almacen.publicar(tarea.nombre, df, version)
+                tarea.version, tarea.ultima_actualizacion = version, ahora
+            tarea.origen, tarea.error = origen, None
+            tarea.proxima = ahora + tarea.intervalo
+            return nueva
+        except Exception as e:
+            logger.warning("Refresco de %s fallido: %s", tarea.nombre, e)
+            tarea.error = str(e)
+            tarea.proxima = ahora + min(self.reintento, tarea.intervalo)
+            return False
+
+    def forzar(self, nombre: Optional[str] = None):
+        """Adelanta la próxima ejecución de una tarea (o de todas) a este instante."""
+        for tarea in self.tareas.values():
+            if nombre is None or tarea.nombre == nombre:
+                tarea.proxima = self.reloj()
+        self._despertar.set()
+
+    # ------------------------------------------------------------
+    # Hilo de fondo
+    # ------------------------------------------------------------
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ciclo, name="refresco-datos", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: Optional[float] = None):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self.ejecutar_pendientes()
+            self._despertar.wait(self.segundos_para_la_proxima())
+            self._despertar.clear()
+
+    def estado(self) -> list:
+        """Resumen de cada tarea para mostrar en la interfaz."""
+        return [{'conjunto': t.nombre, 'version': t.version, 'origen': t.origen, 'error': t.error,
+                 'ultima_actualizacion': t.ultima_actualizacion, 'proxima': t.proxima}
+                for t in self.tareas.values()]
+
+# ===================================================================
+# Tareas de la aplicación
+# ===================================================================
+def _derivar_men(df_raw: pd.DataFrame):
+    obtener_cubo(build_star_schema(df_raw))
+
+
+def _derivar_infra(df_infra: pd.DataFrame):
+    obtener_cubo_infraestructura(df_infra)
+
+
+def tareas_por_defecto(intervalo: float = INTERVALO_REFRESCO, base_url: str = URL_BASE_SOCRATA,
+                       url_infra: str = URL_INFRA, cache=None) -> list:
+    """
+    Refresco de nudc-7mev (`df_raw`) y 3ncw-3qwq (`df_infra`) con las mismas entradas
+    de caché que la pestaña de carga. `base_url` y `url_infra` permiten apuntar a
+    `ServidorSocrataLocal`.
+    """
+    def cargar_men(revalidar: bool) -> tuple:
+        def descargar():
+            df, estado = descargar_men(base_url=base_url)
+            if df is None:
+                raise ConnectionError(f"{len(estado.fallidas)} página(s) fallidas")
+            return df
+        return cargar_con_cache(DATASET_MEN, PARAMS_MEN, descargar, url_validacion=url_validacion_men(base_url),
+                                cache=cache, ttl=0 if revalidar else None)
+
+    def cargar_infra(revalidar: bool) -> tuple:
+        return cargar_con_cache(DATASET_INFRA, PARAMS_INFRA, lambda: cargar_infraestructura(url_infra),
+                                url_validacion=url_infra, cache=cache, ttl=0 if revalidar else None)
+
+    return [TareaRefresco('df_raw', cargar_men, _derivar_men, intervalo),
+            TareaRefresco('df_infra', cargar_infra, _derivar_infra, intervalo)]
+
+# ===================================================================
+# Función: obtener_refrescador
+# ===================================================================
+@st.cache_resource
+def obtener_refrescador() -> Optional[Refrescador]:
+    """Refrescador único del servidor, ya iniciado; None si DIPLOMADO_REFRESCO=0."""
+    if INTERVALO_REFRESCO <= 0:
+        return None
+    refrescador = Refrescador(tareas_por_defecto(), obtener_almacen())
+    refrescador.iniciar()
+    return refrescador
+
+
+def mostrar_estado(refrescador: Optional[Refrescador]):
+    """Estado del refresco automático en la barra lateral."""
+    if refrescador is None:
+        return
+    ahora = refrescador.reloj()
+    for tarea in refrescador.estado():
+        if tarea['error']:
+            st.sidebar.caption(f"⚠️ {tarea['conjunto']}: último refresco fallido; se sirve la última versión buena",
+                               help=tarea['error'])
+        elif tarea['ultima_actualizacion'] is not None:
+            minutos = (ahora - tarea['ultima_actualizacion']) / 60
+            st.sidebar.caption(f"🔁 {tarea['conjunto']}: versión de hace {minutos:,.0f} min ({tarea['origen']})")
+        else:
+            st.sidebar.caption(f"⏳ {tarea['conjunto']}: primera carga en segundo plano...")
@@ -0,0 +1,110 @@
+import streamlit as st
+import plotly.express as px
+from streamlit_folium import st_folium
+
+from base_secuestros import FiltroSecuestros, obtener_base_secuestros
+from geometria import nivel_para_zoom, obtener_geojson
+from mapa_capas import construir_mapa
+from normalizacion import normalizar_nombres, DEPARTAMENTOS
+from reduccion import modo_render, reducir_series
+from instrumentacion import cronometro
+
+# ===================================================================
+# Fragmento: serie de tiempo (cambiar la granularidad no recalcula el resto)
+# ===================================================================
+@st.fragment
+def _serie_tiempo(base, filtro: FiltroSecuestros):
+    granularidad = st.radio("Agrupar por", ['mes', 'anio', 'dia'], horizontal=True,
+                            format_func={'dia': 'Día', 'mes': 'Mes', 'anio': 'Año'}.get)
+    serie = base.serie(filtro, granularidad, por_tipo=True)
+
+    total = int(serie['cantidad'].sum()) if not serie.empty else 0
+    st.metric("Casos en el periodo", f"{total:,}")
+
+    # Por día hay miles de puntos por tipo: se reducen con LTTB conservando picos y valles
+    serie = reducir_series(serie, 'periodo', 'cantidad', color='tipo_delito')
+    fig = px.line(serie, x='periodo', y='cantidad', color='tipo_delito', markers=granularidad != 'dia',
+                  title='Casos de secuestro en el tiempo', render_mode=modo_render(len(serie)))
+    fig.update_layout(xaxis_title="Periodo", yaxis_title="Casos", height=450)
+    st.plotly_chart(fig, use_container_width=True)
+
+# ===================================================================
+# Función: show_secuestros_tab
+# ===================================================================
+def show_secuestros_tab():
+    st.header("🚨 Secuestros por Departamento")
+    vueltas = cronometro('secuestros')
+
+    base = obtener_base_secuestros()
+    try:
+        base.actualizar()
+        vueltas.marca('actualizacion')
+    except Exception as e:
+        st.error(f"❌ Error al leer la base de secuestros: {e}")
+        return
+
+    inicio, fin = base.rango_fechas()
+    if inicio is None:
+        st.warning("La base de secuestros no tiene registros.")
+        return
+
+    # ================================
+    # FILTROS
+    # ================================
+    col1, col2 = st.columns(2)
+    rango = col1.date_input("Rango de fechas", value=(inicio, fin), min_value=inicio, max_value=fin)
+    tipos = col2.multiselect("Tipo de delito", base.tipos())
+
+    deptos = base.departamentos()
+    deptos['nombre'] = normalizar_nombres(deptos['departamento'], DEPARTAMENTOS).astype(str)
+    seleccion = st.multiselect("Departamentos", deptos['nombre'].tolist())
+
+    desde, hasta = (rango[0], rango[-1]) if isinstance(rango, (tuple, list)) and rango else (inicio, fin)
+    filtro = FiltroSecuestros(
+        desde=desde,
+        hasta=hasta,
+        departamentos=tuple(deptos.loc[deptos['nombre'].isin(seleccion), 'cod_depto']) if seleccion else None,
+        tipos=tuple(tipos) if tipos else None,
+    )
+
+    # ================================
+    # SERIE DE TIEMPO
+    # ================================
+    _serie_tiempo(base, filtro)
+    vueltas.marca('serie')
+
+    # ================================
+    # RANKING POR DEPARTAMENTO
+    # ================================
+    por_depto = base.por_departamento(filtro)
+    por_depto['departamento'] = normalizar_nombres(por_depto['departamento'], DEPARTAMENTOS)
+    fig2 = px.bar(por_depto.head(15), x='departamento', y='cantidad', color='cantidad',
+                  color_continuous_scale='Reds', title='Departamentos con más casos')
+    fig2.update_layout(xaxis_title="Departamento", yaxis_title="Casos", height=450)
+    st.plotly_chart(fig2, use_container_width=True)
+    vueltas.marca('ranking', filas=len(por_depto))
+
+    # ================================
+    # MAPA POR AÑO Y TIPO DE DELITO
+    # ================================
+    st.subheader("\U0001F5FA️ Casos por Departamento y Año")
+    try:
+        geojson = obtener_geojson(nivel_para_zoom(5))
+    except Exception as e:
+        st.error(f"❌ Error al leer el archivo .shp: {e}")
+        return
+
+    anual = base.por_departamento(filtro, por_anio=True, por_tipo=True)
+    if anual.empty:
+        st.info("No hay casos con los filtros seleccionados.")
+        return
+    tabla = anual.pivot_table(index=['cod_depto', 'anio'], columns='tipo_delito', values='cantidad',
+                              aggfunc='sum', fill_value=0)
+    metricas = {'Total de casos': 'total', **{t.capitalize(): t for t in tabla.columns}}
+    tabla['total'] = tabla.sum(axis=1)
+    tabla = tabla.reset_index()
+
+    m = construir_mapa(geojson, tabla, metricas, codigo='cod_depto', anio='anio', zoom_start=5)
+    vueltas.marca('construccion_mapa', filas=len(tabla))
+    st_folium(m, key=f"mapa_secuestros_{hash(filtro)}", width=750, height=550, returned_objects=[])
+    vueltas.marca('render_mapa')
@@ -0,0 +1,108 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ===================================================================
+# Servidor local que imita la API de Socrata (para pruebas y mediciones)
+# ===================================================================
+class ServidorSocrataLocal:
+    """
+    Sirve registros fijos con la misma interfaz paginada de datos.gov.co.
+
+    Atiende `GET /resource/<dataset>.json` con `$limit`, `$offset` y `$select=count(*)`,
+    y la descarga completa `GET /api/views/<dataset>/rows.csv`. Se usa como
+    administrador de contexto y expone `base_url` para pasarlo a
+    `cargar_datos.descargar_paginas` y `url_csv(dataset)` para `cargar_infraestructura`.
+
+    Args:
+        datasets (dict): Lista de registros (dicts) por identificador de dataset.
+        fallos (dict, opcional): Veces que debe fallar (HTTP 500) cada $offset, para probar la reanudación.
+        archivos_csv (dict, opcional): Contenido CSV (str o bytes) por identificador de dataset.
+
+    Ejemplo:
+        >>> with ServidorSocrataLocal({"nudc-7mev": registros}) as servidor:
+        ...     estado = descargar_paginas(base_url=servidor.base_url)
+    """
+
+    def __init__(self, datasets: dict, fallos: dict = None, archivos_csv: dict = None):
+        self.datasets = datasets
+        self.fallos = dict(fallos or {})
+        self.archivos_csv = {k: v.encode("utf-8") if isinstance(v, str) else v
+                             for k, v in (archivos_csv or {}).items()}
+        self.peticiones = []
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._crear_manejador())
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}/resource"
+
+    def url_csv(self, dataset: str) -> str:
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}/api/views/{dataset}/rows.csv?accessType=DOWNLOAD"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _crear_manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado, cuerpo, tipo="application/json"):
+                datos = cuerpo.encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _enviar_csv(self, dataset):
+                contenido = servidor.archivos_csv.get(dataset)
+                if contenido is None:
+                    return self._responder(404, json.dumps({"error": "dataset no encontrado"}))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(contenido)))
+                self.end_headers()
+                # Por partes, como una descarga real; el cliente puede cerrar antes
+                # (p. ej. una revalidación que solo lee las cabeceras)
+                try:
+                    for inicio in range(0, len(contenido), 1 << 16):
+                        self.wfile.write(contenido[inicio:inicio + (1 << 16)])
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                servidor.peticiones.append((url.path, params))
+
+                if url.path.startswith("/api/views/") and url.path.endswith("/rows.csv"):
+                    return self._enviar_csv(url.path.split("/")[3])
+
+                dataset = url.path.rsplit("/", 1)[-1].removesuffix(".json")
+                if not url.path.startswith("/resource/") or dataset not in servidor.datasets:
+                    return self._responder(404, json.dumps({"error": "dataset no encontrado"}))
+                registros = servidor.datasets[dataset]
+
+                if params.get("$select", "").lower() == "count(*)":
+                    return self._responder(200, json.dumps([{"count": str(len(registros))}]))
+
+                offset = int(params.get("$offset", 0))
+                limit = int(params.get("$limit", 1000))
+                if servidor.fallos.get(offset, 0) > 0:
+                    servidor.fallos[offset] -= 1
+                    return self._responder(500, json.dumps({"error": "fallo simulado"}))
+                self._responder(200, json.dumps(registros[offset:offset + limit]))
+
+        return Manejador
@@ -1,34 +1,71 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import io
 
+from almacen import leer_de_sesion, publicar_en_sesion
+from pipeline import build_star_schema, ColumnasFaltantesError
+from cubo import obtener_cubo
+from base_datos import obtener_base
+from exportar import DIRECTORIO_EXPORTES, FORMATOS, exportar_esquema, nombre_exportacion
+from instrumentacion import cronometro
+
+# ===================================================================
+# Función: esquema_de_sesion
+# ===================================================================
+def esquema_de_sesion():
+    """
+    Modelo estrella de los datos que cargó la sesión, publicado en el almacén.
+
+    Las páginas se ejecutan por separado, así que las que usan el modelo no pueden
+    suponer que la de Transformación ya corrió; `build_star_schema` está memoizado
+    por la huella de los datos, por lo que llamarlo aquí no recalcula nada.
+
+    Returns:
+        StarSchema o None si la sesión aún no ha cargado datos.
+
+    Raises:
+        ColumnasFaltantesError: Si faltan columnas relevantes.
+    """
+    df_raw = leer_de_sesion('df_raw')
+    if df_raw is None:
+        return None
+    esquema = build_star_schema(df_raw)
+    return publicar_en_sesion('esquema', esquema, esquema.version)
+
+# ===================================================================
+# Fragmento: descarga de la tabla de hechos
+# ===================================================================
+@st.fragment
+def _descarga_hechos(esquema):
+    """Cambiar el formato o preparar el archivo solo vuelve a ejecutar este bloque."""
+    col5, col6 = st.columns(2)
+    formato = col5.selectbox("Formato de descarga", list(FORMATOS), key="formato_exportacion")
+    incluir_dimensiones = col6.checkbox("Incluir dimensiones", key="exportar_dimensiones")
+    ruta = DIRECTORIO_EXPORTES / nombre_exportacion(esquema.version, formato, incluir_dimensiones)
+
+    if not ruta.exists() and st.button("📦 Preparar descarga"):
+        with st.spinner("Generando archivo..."):
+            ruta = exportar_esquema(esquema, formato, incluir_dimensiones)
+
+    if ruta.exists():
+        # El archivo se lee solo al pulsar el botón, no en cada rerun de la página o del fragmento
+        st.download_button(
+            label="🗓️ Descargar Tabla de Hechos",
+            data=ruta.read_bytes,
+            file_name=ruta.name.replace(f"_{esquema.version}", ""),
+            mime='application/zip' if ruta.suffix == '.zip' else FORMATOS[formato][1])
+
+# ===================================================================
+# Función: show_transform_tab
+# ===================================================================
 def show_transform_tab():
     st.title("\U0001F4CA Dashboard Educativo: Modelo Estrella")
+    vueltas = cronometro('transformacion')
 
-    if 'df_raw' not in st.session_state:
+    df_raw = leer_de_sesion('df_raw')
+    if df_raw is None:
         st.warning("\u26a0\ufe0f Primero debes cargar los datos desde la pestaña correspondiente.")
         return
 
-    df = st.session_state['df_raw'].copy()
-
-    # 🔄 Renombrar columnas en minúscula
-    df.columns = [c.lower() for c in df.columns]
-
-    # 🔄 Limpieza general de departamento y municipio
-    df['departamento'] = df['departamento'].str.replace(",", "", regex=False).str.strip().str.title()
-    df['municipio'] = df['municipio'].str.replace(",", "", regex=False).str.strip().str.title()
-
-    # ❌ Eliminar registros del nivel nacional
-    df = df[df['departamento'] != 'Nacional']
-
-    # 🔄 Unificar San Andrés
-    df['departamento'] = df['departamento'].str.replace(
-        r"Archipielago De San Andres[,.].*Providencia Y Santa Catalina",
-        "San Andres",
-        regex=True
-    )
-
     st.markdown("""
     ### 🛠️ Etapas del Flujo de Trabajo
     1. **Limpieza de datos**
@@ -41,24 +78,17 @@ def show_transform_tab():
     st.markdown("---")
     st.subheader("1️⃣ Limpieza y Validación de Datos")
 
-    columnas_relevantes = [
-        'a_o', 'departamento', 'municipio', 'c_digo_departamento',
-        'poblaci_n_5_16', 'tasa_matriculaci_n_5_16',
-        'cobertura_neta', 'cobertura_bruta'
-    ]
-    columnas_faltantes = [col for col in columnas_relevantes if col not in df.columns]
-    if columnas_faltantes:
-        st.error(f"❌ Columnas faltantes: {columnas_faltantes}")
+    # La limpieza y el modelo se calculan una vez por versión de los datos
+    try:
+        esquema = build_star_schema(df_raw)
+    except ColumnasFaltantesError as e:
+        st.error(f"❌ Columnas faltantes: {e.columnas}")
         return
-
-    df = df[columnas_relevantes]
-    for col in df.columns:
-        if col not in ['departamento', 'municipio', 'c_digo_departamento']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    df_clean = df.dropna()
+    vueltas.marca('modelo', filas=len(esquema.df_fact))
+    df_clean = esquema.df_clean
 
     col1, col2 = st.columns(2)
-    col1.metric("Registros originales", len(st.session_state['df_raw']))
+    col1.metric("Registros originales", esquema.registros_originales)
     col2.metric("Registros válidos", len(df_clean))
 
     # Verificación visual de registros de Bogotá
@@ -71,20 +101,8 @@ def show_transform_tab():
     st.markdown("---")
     st.subheader("2️⃣ Dimensiones del Modelo Estrella")
 
-    def crear_dimension(df, cols, nombre, sort_col=None):
-        dim = df[cols].drop_duplicates()
-        if sort_col:
-            dim = dim.sort_values(by=sort_col)
-        dim = dim.reset_index(drop=True)
-        dim[f"id_{nombre}"] = dim.index + 1
-        return dim[[f"id_{nombre}"] + cols]
-
-    dim_tiempo = crear_dimension(df_clean, ['a_o'], 'tiempo')
-    dim_geo = df_clean[['c_digo_departamento', 'departamento', 'municipio']].copy()
-    dim_geo = dim_geo.sort_values(by=['c_digo_departamento', 'municipio'])
-    dim_geo = dim_geo.drop_duplicates(subset=['c_digo_departamento'], keep='first').reset_index(drop=True)
-    dim_geo['id_geo'] = dim_geo.index + 1
-    dim_geo = dim_geo[['id_geo', 'c_digo_departamento', 'departamento', 'municipio']]
+    dim_tiempo = esquema.dim_tiempo
+    dim_geo = esquema.dim_geo
 
     col3, col4 = st.columns(2)
     col3.metric("Dimensión Tiempo", len(dim_tiempo))
@@ -93,24 +111,26 @@ def show_transform_tab():
     st.markdown("---")
     st.subheader("3️⃣ Tabla de Hechos")
 
-    df_fact = df_clean.merge(dim_tiempo, on='a_o') \
-                      .merge(dim_geo, on=['departamento', 'municipio', 'c_digo_departamento'], how='inner')
-
-    df_fact = df_fact[['id_tiempo', 'id_geo',
-        'poblaci_n_5_16', 'tasa_matriculaci_n_5_16',
-        'cobertura_neta', 'cobertura_bruta']]
+    df_fact = esquema.df_fact
 
+    if esquema.anios_actualizados:
+        st.caption(f"Años procesados: {', '.join(str(int(a)) for a in esquema.anios_actualizados)}")
+    else:
+        st.caption("Sin cambios en el origen: se reutiliza el modelo existente.")
     st.success(f"✅ Tabla de hechos construida con {len(df_fact):,} registros.")
-    st.session_state['df_fact'] = df_fact
-    st.session_state['dim_geo'] = dim_geo
-    st.session_state['dim_tiempo'] = dim_tiempo
+    esquema = publicar_en_sesion('esquema', esquema, esquema.version)
+
+    # Copia indexada en SQLite: las agregaciones por municipio se resuelven en la base
+    base = obtener_base()
+    base.sincronizar(esquema)
+    vueltas.marca('sqlite')
 
     st.markdown("---")
     st.subheader("4️⃣ Indicadores y Visualizaciones")
 
-    escolaridad_prom = df_fact.groupby('id_geo')[['tasa_matriculaci_n_5_16']].mean().reset_index()
-    escolaridad_prom = escolaridad_prom.merge(dim_geo, on='id_geo')
-    top_mpios = escolaridad_prom.sort_values(by='tasa_matriculaci_n_5_16', ascending=False).head(10)
+    top_mpios = base.agregar(esquema.version, ['tasa_matriculaci_n_5_16'],
+                             ['c_digo_departamento', 'departamento', 'municipio'],
+                             orden='tasa_matriculaci_n_5_16', limite=10)
 
     fig = px.bar(
         top_mpios,
@@ -121,31 +141,26 @@ def show_transform_tab():
         color_discrete_sequence=['#002855']
     )
     st.plotly_chart(fig, use_container_width=True)
+    vueltas.marca('grafico_municipios', filas=len(top_mpios))
 
-    cobertura_depto = df_fact.merge(dim_geo, on='id_geo') \
-        .groupby('departamento')['cobertura_neta'].mean().sort_values(ascending=False).head(10)
+    cubo = obtener_cubo(esquema)
+    cobertura_depto = cubo.total_departamento(['cobertura_neta'])['cobertura_neta'].sort_values(ascending=False).head(10)
     st.markdown("**🏩 Top Departamentos por Cobertura Neta Promedio**")
     st.dataframe(cobertura_depto.reset_index())
+    vueltas.marca('cubo_departamentos')
 
     st.markdown("---")
     st.subheader("5️⃣ Vista y Descarga de la Tabla de Hechos")
 
     st.dataframe(df_fact.head(50))
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_fact.to_excel(writer, index=False, sheet_name='TablaHechos')
-    output.seek(0)
+    vueltas.marca('vista_hechos')
 
-    st.download_button(
-        label="🗓️ Descargar Tabla de Hechos",
-        data=output,
-        file_name='tabla_hechos_educacion.xlsx',
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    # El archivo solo se genera al pedirlo y se reutiliza mientras no cambie la tabla de hechos
+    _descarga_hechos(esquema)
 
     st.markdown("---")
     st.subheader("📈 Resumen por Departamento y Año")
 
-    df_fact_ext = df_fact.merge(dim_geo, on='id_geo').merge(dim_tiempo, on='id_tiempo')
-    resumen = df_fact_ext.groupby(['departamento', 'a_o'])[
-        ['tasa_matriculaci_n_5_16', 'cobertura_neta', 'cobertura_bruta']].mean().reset_index()
+    resumen = cubo.departamento_anio(['tasa_matriculaci_n_5_16', 'cobertura_neta', 'cobertura_bruta'])
     st.dataframe(resumen.head(20))
+    vueltas.marca('resumen', filas=len(resumen))
@@ -1,52 +1,28 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-import unidecode
- 
-def show_visualization_tab():
-    st.header("📈 Visualizaciones por Departamento")
- 
-    if 'df_fact' not in st.session_state:
-        st.warning("Primero debes construir la tabla de hechos en la pestaña 'Transformación y Métricas'.")
-        return
- 
-    df_fact = st.session_state['df_fact']
-    dim_geo = st.session_state['dim_geo']
-    dim_tiempo = st.session_state['dim_tiempo']
- 
-    df = df_fact.merge(dim_geo, on='id_geo').merge(dim_tiempo, on='id_tiempo')
- 
-    # 🔴 Limpieza robusta del nombre del departamento
-    df['departamento'] = (
-        df['departamento']
-        .astype(str)
-        .str.strip()
-        .str.upper()
-        .str.replace(r'\.', '', regex=True)
-        .apply(unidecode.unidecode)
-    )
- 
-    df['departamento'] = df['departamento'].replace({
-        'BOGOTA D.C.': 'Bogotá D.C.',
-        'BOGOTA, D.C.': 'Bogotá D.C.',
-        'ARCHIPIELAGO DE SAN ANDRES PROVIDENCIA Y SANTA CATALINA': 'San Andrés',
-        'ARCHIPIELAGO DE SAN ANDRES, PROVIDENCIA Y SANTA CATALINA': 'San Andrés'
-    })
- 
-    # Asegurar tipo entero en año
-    df['a_o'] = pd.to_numeric(df['a_o'], errors='coerce').astype('Int64')
+
+from pipeline import ColumnasFaltantesError
+from cubo import obtener_cubo
+from base_datos import obtener_base
+from instrumentacion import cronometro
+from reduccion import figura_caja, figura_violin, modo_render, reducir_series
+from transformacion import esquema_de_sesion
  
+# ===================================================================
+# Fragmentos: cada selector solo vuelve a ejecutar su propio gráfico
+# ===================================================================
+@st.fragment
+def _series_departamento(cubo):
     # ================================
     # PRIMER GRÁFICO
     # ================================
     st.subheader("📊 Serie de tiempo: Tasa de Matriculación vs Cobertura Neta")
  
-    deptos = sorted(df['departamento'].dropna().unique())
+    deptos = cubo.departamentos
     selected_depto_1 = st.selectbox("Selecciona un departamento (Gráfico 1)", deptos)
  
-    df_1 = df[df['departamento'] == selected_depto_1]
-    df_1 = df_1.groupby('a_o')[['tasa_matriculaci_n_5_16', 'cobertura_neta']].mean().reset_index()
+    df_1 = cubo.serie(selected_depto_1, ['tasa_matriculaci_n_5_16', 'cobertura_neta']).reset_index()
  
     fig1 = go.Figure()
     fig1.add_trace(go.Scatter(
@@ -91,15 +67,13 @@ def show_visualization_tab():
  
     selected_depto_2 = st.selectbox("Selecciona un departamento (Gráfico 2)", deptos, index=deptos.index(selected_depto_1))
  
-    df_2 = df[df['departamento'] == selected_depto_2]
-    df_2 = df_2.groupby('a_o')[['cobertura_bruta']].mean().reset_index()
- 
-    if 'repitencia_secundaria' in df.columns:
-        df_2['otra_metrica'] = df[df['departamento'] == selected_depto_2].groupby('a_o')['repitencia_secundaria'].mean().values
-        nombre_metrica = 'Repitencia secundaria'
+    if 'repitencia_secundaria' in cubo.metricas:
+        otra_col, nombre_metrica = 'repitencia_secundaria', 'Repitencia secundaria'
     else:
-        df_2['otra_metrica'] = df[df['departamento'] == selected_depto_2].groupby('a_o')['tasa_matriculaci_n_5_16'].mean().values
-        nombre_metrica = 'Tasa de Matriculación (5-16)'
+        otra_col, nombre_metrica = 'tasa_matriculaci_n_5_16', 'Tasa de Matriculación (5-16)'
+ 
+    df_2 = cubo.serie(selected_depto_2, ['cobertura_bruta', otra_col]).reset_index()
+    df_2 = df_2.rename(columns={otra_col: 'otra_metrica'})
  
     fig2 = go.Figure()
     fig2.add_trace(go.Scatter(
@@ -138,16 +112,21 @@ def show_visualization_tab():
     st.plotly_chart(fig2, use_container_width=True)
 
 
-        # ================================
+@st.fragment
+def _caja_departamento(base, esquema, deptos):
+    # ================================
     # GRÁFICO 3: Boxplot de cobertura neta por departamento con filtro individual
     # ================================
     st.subheader("📊 Distribución de Cobertura Neta por Departamento")
 
     selected_depto_3 = st.selectbox("Selecciona un departamento (Gráfico 3)", deptos)
 
-    df_3 = df[df['departamento'] == selected_depto_3]
+    # Se vuelve a sincronizar: otra sesión pudo desalojar la versión desde la última vuelta completa
+    base.sincronizar(esquema)
+    df_3 = base.hechos(esquema.version, ['cobertura_neta'], departamentos=[selected_depto_3])
 
-    fig3 = px.box(df_3, x='departamento', y='cobertura_neta', points='all', color='departamento')
+    # Cuartiles calculados aquí: al navegador solo llegan la caja y una muestra de puntos
+    fig3 = figura_caja(df_3, 'departamento', 'cobertura_neta')
     fig3.update_layout(
         xaxis_title="Departamento",
         yaxis_title="Cobertura Neta (%)",
@@ -156,11 +135,56 @@ def show_visualization_tab():
     st.plotly_chart(fig3, use_container_width=True)
 
 
+@st.fragment
+def _violin_departamentos(base, esquema, deptos):
+    # Gráfico 5 - Violin plot
+    st.subheader("\U0001F4CA Distribución tipo Violin: Tasa de Matriculación")
+    selected = st.multiselect("Selecciona departamentos para comparar", deptos, default=deptos[:5])
+    base.sincronizar(esquema)
+    df_violin = base.hechos(esquema.version, ['tasa_matriculaci_n_5_16'], departamentos=selected)
+    fig4 = figura_violin(df_violin, 'departamento', 'tasa_matriculaci_n_5_16')
+    fig4.update_layout(xaxis_title="Departamento", yaxis_title="Tasa de Matriculación (%)")
+    st.plotly_chart(fig4, use_container_width=True)
+
+# ===================================================================
+# Función: show_visualization_tab
+# ===================================================================
+def show_visualization_tab():
+    st.header("📈 Visualizaciones por Departamento")
+    vueltas = cronometro('visualizaciones')
+ 
+    try:
+        esquema = esquema_de_sesion()
+    except ColumnasFaltantesError as e:
+        st.error(f"❌ Columnas faltantes: {e.columnas}")
+        return
+    if esquema is None:
+        st.warning("Primero debes cargar los datos en la pestaña 'Carga de Datos'.")
+        return
+ 
+    # Agregados precalculados una vez por versión de la tabla de hechos
+    cubo = obtener_cubo(esquema)
+    # Las distribuciones necesitan filas individuales: se filtran en SQLite, no en memoria
+    base = obtener_base()
+    base.sincronizar(esquema)
+    vueltas.marca('sqlite')
+ 
+    # Gráficos 1 y 2: el segundo selector arranca en el departamento del primero
+    _series_departamento(cubo)
+    vueltas.marca('series_departamento')
+
+
+    # Gráfico 3 - Boxplot de un departamento
+    deptos = cubo.departamentos
+    _caja_departamento(base, esquema, deptos)
+    vueltas.marca('caja')
+
+
     # ================================
     # GRÁFICO 4: Ranking de cobertura neta promedio
     # ================================
     st.subheader("📊 Ranking: Cobertura Neta Promedio por Departamento")
-    cobertura_prom = df.groupby('departamento')['cobertura_neta'].mean().reset_index()
+    cobertura_prom = cubo.total_departamento(['cobertura_neta']).reset_index()
     cobertura_prom = cobertura_prom.sort_values(by='cobertura_neta', ascending=False)
     fig5 = px.bar(
         cobertura_prom,
@@ -175,26 +199,25 @@ def show_visualization_tab():
         height=500
     )
     st.plotly_chart(fig5, use_container_width=True)
+    vueltas.marca('ranking_cobertura')
 
 
-      # Gráfico 5 - Violin plot
-    st.subheader("\U0001F4CA Distribución tipo Violin: Tasa de Matriculación")
-    selected = st.multiselect("Selecciona departamentos para comparar", deptos, default=deptos[:5])
-    df_violin = df[df['departamento'].isin(selected)]
-    fig4 = px.violin(df_violin, x='departamento', y='tasa_matriculaci_n_5_16', box=True, points='all')
-    st.plotly_chart(fig4, use_container_width=True)
+    # Gráfico 5 - Violin plot
+    _violin_departamentos(base, esquema, deptos)
+    vueltas.marca('violin')
 
 
     # Gráfico 6 - Treemap: Proporción de matrícula total por departamento
     st.subheader("\U0001F4CA Treemap: Participación Total en Matrícula (5-16)")
-    df_treemap = df.groupby('departamento')['tasa_matriculaci_n_5_16'].mean().reset_index()
+    df_treemap = cubo.total_departamento(['tasa_matriculaci_n_5_16']).reset_index()
     fig2 = px.treemap(df_treemap, path=['departamento'], values='tasa_matriculaci_n_5_16',
                       color='tasa_matriculaci_n_5_16', color_continuous_scale='RdBu')
     st.plotly_chart(fig2, use_container_width=True)
+    vueltas.marca('treemap', filas=len(df_treemap))
 
      # Gráfico 7 - Dispersión: Relación entre cobertura neta y población
     st.subheader("\U0001F4CA Dispersión: Cobertura Neta vs Población (5-16)")
-    df_scatter = df.groupby('departamento')[['cobertura_neta', 'poblaci_n_5_16']].mean().reset_index()
+    df_scatter = cubo.total_departamento(['cobertura_neta', 'poblaci_n_5_16']).reset_index()
     fig1 = px.scatter(
         df_scatter,
         x='poblaci_n_5_16',
@@ -206,13 +229,15 @@ def show_visualization_tab():
         title="Relación entre Cobertura Neta y Población Promedio (5-16)"
     )
     st.plotly_chart(fig1, use_container_width=True)
+    vueltas.marca('dispersion', filas=len(df_scatter))
     
     # ================================
     # GRÁFICO 8: Serie de tiempo animada por departamento
     # ================================
     st.subheader("📈 Evolución Anual: Tasa de Matriculación por Departamento")
 
-    df_linea = df.groupby(['a_o', 'departamento'])['tasa_matriculaci_n_5_16'].mean().reset_index()
+    df_linea = reducir_series(cubo.departamento_anio(['tasa_matriculaci_n_5_16']),
+                              'a_o', 'tasa_matriculaci_n_5_16', color='departamento')
 
     fig_line = px.line(
         df_linea,
@@ -221,11 +246,13 @@ def show_visualization_tab():
         color='departamento',
         markers=True,
         title='Tasa de Matriculación (5-16 años) por Departamento - Serie de Tiempo',
-        height=600
+        height=600,
+        render_mode=modo_render(len(df_linea))
     )
     fig_line.update_layout(
         xaxis_title="Año",
         yaxis_title="Tasa de Matriculación (%)"
     )
     st.plotly_chart(fig_line, use_container_width=True)
+    vueltas.marca('lineas', filas=len(df_linea))
 
@@ -0,0 +1,37 @@
+"""
+Configuración común de las pruebas.
+
+Los módulos de la aplicación leen sus carpetas de variables de entorno al
+importarse, así que se apuntan a una carpeta temporal antes de cualquier import:
+las pruebas nunca tocan `.cache/` ni la base SQLite del repositorio.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+_TEMPORAL = Path(tempfile.mkdtemp(prefix="diplomado-pruebas-"))
+os.environ.setdefault("DIPLOMADO_CACHE_DIR", str(_TEMPORAL / "datos"))
+os.environ.setdefault("DIPLOMADO_BD", str(_TEMPORAL / "educacion.db"))
+os.environ.setdefault("DIPLOMADO_ARTEFACTOS", str(_TEMPORAL / "artefactos"))
+os.environ.setdefault("DIPLOMADO_REFRESCO", "0")
+os.environ.setdefault("DIPLOMADO_PRECALENTAR", "0")
+
+import pytest  # noqa: E402
+
+
+class RelojFalso:
+    """Reloj que solo avanza cuando la prueba lo pide."""
+
+    def __init__(self, inicio: float = 1_000_000.0):
+        self.ahora = inicio
+
+    def __call__(self) -> float:
+        return self.ahora
+
+    def avanzar(self, segundos: float):
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj():
+    return RelojFalso()
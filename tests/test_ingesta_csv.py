@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from benchmark import generar_infra
+from cargar_datos import DATASET_INFRA
+from esquema import aplicar_esquema, ESQUEMA_INFRA
+from ingesta_csv import COLUMNAS_INFRA, leer_csv_por_bloques
+from socrata_local import ServidorSocrataLocal
+
+
+@pytest.fixture
+def csv_infra(tmp_path):
+    ruta = tmp_path / "infra.csv"
+    generar_infra(2_000).to_csv(ruta, index=False)
+    return ruta
+
+
+def _esperado(ruta):
+    """Lectura completa de referencia: mismas columnas y mismos tipos."""
+    df = pd.read_csv(ruta)
+    df = df[[c for c in df.columns if c.lower() in COLUMNAS_INFRA]]
+    return aplicar_esquema(df, ESQUEMA_INFRA, medir=False)[0]
+
+
+def _comparar(df, esperado):
+    # Los bloques pueden descubrir las categorías en otro orden; los valores deben coincidir
+    pd.testing.assert_frame_equal(df, esperado, check_categorical=False)
+
+
+@pytest.mark.parametrize("motor", ['pandas', 'pyarrow'])
+def test_archivo_local_por_bloques(csv_infra, motor):
+    avisos = []
+    df = leer_csv_por_bloques(str(csv_infra), motor=motor, progreso=lambda leidos, total: avisos.append((leidos, total)),
+                              tamano_bloque=4096, filas_por_bloque=300)
+
+    _comparar(df, _esperado(csv_infra))
+    assert 'AULAS_AMPLIADAS' not in df.columns
+    assert avisos and avisos[-1] == (csv_infra.stat().st_size, csv_infra.stat().st_size)
+    assert [leidos for leidos, _ in avisos] == sorted(leidos for leidos, _ in avisos)
+
+
+@pytest.mark.parametrize("motor", ['pandas', 'pyarrow'])
+def test_rows_csv_del_servidor_local(csv_infra, motor):
+    contenido = csv_infra.read_bytes()
+    avisos = []
+    with ServidorSocrataLocal({}, archivos_csv={DATASET_INFRA: contenido}) as servidor:
+        df = leer_csv_por_bloques(servidor.url_csv(DATASET_INFRA), motor=motor,
+                                  progreso=lambda leidos, total: avisos.append((leidos, total)),
+                                  filas_por_bloque=500)
+
+    _comparar(df, _esperado(csv_infra))
+    assert avisos[-1] == (len(contenido), len(contenido))
+
+
+def test_csv_sin_las_columnas_pedidas(tmp_path):
+    ruta = tmp_path / "otro.csv"
+    ruta.write_text("a,b\n1,2\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        leer_csv_por_bloques(str(ruta))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generar_men
+from fuera_de_memoria import HechosParticionados
+from modelo_incremental import (CLAVE_GEO, CLAVE_TIEMPO, METRICAS, ModeloIncremental, _codificar,
+                                _extender_dimension)
+from pipeline import limpiar_datos
+
+
+def _extender_dimension_con_merge(dim, df, cols, id_col):
+    """Versión anterior (basada en merges), usada como referencia."""
+    candidatos = df[cols].drop_duplicates()
+    nuevos = candidatos.merge(dim[cols], on=cols, how='left', indicator=True)
+    nuevos = nuevos[nuevos['_merge'] == 'left_only'][cols].sort_values(by=cols).reset_index(drop=True)
+    if nuevos.empty:
+        return dim
+    inicio = int(dim[id_col].max()) + 1 if len(dim) else 1
+    nuevos.insert(0, id_col, np.arange(inicio, inicio + len(nuevos), dtype='int64'))
+    return nuevos if dim.empty else pd.concat([dim, nuevos], ignore_index=True)
+
+
+@pytest.fixture
+def df_clean():
+    return limpiar_datos(generar_men(600, anios=4))
+
+
+def _como_texto(df):
+    return df.astype({c: object for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])})
+
+# ===================================================================
+# _codificar / _extender_dimension
+# ===================================================================
+def test_codificar_una_fila_por_combinacion(df_clean):
+    codigos, combinaciones = _codificar(df_clean, CLAVE_GEO)
+
+    assert len(combinaciones) == len(df_clean[CLAVE_GEO].drop_duplicates())
+    # Las combinaciones salen en orden de aparición y cada código apunta a la suya
+    esperadas = df_clean[CLAVE_GEO].drop_duplicates().reset_index(drop=True)
+    pd.testing.assert_frame_equal(_como_texto(combinaciones), _como_texto(esperadas))
+    reconstruido = combinaciones.take(codigos).reset_index(drop=True)
+    pd.testing.assert_frame_equal(_como_texto(reconstruido), _como_texto(df_clean[CLAVE_GEO].reset_index(drop=True)))
+
+
+@pytest.mark.parametrize("cols, id_col", [(CLAVE_TIEMPO, 'id_tiempo'), (CLAVE_GEO, 'id_geo')])
+def test_extender_dimension_igual_que_con_merge(df_clean, cols, id_col):
+    # Primero una parte de los años (dimensión vacía), luego todo (combinaciones repetidas y nuevas)
+    primera = df_clean[df_clean['a_o'] <= 2012]
+    vacia = pd.DataFrame({id_col: pd.Series(dtype='int64'), **{c: pd.Series(dtype='object') for c in cols}})
+
+    dim, ids = _extender_dimension(vacia, primera, cols, id_col)
+    esperada = _extender_dimension_con_merge(vacia, primera, cols, id_col)
+    pd.testing.assert_frame_equal(_como_texto(dim), _como_texto(esperada))
+
+    dim_total, ids_total = _extender_dimension(dim, df_clean, cols, id_col)
+    esperada_total = _extender_dimension_con_merge(esperada, df_clean, cols, id_col)
+    pd.testing.assert_frame_equal(_como_texto(dim_total), _como_texto(esperada_total))
+
+    # Las llaves por fila son las que daba el merge de los hechos con la dimensión
+    por_merge = df_clean[cols].merge(esperada_total, on=cols, how='left')[id_col]
+    np.testing.assert_array_equal(ids_total, por_merge.to_numpy())
+    np.testing.assert_array_equal(ids, primera[cols].merge(esperada, on=cols, how='left')[id_col].to_numpy())
+
+
+def test_extender_dimension_sin_nuevos_no_cambia_la_dimension(df_clean):
+    dim, _ = _extender_dimension(ModeloIncremental().dim_geo, df_clean, CLAVE_GEO, 'id_geo')
+    misma, ids = _extender_dimension(dim, df_clean.iloc[::-1], CLAVE_GEO, 'id_geo')
+
+    assert misma is dim
+    assert len(ids) == len(df_clean)
+
+# ===================================================================
+# Retiro de años en ModeloIncremental.actualizar
+# ===================================================================
+def test_actualizar_retira_los_anios_ausentes(df_clean, tmp_path):
+    modelo = ModeloIncremental(tmp_path)
+    completa = modelo.actualizar(df_clean)
+    assert completa.anios == [2011, 2012, 2013, 2014]
+    id_2013 = int(modelo.dim_tiempo.loc[modelo.dim_tiempo['a_o'] == 2013, 'id_tiempo'].iloc[0])
+
+    sin_2013 = df_clean[df_clean['a_o'] != 2013]
+    instantanea = modelo.actualizar(sin_2013)
+
+    assert instantanea.anios == [2013]
+    assert instantanea.version != completa.version
+    assert len(instantanea.df_fact) == len(sin_2013)
+    assert id_2013 not in set(instantanea.df_fact['id_tiempo'])
+    # La fila de dim_tiempo se conserva para no reasignar la llave; la partición se borra
+    assert id_2013 in set(instantanea.dim_tiempo['id_tiempo'])
+    assert not (tmp_path / "hechos" / f"{id_2013}.parquet").exists()
+
+    # El cubo fuera de memoria tampoco ve el año retirado
+    assert 2013 not in [anio for anio, _ in HechosParticionados(tmp_path)._rutas()]
+    # Ni el modelo recargado desde disco
+    recargado = ModeloIncremental(tmp_path)
+    assert recargado.version == instantanea.version
+    assert len(recargado.df_fact) == len(sin_2013)
+    assert recargado.actualizar(sin_2013).anios == []
+
+
+def test_actualizar_reincorpora_un_anio_retirado_con_su_llave(df_clean, tmp_path):
+    modelo = ModeloIncremental(tmp_path)
+    completa = modelo.actualizar(df_clean)
+    llaves = modelo.dim_tiempo.copy()
+
+    modelo.actualizar(df_clean[df_clean['a_o'] != 2013])
+    de_nuevo = modelo.actualizar(df_clean)
+
+    assert de_nuevo.anios == [2013]
+    assert de_nuevo.version == completa.version
+    pd.testing.assert_frame_equal(de_nuevo.dim_tiempo, llaves)
+    assert len(de_nuevo.df_fact) == len(df_clean)
+    assert set(de_nuevo.df_fact.columns) == {'id_tiempo', 'id_geo', *METRICAS}
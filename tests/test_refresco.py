@@ -0,0 +1,106 @@
+import pytest
+
+from almacen import AlmacenDatos
+from benchmark import generar_infra, generar_registros_api
+from cache_datos import CacheColumnar
+from cargar_datos import DATASET_INFRA, DATASET_MEN
+from refresco import Refrescador, TareaRefresco, tareas_por_defecto
+from socrata_local import ServidorSocrataLocal
+
+INTERVALO = 600
+REINTENTO = 60
+
+
+@pytest.fixture
+def servidor():
+    archivos = {DATASET_INFRA: generar_infra(300).to_csv(index=False)}
+    with ServidorSocrataLocal({DATASET_MEN: generar_registros_api(450)}, archivos_csv=archivos) as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def refrescador(servidor, reloj, tmp_path):
+    tareas = tareas_por_defecto(INTERVALO, base_url=servidor.base_url, url_infra=servidor.url_csv(DATASET_INFRA),
+                                cache=CacheColumnar(tmp_path / "cache"))
+    return Refrescador(tareas, AlmacenDatos(reloj=reloj), reloj=reloj, reintento=REINTENTO)
+
+
+def test_publica_solo_cuando_cambia(servidor, refrescador, reloj):
+    assert sorted(refrescador.ejecutar_pendientes()) == ['df_infra', 'df_raw']
+    almacen = refrescador.almacen
+    primera = almacen.ultima_version('df_raw')
+    assert len(almacen.obtener('df_raw')) == 450
+
+    # Antes del intervalo no se consulta el servidor
+    peticiones = len(servidor.peticiones)
+    reloj.avanzar(INTERVALO - 1)
+    assert refrescador.ejecutar_pendientes() == []
+    assert len(servidor.peticiones) == peticiones
+
+    # Vencido el intervalo se descarga de nuevo, pero sin cambios no hay versión nueva
+    reloj.avanzar(1)
+    assert refrescador.ejecutar_pendientes() == []
+    assert len(servidor.peticiones) > peticiones
+    assert almacen.ultima_version('df_raw') == primera
+
+    servidor.datasets[DATASET_MEN] = generar_registros_api(450, semilla=1)
+    reloj.avanzar(INTERVALO)
+    assert refrescador.ejecutar_pendientes() == ['df_raw']
+    assert almacen.ultima_version('df_raw') != primera
+    assert refrescador.tareas['df_raw'].ultima_actualizacion == reloj()
+
+
+def test_fallo_conserva_la_ultima_version_buena(servidor, refrescador, reloj):
+    refrescador.ejecutar_pendientes()
+    almacen = refrescador.almacen
+    version = almacen.ultima_version('df_raw')
+    df = almacen.obtener('df_raw')
+
+    # La primera página falla más veces de las que reintenta la sesión
+    servidor.datasets[DATASET_MEN] = generar_registros_api(450, semilla=1)
+    servidor.fallos[0] = 10
+    reloj.avanzar(INTERVALO)
+    assert refrescador.ejecutar_pendientes() == []
+
+    tarea = refrescador.tareas['df_raw']
+    assert tarea.error is not None
+    assert tarea.version == version
+    assert almacen.ultima_version('df_raw') == version
+    assert almacen.obtener('df_raw') is df
+
+
+def test_reintento_tras_fallo(servidor, refrescador, reloj):
+    refrescador.ejecutar_pendientes()
+    tarea = refrescador.tareas['df_infra']
+    version = tarea.version
+
+    # Un CSV sin las columnas esperadas hace fallar la lectura
+    servidor.archivos_csv[DATASET_INFRA] = b"a,b\n1,2\n"
+    reloj.avanzar(INTERVALO)
+    inicio = reloj()
+    refrescador.ejecutar_pendientes()
+    assert tarea.error is not None
+    assert tarea.proxima == inicio + REINTENTO
+    assert refrescador.almacen.ultima_version('df_infra') == version
+
+    reloj.avanzar(REINTENTO - 1)
+    assert refrescador.pendientes() == []
+
+    # Recuperado el servidor, el reintento publica y vuelve al intervalo normal
+    servidor.archivos_csv[DATASET_INFRA] = generar_infra(300, semilla=1).to_csv(index=False).encode("utf-8")
+    reloj.avanzar(1)
+    assert refrescador.ejecutar_pendientes() == ['df_infra']
+    assert tarea.error is None
+    assert tarea.proxima == reloj() + INTERVALO
+    assert refrescador.almacen.ultima_version('df_infra') != version
+
+
+def test_reintento_no_supera_el_intervalo(reloj):
+    def cargar(revalidar):
+        raise ConnectionError("sin red")
+
+    tarea = TareaRefresco('df_raw', cargar, intervalo=30)
+    refrescador = Refrescador([tarea], AlmacenDatos(reloj=reloj), reloj=reloj, reintento=REINTENTO)
+
+    assert refrescador.ejecutar_pendientes() == []
+    assert tarea.proxima == reloj() + 30